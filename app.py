@@ -1,14 +1,51 @@
 # app.py
+import threading
+
 import streamlit as st
-from src.predict import predict_alert
-import pandas as pd
-import matplotlib.pyplot as plt
-import os
+from src.user_store import get_user_store
+
+# Heavy modules (pandas, scikit-learn, matplotlib) and the model are not
+# imported here: the login and signup pages render without them, and
+# start_preload() warms them up in the background once a user logs in.
+
+# ---------------- PAGE CONFIG ----------------
+st.set_page_config(
+    page_title="Earthquake Risk Assessment System",
+    layout="wide"
+)
 
-# ---------------- UI ENHANCEMENT STYLES ----------------
-st.markdown("""
+# ---------------- UI STYLES ----------------
+APP_CSS = """
 <style>
 
+/* ---- Light earth background ---- */
+.stApp {
+    background: linear-gradient(
+        120deg,
+        #f0f4ff,
+        #f7fbff,
+        #eef7f3
+    );
+    background-size: 400% 400%;
+    animation: gradientBG 12s ease infinite;
+}
+
+@keyframes gradientBG {
+    0% { background-position: 0% 50%; }
+    50% { background-position: 100% 50%; }
+    100% { background-position: 0% 50%; }
+}
+
+/* Make containers transparent */
+.block-container {
+    background-color: transparent;
+}
+
+/* Improve text readability */
+h1, h2, h3 {
+    color: #1f2937;
+}
+
 /* Card container */
 .ui-card {
     background: rgba(255,255,255,0.9);
@@ -66,12 +103,6 @@ div[role="dialog"] h3 {
     font-size: 20px;
 }
 
-</style>
-""", unsafe_allow_html=True)
-
-st.markdown("""
-<style>
-
 /* Prediction result card */
 .result-card {
     background: rgba(255,255,255,0.92);
@@ -108,52 +139,36 @@ st.markdown("""
     margin-top: 10px;
 }
 
-</style>
-""", unsafe_allow_html=True)
-
-
-# ---------------- BACKGROUND ----------------
-def set_light_earth_background():
-    st.markdown(
-        """
-        <style>
-        .stApp {
-            background: linear-gradient(
-                120deg,
-                #f0f4ff,
-                #f7fbff,
-                #eef7f3
-            );
-            background-size: 400% 400%;
-            animation: gradientBG 12s ease infinite;
-        }
-
-        @keyframes gradientBG {
-            0% { background-position: 0% 50%; }
-            50% { background-position: 100% 50%; }
-            100% { background-position: 0% 50%; }
-        }
-
-        .block-container {
-            background-color: transparent;
-        }
-
-        h1, h2, h3 {
-            color: #1f2937;
-        }
-        </style>
-        """,
-        unsafe_allow_html=True
-    )
-    
-# ---------------- PAGE CONFIG ----------------
-st.set_page_config(
-    page_title="Earthquake Risk Assessment System",
-    layout="wide"
-)
+/* Width control container */
+.main-container {
+    max-width: 200px;
+    margin: auto;
+}
 
-# ✅ Call AFTER definition
-set_light_earth_background()
+</style>
+"""
+
+# One style element per run (Streamlit drops elements a rerun doesn't emit)
+st.markdown(APP_CSS, unsafe_allow_html=True)
+
+
+# ---------------- BACKGROUND PRELOAD ----------------
+@st.cache_resource(show_spinner=False)
+def start_preload():
+    """
+    Import the prediction stack and load the model in a background
+    thread, once per process, while the Home tab renders, so the first
+    prediction after login doesn't pay for it.
+    """
+    def preload():
+        import src.predict as predict
+        predict.registry.get()
+        from src.event_index import event_index
+        event_index()
+
+    thread = threading.Thread(target=preload, name="preload", daemon=True)
+    thread.start()
+    return thread
 
 # ---------------- SESSION STATE ----------------
 if "logged_in" not in st.session_state:
@@ -165,20 +180,10 @@ if "username" not in st.session_state:
 if "page" not in st.session_state:
     st.session_state.page = "Login"
 
-# ---------------- USER CSV HANDLING ----------------
-def load_users():
-    if not os.path.exists("users.csv"):
-        df = pd.DataFrame(columns=["username", "password"])
-        df.to_csv("users.csv", index=False)
-    return pd.read_csv("users.csv")
-
+# ---------------- USER STORE ----------------
+# SQLite-backed, shared by all sessions; imports users.csv on first run
 def save_user(username, password):
-    df = load_users()
-    if username in df["username"].values:
-        return False
-    df.loc[len(df)] = [username, password]
-    df.to_csv("users.csv", index=False)
-    return True
+    return get_user_store().add_user(username, password)
 
 # ---------------- AUTH PAGES ----------------
 def signup_page():
@@ -207,12 +212,7 @@ def login_page():
     password = st.text_input("Password", type="password")
 
     if st.button("Login"):
-        users = load_users()
-        match = users[
-            (users["username"] == username) &
-            (users["password"] == password)
-        ]
-        if not match.empty:
+        if get_user_store().verify(username, password):
             st.session_state.logged_in = True
             st.session_state.username = username
             st.session_state.page = "Home"
@@ -227,43 +227,6 @@ def logout():
     st.session_state.username = ""
     st.session_state.page = "Login"
 
-def set_light_earth_background():
-    st.markdown(
-        """
-        <style>
-        /* Main app background */
-        .stApp {
-            background: linear-gradient(
-                120deg,
-                #f0f4ff,
-                #f7fbff,
-                #eef7f3
-            );
-            background-size: 400% 400%;
-            animation: gradientBG 12s ease infinite;
-        }
-
-        @keyframes gradientBG {
-            0% { background-position: 0% 50%; }
-            50% { background-position: 100% 50%; }
-            100% { background-position: 0% 50%; }
-        }
-
-        /* Make containers transparent */
-        .block-container {
-            background-color: transparent;
-        }
-
-        /* Improve text readability */
-        h1, h2, h3 {
-            color: #1f2937;
-        }
-        </style>
-        """,
-        unsafe_allow_html=True
-    )
-
-
 # ---------------- AUTH FLOW ----------------
 if not st.session_state.logged_in:
     if st.session_state.page == "Login":
@@ -298,18 +261,6 @@ else:
     st.divider()
 
     # ---------------- WIDTH CONTROL CONTAINER ----------------
-    st.markdown(
-        """
-        <style>
-        .main-container {
-            max-width: 200px;
-            margin: auto;
-        }
-        </style>
-        """,
-        unsafe_allow_html=True
-    )
-
     st.markdown('<div class="main-container">', unsafe_allow_html=True)
 
     page = st.session_state.page
@@ -324,38 +275,23 @@ else:
         # ---------------- HISTORICAL ALERT DISTRIBUTION (LEFT-ALIGNED SMALL CARD) ----------------
         st.subheader("📊 Alert Distribution")
 
-        # Load dataset
-        data = pd.read_csv("usgs_earthquake_realistic_1000.csv")
-        alert_counts = data["alert"].value_counts()
+        # Shared, per-dataset-version aggregates and pre-rendered chart
+        from src.dashboard_data import home_aggregates
+        home = home_aggregates("usgs_earthquake_realistic_1000.csv")
 
         # Use columns to left-align the card
         left_col, spacer = st.columns([1, 3])  # left column small, spacer takes rest
 
         with left_col:
-            fig, ax = plt.subplots(figsize=(2.5, 1.8))  # very small, card-size
-            colors = {
-                "green": "#4caf50",
-                "yellow": "#ffeb3b",
-                "orange": "#ff9800",
-                "red": "#f44336"
-            }
-            bar_colors = [colors.get(alert.lower(), "#607d8b") for alert in alert_counts.index]
-            ax.bar(alert_counts.index, alert_counts.values, color=bar_colors)
-            ax.set_title("Alert Levels", fontsize=9)
-            ax.set_ylabel("Count", fontsize=7)
-            ax.set_xlabel("", fontsize=7)
-            ax.tick_params(axis='x', labelsize=7)
-            ax.tick_params(axis='y', labelsize=7)
-            ax.grid(False)  # remove grid for clean card look
-            st.pyplot(fig, use_container_width=False)  # keep small width
+            st.image(home.chart_png, width=250)  # keep small width
 
         st.markdown("---")
 
         # ---------------- QUICK STATISTICS ----------------
         st.subheader("📈 Quick Earthquake Stats")
-        total_quakes = len(data)
-        high_risk_quakes = len(data[data["alert"].isin(["orange", "red"])])
-        most_common_alert = alert_counts.idxmax()
+        total_quakes = home.total_quakes
+        high_risk_quakes = home.high_risk_quakes
+        most_common_alert = home.most_common_alert
 
         c1, c2, c3 = st.columns(3)
 
@@ -454,6 +390,11 @@ else:
         mmi = st.number_input("MMI", 0.0, 10.0, 5.0)
         sig = st.number_input("SIG", 0.0, 1000.0, 100.0)
 
+        with st.expander("📍 Location (optional)"):
+            latitude = st.number_input("Latitude", -90.0, 90.0, 35.0)
+            longitude = st.number_input("Longitude", -180.0, 180.0, 139.0)
+            use_location = st.checkbox("Show past events near this location")
+
         # ✅ Initialize variables (VERY IMPORTANT)
         alert = None
         risk = None
@@ -461,6 +402,8 @@ else:
         aftershock = None
 
         if st.button("🚨 Predict Alert"):
+            # Usually already imported and loaded by start_preload()
+            from src.predict import predict_alert
             alert, risk, confidence, aftershock = predict_alert(
                 magnitude, depth, cdi, mmi, sig
             )
@@ -489,6 +432,48 @@ else:
                 st.warning("🟠 ORANGE ALERT – High risk")
             elif alert.lower() == "red":
                 st.error("🔴 RED ALERT – Severe risk")
+
+            # ---------------- WHY THIS ALERT ----------------
+            from src.predict import explain_alert
+            try:
+                breakdown = explain_alert(magnitude, depth, cdi, mmi, sig)
+            except ValueError:
+                breakdown = None
+
+            if breakdown is not None:
+                st.markdown("#### 🧩 Why this alert?")
+                # Predicted level and the runner-up, biggest drivers first
+                top = breakdown.iloc[:, :2]
+                inputs = top.drop(index="base")
+                inputs = inputs.loc[inputs.iloc[:, 0].abs().sort_values(ascending=False).index]
+                st.dataframe(
+                    inputs.style.format("{:+.1f} pts"),
+                    width="stretch"
+                )
+                st.caption(
+                    f"Percentage-point push of each input toward {top.columns[0]} "
+                    f"and {top.columns[1]}, starting from a base of "
+                    f"{top.loc['base'].iloc[0]:.1f} / {top.loc['base'].iloc[1]:.1f}."
+                )
+
+            # ---------------- SIMILAR PAST EVENTS ----------------
+            # Index built once per catalog version, memory-mapped afterwards
+            import pandas as pd
+            from src.event_index import event_index
+            history = event_index()
+            shown = ["magnitude", "depth", "cdi", "mmi", "sig", "alert"]
+
+            st.markdown("#### 📚 Most similar past events")
+            similar = history.nearest((magnitude, depth, cdi, mmi, sig), k=5)
+            st.dataframe(similar[shown], hide_index=True, width="stretch")
+
+            if use_location and history.has_positions:
+                st.markdown("#### 🗺️ Nearest past events")
+                nearby = history.nearest_geo(latitude, longitude, k=5)
+                nearby["date"] = pd.to_datetime(nearby["time"], unit="ms").dt.date
+                nearby["distance_km"] = nearby["distance_km"].round(0)
+                st.dataframe(nearby[["date", "distance_km", "latitude", "longitude"] + shown],
+                             hide_index=True, width="stretch")
         else:
             st.info("👆 Enter values and click **Predict Alert** to see the risk assessment.")
 
@@ -593,3 +578,5 @@ else:
             st.success("✅ Logged out successfully")
             st.rerun()
 
+    # After the page is drawn, so it doesn't compete with the first render
+    start_preload()
@@ -0,0 +1,59 @@
+# bench_aftershock.py
+# ETAS Monte Carlo in src/aftershock.py: simulated sequences per second
+# by mainshock magnitude, in-process and across a process pool; the
+# spread of the estimate (Wilson band width) against the number of
+# sequences; and the cached fast path for a repeated input.
+#
+#   python -m benchmarks.bench_aftershock --sims 20000 --workers 4
+import os
+import time
+import argparse
+
+import numpy as np
+
+from src.aftershock import AftershockModel
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ETAS aftershock simulation throughput")
+    parser.add_argument("--magnitudes", type=float, nargs="+", default=[5.0, 6.5, 7.5, 8.5])
+    parser.add_argument("--depth", type=float, default=10.0)
+    parser.add_argument("--sims", type=int, default=20_000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--days", type=float, default=7.0)
+    args = parser.parse_args()
+
+    worker_counts = sorted({1, args.workers})
+    print(f"{'magnitude':>9s} {'P(M>=5, 7d)':>12s} {'band':>15s} "
+          + " ".join(f"{f'sims/s x{w}':>12s}" for w in worker_counts))
+    for magnitude in args.magnitudes:
+        rates = []
+        for workers in worker_counts:
+            model = AftershockModel(n_sims=args.sims, days=args.days, workers=workers)
+            start = time.perf_counter()
+            result = model.forecast(magnitude, args.depth)
+            rates.append(args.sims / (time.perf_counter() - start))
+        band = f"[{result['lower']:.3f}, {result['upper']:.3f}]"
+        print(f"{magnitude:9.1f} {result['probability']:12.3f} {band:>15s} "
+              + " ".join(f"{rate:12,.0f}" for rate in rates))
+
+    print("\nband width for M6.5 by number of sequences")
+    for sims in (500, 2000, 10_000, 50_000):
+        result = AftershockModel(n_sims=sims, workers=1).forecast(6.5, args.depth)
+        print(f"  {sims:7,d}: {result['upper'] - result['lower']:.4f}")
+
+    model = AftershockModel(n_sims=2000, workers=1)
+    start = time.perf_counter()
+    model.forecast(6.5, args.depth)
+    cold = time.perf_counter() - start
+    samples = []
+    for _ in range(1000):
+        start = time.perf_counter()
+        model.forecast(6.5, args.depth)
+        samples.append(time.perf_counter() - start)
+    print(f"\nforecast(6.5) with 2,000 sequences: {cold * 1000:.1f} ms, "
+          f"cached {np.median(samples) * 1e6:.1f} us")
+
+
+if __name__ == "__main__":
+    main()
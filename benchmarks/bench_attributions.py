@@ -0,0 +1,82 @@
+# bench_attributions.py
+# Cost of per-feature attributions (tree-path decomposition, see
+# CompiledForest.contributions) relative to plain predict_proba on the
+# same compiled engine, per row across batch sizes; then the public
+# predict.explain_batch vs predict_batch, and explain_alert cold vs
+# cached, including an event with missing inputs.
+#
+#   python -m benchmarks.bench_attributions --max-ratio 6
+#
+# Exits with status 1 if any engine-level ratio is above --max-ratio, or
+# if an explanation of the event with missing inputs doesn't add up to
+# predict_alert's confidence.
+import sys
+import time
+import argparse
+
+import numpy as np
+
+import src.predict as predict
+from benchmarks.suite import random_events
+
+
+def best_seconds(fn, rounds):
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Feature attribution cost vs predict_proba")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 64, 1024, 16384])
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--max-ratio", type=float, default=6.0,
+                        help="Allowed attribution / predict_proba time per row")
+    args = parser.parse_args()
+
+    current = predict.registry.get()
+    engine = current.engine
+    if engine is None:
+        sys.exit("The model could not be compiled; attributions need the compiled engine")
+
+    print(f"{'rows':>7s} {'proba us/row':>13s} {'explain us/row':>15s} {'ratio':>6s}")
+    worst = 0.0
+    for rows in args.sizes:
+        X = random_events(rows, seed=rows).to_numpy()
+        prepared = engine.prepare(X)
+        proba = best_seconds(lambda: engine.predict_proba(prepared, prepared=True), args.rounds)
+        explain = best_seconds(lambda: engine.contributions(prepared, prepared=True), args.rounds)
+        worst = max(worst, explain / proba)
+        print(f"{rows:7,d} {proba / rows * 1e6:13.2f} {explain / rows * 1e6:15.2f} "
+              f"{explain / proba:6.2f}")
+
+    frame = random_events(args.sizes[-1], seed=1)
+    batch = best_seconds(lambda: predict.predict_batch(data=frame), args.rounds)
+    explained = best_seconds(lambda: predict.explain_batch(data=frame), args.rounds)
+    print(f"\npredict_batch({len(frame):,}) {batch * 1000:.1f} ms, "
+          f"explain_batch {explained * 1000:.1f} ms ({explained / batch:.2f}x)")
+
+    predict.explanations.clear()
+    values = tuple(random_events(1, seed=2).to_numpy()[0])
+    cold = best_seconds(lambda: predict.explain_alert(*values), 1)
+    warm = best_seconds(lambda: predict.explain_alert(*values), args.rounds)
+    print(f"explain_alert cold {cold * 1e6:.0f} us, cached {warm * 1e6:.0f} us")
+
+    # Missing depth and mmi: imputed by the model, explained like any input
+    values = values[:1] + (np.nan,) + values[2:3] + (np.nan,) + values[4:]
+    confidence = predict.predict_alert(*values)[2]
+    totals = [predict.explain_alert(*values).iloc[:, 0].sum() for _ in range(2)]
+    adds_up = all(abs(total - confidence) < 0.05 + 1e-9 for total in totals)
+    print(f"explain_alert with missing inputs: {totals[0]:.1f} pp vs confidence "
+          f"{confidence:.1f}: {'ok' if adds_up else 'FAIL'}")
+
+    print(f"\nworst ratio {worst:.2f} (budget {args.max_ratio:.1f}): "
+          f"{'FAIL' if worst > args.max_ratio else 'ok'}")
+    sys.exit(1 if worst > args.max_ratio or not adds_up else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+# bench_columnar.py
+# Column store (src/columnar.py) vs pd.read_csv on generated catalogs:
+# time to get a DataFrame, and the same plus one pass over the model
+# inputs (which pages the mapped columns in), with resident memory. Each
+# measurement runs in a fresh subprocess so its RSS is isolated.
+#
+#   python -m benchmarks.bench_columnar --rows 100000 1000000 5000000
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+
+from generate_usgs_dataset import generate
+from src.columnar import convert
+
+# Child process: load one way, make one pass over the inputs, print
+# {"load_s", "total_s", "rss", "baseline_rss"}. Current RSS, not
+# ru_maxrss: a child inherits its parent's peak across fork.
+CHILD = r"""
+import sys, json, time
+sys.path.insert(0, ".")
+import numpy as np
+import pandas as pd
+from src.columnar import ColumnStore
+from src.features import FEATURES
+from src.utils import rss_bytes
+mode, path = sys.argv[1], sys.argv[2]
+columns = FEATURES + ["alert"] if mode.endswith("columns") else None
+baseline = rss_bytes()
+
+start = time.perf_counter()
+if mode.startswith("read_csv"):
+    df = pd.read_csv(path, usecols=columns)
+else:
+    df = ColumnStore.open(path).to_frame(columns)
+load = time.perf_counter() - start
+total = sum(float(df[name].to_numpy().sum()) for name in FEATURES)
+done = time.perf_counter()
+print(json.dumps({"load_s": load, "total_s": done - start, "baseline_rss": baseline,
+                  "rss": rss_bytes()}))
+"""
+
+MODES = ["read_csv", "read_csv columns", "store", "store columns"]
+
+
+def run(mode, path):
+    out = subprocess.run([sys.executable, "-W", "ignore", "-c", CHILD, mode, path],
+                         capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Column store vs CSV load time and RSS")
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000, 1_000_000])
+    args = parser.parse_args()
+
+    # RSS: growth over the interpreter with numpy and pandas imported,
+    # after the pass; mapped pages count once touched but stay reclaimable
+    print(f"{'rows':>10s} {'mode':>17s} {'load ms':>9s} {'+ pass ms':>10s} {'RSS MB':>8s}")
+    for rows in args.rows:
+        with tempfile.TemporaryDirectory() as tmp:
+            csv_path = os.path.join(tmp, "catalog.csv")
+            generate(rows, csv_path, workers=1)
+            start = time.perf_counter()
+            store = convert(csv_path)
+            converted = time.perf_counter() - start
+
+            for mode in MODES:
+                result = run(mode, store if mode.startswith("store") else csv_path)
+                rss = (result["rss"] - result["baseline_rss"]) / 2**20
+                print(f"{rows:10,d} {mode:>17s} {result['load_s'] * 1000:9.1f} "
+                      f"{result['total_s'] * 1000:10.1f} {rss:8.0f}")
+            print(f"{'':10s} {'(convert once)':>17s} {converted * 1000:9.0f}")
+
+
+if __name__ == "__main__":
+    main()
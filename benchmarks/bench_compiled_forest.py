@@ -0,0 +1,79 @@
+# bench_compiled_forest.py
+# Compare sklearn predict_proba against the compiled NumPy engine.
+#
+#   python -m benchmarks.bench_compiled_forest
+import time
+import argparse
+
+import numpy as np
+import pandas as pd
+import joblib
+
+from src.compiled_forest import compile_forest
+
+FEATURES = ["magnitude", "depth", "cdi", "mmi", "sig"]
+
+
+def random_events(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "magnitude": rng.uniform(0, 10, n),
+        "depth": rng.uniform(0, 700, n),
+        "cdi": rng.uniform(0, 10, n),
+        "mmi": rng.uniform(0, 10, n),
+        "sig": rng.uniform(0, 1000, n)
+    })
+
+
+def latency(fn, repeats):
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return np.percentile(samples, [50, 99]) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compiled forest vs sklearn predict_proba")
+    parser.add_argument("--model", default="models/best_model.pkl")
+    parser.add_argument("--repeats", type=int, default=300)
+    args = parser.parse_args()
+
+    model = joblib.load(args.model)
+
+    start = time.perf_counter()
+    engine = compile_forest(model)
+    print(f"Compiled {engine.n_estimators} trees / {engine.n_nodes} nodes "
+          f"in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    # ---------------- CORRECTNESS ----------------
+    check = random_events(10000, seed=1)
+    check.iloc[::11, 2] = np.nan
+    identical = np.array_equal(model.predict_proba(check), engine.predict_proba(check))
+    print("Bit-for-bit match with predict_proba:", identical)
+
+    # ---------------- SINGLE-EVENT LATENCY ----------------
+    row_df = random_events(1, seed=2)
+    row = row_df.to_numpy()
+    sk_p50, sk_p99 = latency(lambda: model.predict_proba(row_df), args.repeats)
+    cf_p50, cf_p99 = latency(lambda: engine.predict_proba(row), args.repeats)
+
+    print("\nSingle event (ms)     p50      p99")
+    print(f"sklearn pipeline   {sk_p50:7.3f}  {sk_p99:7.3f}")
+    print(f"compiled engine    {cf_p50:7.3f}  {cf_p99:7.3f}")
+    print(f"speedup            {sk_p50 / cf_p50:6.1f}x  {sk_p99 / cf_p99:6.1f}x")
+
+    # ---------------- BATCH THROUGHPUT ----------------
+    print("\nBatch size   sklearn rows/s   compiled rows/s")
+    for size in (16, 64, 256, 1024, 8192):
+        batch_df = random_events(size, seed=3)
+        batch = batch_df.to_numpy()
+        repeats = max(3, 2000 // size)
+        sk = latency(lambda: model.predict_proba(batch_df), repeats)[0] / 1000
+        cf = latency(lambda: engine.predict_proba(batch), repeats)[0] / 1000
+        print(f"{size:10d}   {size / sk:14,.0f}   {size / cf:15,.0f}")
+
+
+if __name__ == "__main__":
+    main()
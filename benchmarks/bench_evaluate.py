@@ -0,0 +1,95 @@
+# bench_evaluate.py
+# src/evaluate_model.py on large synthetic catalogs: streaming scoring
+# throughput and peak RSS (bounded by the chunk size, not the catalog),
+# then bootstrap time for cell-count resampling versus the textbook
+# approach of resampling row indices and recomputing the metrics.
+#
+#   python -m benchmarks.bench_evaluate --rows 1000000 --workers 4
+import os
+import time
+import argparse
+import tempfile
+import threading
+
+import numpy as np
+from sklearn.metrics import f1_score
+
+from generate_usgs_dataset import generate
+from src.evaluate_model import stream_evaluate, bootstrap
+from src.utils import rss_bytes
+
+
+class RssSampler:
+    """
+    Highest RSS of this process seen while the block runs.
+    """
+
+    def __enter__(self):
+        self.peak = rss_bytes()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop.wait(0.02):
+            self.peak = max(self.peak, rss_bytes())
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def index_bootstrap_seconds(acc, replicates, seed=0):
+    """
+    Seconds per replicate when resampling row indices: rebuild per-row
+    labels from the counts, draw N indices, recompute weighted F1.
+    """
+    K, B = acc.n_classes, acc.n_bins
+    cells = np.repeat(np.arange(len(acc.cells)), acc.cells)
+    y_true = cells // B // K
+    y_pred = cells // B % K
+    rng = np.random.default_rng(seed)
+
+    start = time.perf_counter()
+    for _ in range(replicates):
+        idx = rng.integers(0, len(cells), len(cells))
+        f1_score(y_true[idx], y_pred[idx], average="weighted")
+    return (time.perf_counter() - start) / replicates
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Streaming evaluation and bootstrap cost")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000_000])
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--chunk-size", type=int, default=250_000)
+    parser.add_argument("--replicates", type=int, default=1000)
+    parser.add_argument("--index-replicates", type=int, default=5,
+                        help="Replicates timed for the row-index baseline")
+    args = parser.parse_args()
+
+    # peak MB: RSS of this process while streaming (workers add their own)
+    print(f"{'rows':>11s} {'score s':>8s} {'rows/s':>10s} {'peak MB':>8s} "
+          f"{'boot s':>7s} {'index boot s (est.)':>20s}")
+    for rows in args.rows:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "catalog.csv")
+            generate(rows, path, workers=args.workers)
+
+            start = time.perf_counter()
+            with RssSampler() as rss:
+                acc, _, _ = stream_evaluate(path, chunk_size=args.chunk_size,
+                                            workers=args.workers, log=open(os.devnull, "w"))
+            scoring = time.perf_counter() - start
+
+            start = time.perf_counter()
+            bootstrap(acc, args.replicates, workers=args.workers or os.cpu_count())
+            boot = time.perf_counter() - start
+            per_index = index_bootstrap_seconds(acc, args.index_replicates)
+
+            print(f"{rows:11,d} {scoring:8.1f} {rows / scoring:10,.0f} {rss.peak / 2**20:8.0f} "
+                  f"{boot:7.2f} {per_index * args.replicates:20.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+# bench_event_index.py
+# src/event_index.py on synthetic catalogs: build time, on-disk size,
+# memory-mapped load time, and per-query latency (p50/p99) for feature
+# k-NN, geographic k-NN, radius + time-window and pure time-window
+# queries, next to a brute-force scan of the same catalog.
+#
+#   python -m benchmarks.bench_event_index --rows 100000 1000000
+import os
+import time
+import argparse
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from generate_usgs_dataset import generate, TIME_START_MS, TIME_END_MS
+from src.event_index import EventIndex, event_index, haversine_km
+from src.features import FEATURES
+
+YEAR_MS = 365 * 24 * 3600 * 1000
+
+
+def latencies_us(fn, queries):
+    samples = []
+    for query in queries:
+        start = time.perf_counter()
+        fn(*query)
+        samples.append(time.perf_counter() - start)
+    samples = np.asarray(samples) * 1e6
+    return np.percentile(samples, 50), np.percentile(samples, 99)
+
+
+def directory_bytes(path):
+    return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Nearest-event index build and query cost")
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("-k", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    for rows in args.rows:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "catalog.parquet")
+            generate(rows, path, workers=1)
+
+            start = time.perf_counter()
+            index = event_index(path, os.path.join(tmp, "index"))
+            build = time.perf_counter() - start
+            directory = os.path.join(tmp, "index", index.version)
+            start = time.perf_counter()
+            index = EventIndex.load(directory)
+            load = time.perf_counter() - start
+
+            print(f"{rows:,} events: build {build:.1f} s, "
+                  f"{directory_bytes(directory) / 2**20:.0f} MB on disk, load {load * 1000:.1f} ms")
+
+            features = [(rng.uniform([4, 5, 0, 1, 0], [9.2, 700, 10, 10, 1800]),)
+                        for _ in range(args.queries)]
+            points = [(rng.uniform(-60, 60), rng.uniform(-180, 180)) for _ in range(args.queries)]
+            windows = [(lat, lon, 200, t, t + YEAR_MS) for (lat, lon), t in
+                       zip(points, rng.integers(TIME_START_MS, TIME_END_MS - YEAR_MS, args.queries))]
+            spans = [(t, t + YEAR_MS // 52) for _, _, _, t, _ in windows]
+
+            cases = [
+                ("feature k-NN", lambda q: index.nearest(q, args.k), features),
+                ("geo k-NN", lambda lat, lon: index.nearest_geo(lat, lon, args.k), points),
+                ("200 km, 1 year", index.within, windows),
+                ("1 week", lambda s, e: index.between(s, e, limit=1000), spans),
+            ]
+
+            df = pd.read_parquet(path)
+            X = ((df[FEATURES].to_numpy() - index._center) / index._scale).astype(np.float32)
+            lat, lon = df["latitude"].to_numpy(), df["longitude"].to_numpy()
+            brute = {
+                "feature k-NN": lambda q: np.argpartition(
+                    ((X - (q - index._center) / index._scale) ** 2).sum(axis=1), args.k)[:args.k],
+                "geo k-NN": lambda a, b: np.argpartition(haversine_km(a, b, lat, lon), args.k)[:args.k],
+            }
+
+            print(f"  {'query':16s} {'p50 us':>9s} {'p99 us':>9s} {'scan p50 us':>12s}")
+            for name, fn, queries in cases:
+                p50, p99 = latencies_us(fn, queries)
+                scan = ""
+                if name in brute:
+                    scan = f"{latencies_us(brute[name], queries[:20])[0]:12.0f}"
+                print(f"  {name:16s} {p50:9.0f} {p99:9.0f} {scan}")
+
+
+if __name__ == "__main__":
+    main()
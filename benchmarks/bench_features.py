@@ -0,0 +1,48 @@
+# bench_features.py
+# Feature-build time on large synthetic catalogs: derived columns with
+# NumPy, a full load without the cache, the first cached load (parse +
+# write) and a repeated cached load (what later training runs pay).
+#
+#   python -m benchmarks.bench_features --rows 1000000 5000000
+import os
+import time
+import argparse
+import tempfile
+
+import numpy as np
+
+from generate_usgs_dataset import generate
+from src.features import FEATURES, add_derived, load_features, read_catalog
+
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Feature build time, cached vs uncached")
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000, 1_000_000])
+    args = parser.parse_args()
+
+    print(f"{'rows':>10s} {'derive s':>9s} {'no cache s':>11s} {'cold s':>8s} "
+          f"{'warm s':>8s} {'speedup':>8s}")
+    for rows in args.rows:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "catalog.csv")
+            generate(rows, path, workers=1)
+            cache_dir = os.path.join(tmp, "features")
+
+            X = read_catalog(path)[FEATURES].to_numpy(dtype=np.float64)
+            _, derive = timed(add_derived, X)
+            _, uncached = timed(load_features, path, None)
+            _, cold = timed(load_features, path, cache_dir)
+            _, warm = timed(load_features, path, cache_dir)
+
+            print(f"{rows:10,d} {derive:9.3f} {uncached:11.3f} {cold:8.3f} "
+                  f"{warm:8.3f} {uncached / warm:7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
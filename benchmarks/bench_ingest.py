@@ -0,0 +1,97 @@
+# bench_ingest.py
+# Burst test for src/ingest.py: push a burst of USGS-style GeoJSON
+# messages (a share of them revisions of earlier events, some repeated
+# verbatim) through the pipeline as fast as the bounded queue accepts
+# them, and report throughput and receipt-to-alert latency.
+#
+#   python -m benchmarks.bench_ingest --events 20000 --revisions 0.3
+import time
+import json
+import asyncio
+import argparse
+
+import numpy as np
+
+from src.ingest import IngestPipeline, from_queue
+
+
+def make_messages(n, revisions, seed=0):
+    """
+    GeoJSON Feature lines. Revisions reuse an earlier id with a later
+    `updated` and perturbed values; 5% are exact resends (duplicates).
+    """
+    rng = np.random.default_rng(seed)
+    messages = []
+    for i in range(n):
+        if messages and rng.random() < revisions:
+            base = json.loads(messages[rng.integers(len(messages))])
+            if rng.random() >= 0.05 / max(revisions, 1e-9):
+                props = base["properties"]
+                props["updated"] += int(rng.integers(1, 600_000))
+                props["mag"] = round(min(9.5, max(4.0, props["mag"] + rng.normal(0, 0.3))), 2)
+                props["mmi"] = round(min(10.0, max(1.0, props["mmi"] + rng.normal(0, 1.0))), 2)
+            messages.append(json.dumps(base))
+            continue
+        messages.append(json.dumps({
+            "type": "Feature",
+            "id": f"bench{i:07d}",
+            "properties": {
+                "mag": round(rng.uniform(4.0, 9.2), 2),
+                "cdi": round(rng.uniform(0, 10), 2),
+                "mmi": round(rng.uniform(1, 10), 2),
+                "sig": round(rng.uniform(0, 1000), 1),
+                "updated": 1_700_000_000_000 + i
+            },
+            "geometry": {"type": "Point",
+                         "coordinates": [0.0, 0.0, round(rng.uniform(5, 700), 1)]}
+        }))
+    return messages
+
+
+async def run(messages, max_batch, max_wait, queue_size):
+    latencies = []
+
+    async def emit(change):
+        latencies.append(change["latency_ms"])
+
+    source = asyncio.Queue(queue_size)
+    pipeline = IngestPipeline(emit, max_batch=max_batch, max_wait=max_wait,
+                              queue_size=queue_size)
+
+    async def produce():
+        for message in messages:
+            await source.put(message)
+        await source.put(None)
+
+    start = time.perf_counter()
+    await asyncio.gather(pipeline.run(from_queue(source)), produce())
+    elapsed = time.perf_counter() - start
+    return pipeline.metrics(), np.array(latencies), elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingestion pipeline burst latency")
+    parser.add_argument("--events", type=int, default=20_000)
+    parser.add_argument("--revisions", type=float, default=0.3,
+                        help="Share of messages that revise an earlier event")
+    parser.add_argument("--max-batch", type=int, nargs="+", default=[1, 64, 256])
+    parser.add_argument("--max-wait-ms", type=float, default=5.0)
+    parser.add_argument("--queue-size", type=int, default=1024)
+    args = parser.parse_args()
+
+    messages = make_messages(args.events, args.revisions)
+
+    print(f"{'max_batch':>9s} {'events/s':>9s} {'scored':>7s} {'dups':>6s} {'emitted':>8s} "
+          f"{'p50 ms':>7s} {'p99 ms':>7s} {'max ms':>7s} {'mean batch':>10s}")
+    for max_batch in args.max_batch:
+        metrics, latencies, elapsed = asyncio.run(
+            run(messages, max_batch, args.max_wait_ms / 1000, args.queue_size)
+        )
+        print(f"{max_batch:9d} {len(messages) / elapsed:9.0f} {metrics['scored']:7d} "
+              f"{metrics['duplicates']:6d} {metrics['emitted']:8d} "
+              f"{np.percentile(latencies, 50):7.1f} {np.percentile(latencies, 99):7.1f} "
+              f"{latencies.max():7.1f} {metrics['batch_size']['mean']:10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+# bench_instrumentation.py
+# Cost of the stage timers in src/metrics.py on the prediction hot path:
+# predict_alert and predict_batch with recording on vs off (alternating
+# blocks, best of each), the raw cost of one Stage.observe, and what an
+# active cProfile session costs while it runs.
+#
+#   python -m benchmarks.bench_instrumentation --calls 5000
+import time
+import argparse
+
+import numpy as np
+
+import src.predict as predict
+from src import metrics
+from benchmarks.suite import random_events
+
+
+def per_call_us(fn, rows):
+    start = time.perf_counter()
+    for row in rows:
+        fn(*row)
+    return (time.perf_counter() - start) / len(rows) * 1e6
+
+
+def measure_overhead(calls=5000, rounds=5, batch_rows=1000):
+    """
+    Best-of-rounds microseconds per predict_alert call and per
+    predict_batch(batch_rows) call, instrumented and not.
+    """
+    predict.disable_cache()
+    predict.disable_table()
+    rows = random_events(calls, seed=7).to_numpy()
+    frame = random_events(batch_rows, seed=8)
+    per_call_us(predict.predict_alert, rows[:200])
+
+    timings = {"alert_on": [], "alert_off": [], "batch_on": [], "batch_off": []}
+    for _ in range(rounds):
+        for flag in (True, False):
+            metrics.set_enabled(flag)
+            suffix = "on" if flag else "off"
+            timings[f"alert_{suffix}"].append(per_call_us(predict.predict_alert, rows))
+            start = time.perf_counter()
+            for _ in range(20):
+                predict.predict_batch(data=frame)
+            timings[f"batch_{suffix}"].append((time.perf_counter() - start) / 20 * 1e6)
+    metrics.set_enabled(True)
+    return {name: min(values) for name, values in timings.items()}
+
+
+def observe_cost_ns(n=200_000):
+    stage = metrics.stage("bench.observe")
+    clock = time.perf_counter
+    start = clock()
+    for _ in range(n):
+        t = clock()
+        stage.observe(clock() - t)
+    return (clock() - start) / n * 1e9
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stage-timer overhead on the prediction path")
+    parser.add_argument("--calls", type=int, default=5000)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--batch-rows", type=int, default=1000)
+    args = parser.parse_args()
+
+    t = measure_overhead(args.calls, args.rounds, args.batch_rows)
+    print(f"one timed stage (2x perf_counter + observe): {observe_cost_ns():.0f} ns")
+    for name, label in (("alert", "predict_alert"), ("batch", f"predict_batch({args.batch_rows})")):
+        on, off = t[f"{name}_on"], t[f"{name}_off"]
+        print(f"{label:22s} off {off:9.1f} us  on {on:9.1f} us  "
+              f"overhead {on - off:+7.2f} us ({(on - off) / off:+.1%})")
+
+    rows = random_events(min(args.calls, 1000), seed=9).to_numpy()
+    metrics.start_profile()
+    profiled = per_call_us(predict.predict_alert, rows)
+    metrics.stop_profile()
+    plain = per_call_us(predict.predict_alert, rows)
+    print(f"predict_alert under an active cProfile session: {profiled:.1f} us "
+          f"({profiled / plain:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
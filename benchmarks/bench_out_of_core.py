@@ -0,0 +1,112 @@
+# bench_out_of_core.py
+# Peak RSS and wall time of in-memory vs out-of-core training on
+# generated catalogs of increasing size, with the number of distinct
+# binned cells and held-out F1. Each run is a fresh subprocess so its
+# peak RSS is measured in isolation. Comparing sizes shows how memory
+# scales: out-of-core cells grow with rows until the bin grid fills up
+# (at most n_classes * max_bins**5), then stop.
+#
+#   python -m benchmarks.bench_out_of_core --sizes 10000 100000 1000000
+import os
+import sys
+import json
+import argparse
+import tempfile
+import subprocess
+
+import numpy as np
+import pandas as pd
+
+# Child process: train one way and print {"seconds", "peak_rss"}. Peak
+# from VmHWM, which starts fresh at exec; ru_maxrss would carry over the
+# parent's peak.
+CHILD = r"""
+import sys, json, time, resource
+sys.path.insert(0, ".")
+
+def peak_rss():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+mode, path, max_bins = sys.argv[1], sys.argv[2], int(sys.argv[3])
+start = time.perf_counter()
+result = {}
+if mode == "in-memory":
+    import pandas as pd
+    from src.train_model import build_pipeline, split_data
+    from sklearn.preprocessing import LabelEncoder
+    from src.features import FEATURES
+    df = pd.read_csv(path)
+    X = df[FEATURES]
+    y = LabelEncoder().fit_transform(df["alert"])
+    X_train, X_test, y_train, y_test = split_data(X, y)
+    build_pipeline(n_estimators=200, max_depth=15, min_samples_split=5, n_jobs=-1).fit(X_train, y_train)
+else:
+    from src.out_of_core import train_out_of_core
+    _, _, report = train_out_of_core(path, chunk_size=250_000, max_bins=max_bins)
+    result = {"cells": report["train_cells"], "f1": report["test_f1_weighted"]}
+print(json.dumps({**result, "seconds": time.perf_counter() - start, "peak_rss": peak_rss()}))
+"""
+
+
+def write_catalog(path, rows, seed=42, chunk=1_000_000):
+    rng = np.random.default_rng(seed)
+    header = True
+    for start in range(0, rows, chunk):
+        n = min(chunk, rows - start)
+        df = pd.DataFrame({
+            "magnitude": np.round(rng.uniform(4.0, 9.2, n), 2),
+            "depth": np.round(rng.uniform(5, 700, n), 1),
+            "cdi": np.round(rng.uniform(0, 10, n), 2),
+            "mmi": np.round(rng.uniform(1, 10, n), 2),
+            "sig": np.round(rng.uniform(0, 1800, n), 1)
+        })
+        df["alert"] = np.select(
+            [(df.magnitude >= 7.5) | (df.mmi >= 8),
+             (df.magnitude >= 6.5) | (df.mmi >= 6),
+             (df.magnitude >= 5.5) | (df.mmi >= 4)],
+            ["red", "orange", "yellow"], "green"
+        )
+        df.to_csv(path, mode="w" if header else "a", header=header, index=False)
+        header = False
+
+
+def run(mode, path, max_bins):
+    out = subprocess.run([sys.executable, "-W", "ignore", "-c", CHILD, mode, path, str(max_bins)],
+                         capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="In-memory vs out-of-core training")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--max-bins", type=int, nargs="+", default=[256, 16, 8],
+                        help="Bin counts to try; fewer bins -> fewer distinct cells")
+    args = parser.parse_args()
+
+    print(f"{'rows':>10s} {'mode':>16s} {'cells':>10s} {'cells/row':>10s} {'f1':>6s} "
+          f"{'seconds':>9s} {'peak RSS MB':>12s}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in args.sizes:
+            path = os.path.join(tmp, f"catalog_{rows}.csv")
+            write_catalog(path, rows)
+            runs = [("in-memory", 0)] + [("out-of-core", bins) for bins in args.max_bins]
+            for mode, max_bins in runs:
+                result = run(mode, path, max_bins)
+                label = mode if not max_bins else f"{mode}/{max_bins}"
+                cells = f"{result['cells']:,}" if "cells" in result else "-"
+                per_row = f"{result['cells'] / rows:.3f}" if "cells" in result else "-"
+                f1 = f"{result['f1']:.3f}" if "f1" in result else "-"
+                print(f"{rows:10,d} {label:>16s} {cells:>10s} {per_row:>10s} {f1:>6s} "
+                      f"{result['seconds']:9.1f} {result['peak_rss'] / 2**20:12.0f}")
+            os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+# bench_prediction_cache.py
+# Replay a polling-style stream of near-duplicate events through
+# predict_alert with the cache at several precisions, and report hit rate,
+# speedup and how often the cached alert differs from the exact one, then
+# check that events with missing inputs get the same answer cached or not.
+#
+#   python -m benchmarks.bench_prediction_cache
+import sys
+import time
+import argparse
+
+import numpy as np
+
+import src.predict as predict
+from src.prediction_cache import DEFAULT_PRECISION
+
+
+def event_stream(n, distinct, jitter, seed=0):
+    """
+    n events drawn from `distinct` base events plus small revisions.
+    """
+    rng = np.random.default_rng(seed)
+    base = np.column_stack([
+        rng.uniform(4.0, 9.2, distinct),
+        rng.uniform(5, 700, distinct),
+        rng.uniform(0, 10, distinct),
+        rng.uniform(1, 10, distinct),
+        rng.uniform(0, 1000, distinct)
+    ])
+    picks = base[rng.integers(0, distinct, n)]
+    noise = rng.normal(0, 1, picks.shape) * np.array([0.01, 0.1, 0.01, 0.01, 0.1]) * jitter
+    return picks + noise
+
+
+def replay(events):
+    start = time.perf_counter()
+    results = [predict.predict_alert(*row) for row in events]
+    return results, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prediction cache hit rate vs accuracy drift")
+    parser.add_argument("--events", type=int, default=5000)
+    parser.add_argument("--distinct", type=int, default=500)
+    parser.add_argument("--jitter", type=float, default=0.5,
+                        help="Revision noise, in units of the default precision")
+    args = parser.parse_args()
+
+    events = event_stream(args.events, args.distinct, args.jitter)
+
+    predict.disable_cache()
+    predict.registry.get()
+    exact, exact_seconds = replay(events)
+    print(f"uncached: {args.events / exact_seconds:,.0f} calls/s")
+
+    print(f"\n{'precision':>9s} {'hit rate':>9s} {'speedup':>8s} {'alert drift':>12s} {'conf drift':>11s}")
+    for scale in (0.1, 1, 10, 100):
+        precision = {name: step * scale for name, step in DEFAULT_PRECISION.items()}
+        cache = predict.enable_cache(maxsize=args.distinct * 4, precision=precision)
+        cached, seconds = replay(events)
+
+        alert_drift = np.mean([a[0] != b[0] for a, b in zip(exact, cached)])
+        conf_drift = np.mean([abs(a[2] - b[2]) for a, b in zip(exact, cached)])
+        print(f"{scale:8g}x {cache.stats()['hit_rate']:9.1%} {exact_seconds / seconds:7.1f}x "
+              f"{alert_drift:12.2%} {conf_drift:10.2f}pp")
+
+    # Missing depth/cdi/mmi (imputed by the model) and infinite inputs
+    # get their own cache slots instead of a rounding error
+    missing = events[:200].copy()
+    missing[::3, 1] = np.nan
+    missing[1::3, 2:4] = np.nan
+    missing[2::9, 4] = np.inf
+    predict.disable_cache()
+    exact, _ = replay(missing)
+    predict.enable_cache(maxsize=args.distinct * 4)
+    first, _ = replay(missing)
+    second, _ = replay(missing)
+    predict.disable_cache()
+
+    same = [(a[0], a[2]) == (b[0], b[2]) == (c[0], c[2]) for a, b, c in zip(exact, first, second)]
+    print(f"\nmissing/infinite inputs: {sum(same)}/{len(same)} cached results match uncached")
+    sys.exit(0 if all(same) else 1)
+
+
+if __name__ == "__main__":
+    main()
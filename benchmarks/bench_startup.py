@@ -0,0 +1,113 @@
+# bench_startup.py
+# Cold start of the Streamlit app, each measurement in a fresh interpreter:
+#   - `python -X importtime` breakdown of what the login page imports
+#     versus the full prediction stack
+#   - time to first render of the login page and of the first page after
+#     login (streamlit.testing AppTest, headless), and whether sklearn or
+#     matplotlib were imported to draw the login page
+#
+#   python -m benchmarks.bench_startup --budget-ms 500
+#
+# Exits with status 1 if the login page is over budget or pulls in a
+# heavy module.
+import re
+import sys
+import json
+import argparse
+import subprocess
+
+LOGIN_IMPORTS = "import streamlit; import src.user_store"
+FULL_IMPORTS = "import streamlit; import src.user_store; import src.dashboard_data; " \
+               "import src.predict; src.predict.registry.get()"
+
+HEAVY_MODULES = ["sklearn", "matplotlib", "scipy", "pandas", "joblib"]
+
+# Child process: interpreter start to first finished script run
+RENDER_CHILD = r"""
+import sys, json, time
+start = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+ready = time.perf_counter()
+at = AppTest.from_file("app.py", default_timeout=120)
+if sys.argv[1] == "home":
+    at.session_state["logged_in"] = True
+    at.session_state["username"] = "bench"
+    at.session_state["page"] = "Home"
+at.run()
+done = time.perf_counter()
+if at.exception:
+    raise SystemExit(str(at.exception))
+print(json.dumps({
+    "harness_s": ready - start,
+    "render_s": done - ready,
+    "heavy": [m for m in sys.argv[2:] if m in sys.modules]
+}))
+"""
+
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)")
+
+
+def importtime(code, top=12):
+    """
+    (total seconds, [(module, cumulative seconds)]) for the top-level
+    imports of `code`, from `python -X importtime`.
+    """
+    out = subprocess.run([sys.executable, "-W", "ignore", "-X", "importtime", "-c", code],
+                         capture_output=True, text=True, check=True)
+    modules = []
+    for line in out.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        # Nested imports are indented under the module that triggered them
+        if match and not match.group(3):
+            modules.append((match.group(4), int(match.group(2)) / 1e6))
+    total = sum(seconds for _, seconds in modules)
+    return total, sorted(modules, key=lambda m: -m[1])[:top]
+
+
+def first_render(page, repeats=3):
+    """
+    Median seconds for the app's first script run (login or home) in a
+    fresh process, plus the heavy modules it imported.
+    """
+    runs = []
+    for _ in range(repeats):
+        out = subprocess.run([sys.executable, "-W", "ignore", "-c", RENDER_CHILD, page,
+                              *HEAVY_MODULES], capture_output=True, text=True, check=True)
+        runs.append(json.loads(out.stdout.strip().splitlines()[-1]))
+    runs.sort(key=lambda r: r["render_s"])
+    return runs[len(runs) // 2]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="App cold-start benchmark")
+    parser.add_argument("--budget-ms", type=float, default=500,
+                        help="Target for the login page's first render")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--top", type=int, default=8)
+    args = parser.parse_args()
+
+    for label, code in (("login page imports", LOGIN_IMPORTS),
+                        ("full prediction stack", FULL_IMPORTS)):
+        total, modules = importtime(code, args.top)
+        print(f"{label}: {total * 1000:.0f} ms")
+        for name, seconds in modules:
+            print(f"  {name:40s} {seconds * 1000:8.1f} ms")
+
+    print()
+    over = False
+    for page in ("login", "home"):
+        result = first_render(page, args.repeats)
+        render_ms = result["render_s"] * 1000
+        heavy = ", ".join(result["heavy"]) or "none"
+        print(f"first render ({page}): {render_ms:.0f} ms "
+              f"(+{result['harness_s'] * 1000:.0f} ms test harness); heavy modules: {heavy}")
+        if page == "login":
+            over = render_ms > args.budget_ms or any(
+                m in result["heavy"] for m in ("sklearn", "matplotlib"))
+
+    print(f"\nlogin budget {args.budget_ms:.0f} ms: {'FAIL' if over else 'ok'}")
+    sys.exit(1 if over else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+# bench_user_store.py
+# Concurrent signup/login throughput: the old read-modify-write users.csv
+# functions vs the SQLite user store, with N sessions as threads (how
+# Streamlit runs them). Also counts signups lost to write races.
+#
+#   python -m benchmarks.bench_user_store
+import os
+import time
+import argparse
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from src.user_store import SQLiteUserStore, hash_password
+
+
+class SeededSQLiteStore(SQLiteUserStore):
+    def seed(self, users):
+        # One hash per password is too slow for thousands of seed users;
+        # a fixed salt keeps setup fast without changing the lookup cost
+        for username, password in users:
+            self.add_hashed(username, hash_password(password, self.iterations, salt="seed"))
+
+
+# Previous app.py implementation, kept here for comparison
+class CsvUsers:
+    def __init__(self, path):
+        self.path = path
+
+    def load_users(self):
+        if not os.path.exists(self.path):
+            df = pd.DataFrame(columns=["username", "password"])
+            df.to_csv(self.path, index=False)
+        return pd.read_csv(self.path)
+
+    def add_user(self, username, password):
+        df = self.load_users()
+        if username in df["username"].values:
+            return False
+        df.loc[len(df)] = [username, password]
+        df.to_csv(self.path, index=False)
+        return True
+
+    def seed(self, users):
+        pd.DataFrame(users, columns=["username", "password"]).to_csv(self.path, index=False)
+
+    def verify(self, username, password):
+        users = self.load_users()
+        match = users[(users["username"] == username) & (users["password"] == password)]
+        return not match.empty
+
+    def __len__(self):
+        return len(self.load_users())
+
+
+def run_concurrent(fn, items, sessions):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(sessions) as pool:
+        results = list(pool.map(lambda item: _safe(fn, *item), items))
+    return results, time.perf_counter() - start
+
+
+def _safe(fn, *args):
+    # The CSV backend can read a half-written file under concurrency
+    try:
+        return fn(*args)
+    except Exception:
+        return None
+
+
+def bench(name, store, existing, signups, logins, sessions):
+    seed = [(f"user{i}", f"pw{i}") for i in range(existing)]
+    store.seed(seed)
+
+    new_users = [(f"new{i}", f"pw{i}") for i in range(signups)]
+    _, signup_seconds = run_concurrent(store.add_user, new_users, sessions)
+    lost = existing + signups - len(store)
+
+    attempts = [seed[i % existing] for i in range(logins)]
+    results, login_seconds = run_concurrent(store.verify, attempts, sessions)
+    failed = sum(ok is not True for ok in results)
+
+    print(f"{name:8s} {signups / signup_seconds:12,.1f} {logins / login_seconds:12,.1f} "
+          f"{lost:11d} {failed:13d}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="User store throughput under concurrent sessions")
+    parser.add_argument("--existing", type=int, default=2000, help="Users already registered")
+    parser.add_argument("--signups", type=int, default=200)
+    parser.add_argument("--logins", type=int, default=500)
+    parser.add_argument("--sessions", type=int, default=8)
+    parser.add_argument("--iterations", type=int, default=None,
+                        help="PBKDF2 iterations for the SQLite store (default: production cost)")
+    args = parser.parse_args()
+
+    print(f"{args.existing:,} existing users, {args.sessions} concurrent sessions")
+    start = time.perf_counter()
+    hash_password("benchmark", **({"iterations": args.iterations} if args.iterations else {}))
+    print(f"password hash: {(time.perf_counter() - start) * 1000:.1f} ms "
+          f"(bounds SQLite signups/logins per core; use --iterations 1 to see storage cost)")
+    print(f"{'backend':8s} {'signups/s':>12s} {'logins/s':>12s} {'lost writes':>11s} "
+          f"{'failed logins':>13s}")
+    with tempfile.TemporaryDirectory() as tmp:
+        bench("csv", CsvUsers(os.path.join(tmp, "users.csv")),
+              args.existing, args.signups, args.logins, args.sessions)
+
+        kwargs = {"iterations": args.iterations} if args.iterations else {}
+        store = SeededSQLiteStore(os.path.join(tmp, "users.db"), **kwargs)
+        bench("sqlite", store, args.existing, args.signups, args.logins, args.sessions)
+
+
+if __name__ == "__main__":
+    main()
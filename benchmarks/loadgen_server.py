@@ -0,0 +1,146 @@
+# loadgen_server.py
+# Load generator for src/server.py: many concurrent keep-alive clients
+# sending single-event POST /predict requests.
+#
+# By default it starts two servers, micro-batched and one-request-one-call
+# (--max-batch 1), and reports throughput and latency for each:
+#
+#   python -m benchmarks.loadgen_server --clients 200 --requests 5000
+#
+# Point it at a running server instead with --url http://127.0.0.1:8000
+import sys
+import json
+import time
+import socket
+import asyncio
+import argparse
+import subprocess
+from urllib.parse import urlparse
+
+import numpy as np
+
+
+def random_event(rng):
+    return {
+        "magnitude": round(rng.uniform(4.0, 9.2), 2),
+        "depth": round(rng.uniform(5, 700), 1),
+        "cdi": round(rng.uniform(0, 10), 2),
+        "mmi": round(rng.uniform(1, 10), 2),
+        "sig": round(rng.uniform(0, 1000), 1)
+    }
+
+
+async def _request(reader, writer, host, method, path, payload=None):
+    body = json.dumps(payload).encode() if payload is not None else b""
+    writer.write(
+        f"{method} {path} HTTP/1.1\r\nHost: {host}\r\n"
+        f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n".encode()
+        + body
+    )
+    await writer.drain()
+
+    status = await reader.readline()
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode().partition(":")
+        if name.lower() == "content-length":
+            length = int(value)
+    data = await reader.readexactly(length)
+    return int(status.split()[1]), json.loads(data)
+
+
+async def _client(host, port, count, latencies, seed):
+    rng = np.random.default_rng(seed)
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for _ in range(count):
+            start = time.perf_counter()
+            status, _ = await _request(reader, writer, host, "POST", "/predict",
+                                       random_event(rng))
+            if status != 200:
+                raise RuntimeError(f"HTTP {status}")
+            latencies.append(time.perf_counter() - start)
+    finally:
+        writer.close()
+
+
+async def run_load(url, clients, requests):
+    parsed = urlparse(url)
+    host, port = parsed.hostname, parsed.port
+
+    latencies = []
+    per_client = max(1, requests // clients)
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        _client(host, port, per_client, latencies, seed) for seed in range(clients)
+    ))
+    elapsed = time.perf_counter() - start
+
+    reader, writer = await asyncio.open_connection(host, port)
+    _, metrics = await _request(reader, writer, host, "GET", "/metrics")
+    writer.close()
+
+    latencies = np.array(latencies) * 1000
+    return {
+        "requests": len(latencies),
+        "seconds": elapsed,
+        "throughput": len(latencies) / elapsed,
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p99_ms": float(np.percentile(latencies, 99)),
+        "mean_batch": metrics["batch_size"]["mean"]
+    }
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _start_server(max_batch, max_wait_ms):
+    port = _free_port()
+    proc = subprocess.Popen(
+        [sys.executable, "-W", "ignore", "-m", "src.server", "--port", str(port),
+         "--max-batch", str(max_batch), "--max-wait-ms", str(max_wait_ms)],
+        stdout=subprocess.PIPE, text=True
+    )
+    proc.stdout.readline()  # "Serving on ..." once the model is loaded
+    return proc, f"http://127.0.0.1:{port}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scoring server load generator")
+    parser.add_argument("--url", help="Target a running server instead of starting two")
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--max-batch", type=int, default=64)
+    parser.add_argument("--max-wait-ms", type=float, default=2.0)
+    args = parser.parse_args()
+
+    if args.url:
+        targets = [("target", args.url, None)]
+    else:
+        targets = []
+        for label, max_batch in (("one request / one call", 1),
+                                 (f"micro-batched (<= {args.max_batch})", args.max_batch)):
+            proc, url = _start_server(max_batch, args.max_wait_ms)
+            targets.append((label, url, proc))
+
+    print(f"{'mode':32s} {'req/s':>9s} {'p50 ms':>8s} {'p99 ms':>8s} {'avg batch':>10s}")
+    try:
+        for label, url, _ in targets:
+            result = asyncio.run(run_load(url, args.clients, args.requests))
+            print(f"{label:32s} {result['throughput']:9,.0f} {result['p50_ms']:8.1f} "
+                  f"{result['p99_ms']:8.1f} {result['mean_batch']:10.1f}")
+    finally:
+        for _, _, proc in targets:
+            if proc is not None:
+                proc.terminate()
+                proc.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,285 @@
+# suite.py
+# Performance benchmark suite for inference, training and the dashboard.
+#
+#   python -m benchmarks.suite run                       # -> benchmarks/results/<timestamp>.json
+#   python -m benchmarks.suite run --save-baseline       # also store as benchmarks/baseline.json
+#   python -m benchmarks.suite compare results.json      # vs benchmarks/baseline.json
+#
+# compare exits with status 1 when any metric is worse than the baseline
+# by more than --threshold (default 10%).
+import os
+import sys
+import json
+import time
+import shutil
+import socket
+import argparse
+import platform
+import tempfile
+import subprocess
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+RESULTS_DIR = "benchmarks/results"
+BASELINE_PATH = "benchmarks/baseline.json"
+HOME_DATA_PATH = "usgs_earthquake_realistic_1000.csv"
+
+
+def metric(value, unit, better="lower"):
+    return {"value": float(value), "unit": unit, "better": better}
+
+
+def percentiles(samples, points=(50, 95, 99)):
+    samples = np.asarray(samples) * 1000
+    return {p: float(np.percentile(samples, p)) for p in points}
+
+
+def random_events(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "magnitude": np.round(rng.uniform(4.0, 9.2, n), 2),
+        "depth": np.round(rng.uniform(5, 700, n), 1),
+        "cdi": np.round(rng.uniform(0, 10, n), 2),
+        "mmi": np.round(rng.uniform(1, 10, n), 2),
+        "sig": np.round(rng.uniform(0, 1800, n), 1)
+    })
+
+
+# ---------------- ENVIRONMENT ----------------
+def environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    import sklearn
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "git_commit": commit,
+        "host": socket.gethostname(),
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "scikit-learn": sklearn.__version__
+    }
+
+
+# ---------------- INFERENCE ----------------
+def bench_predict_alert(calls):
+    import src.predict as predict
+
+    predict.disable_cache()
+    events = random_events(calls, seed=1).to_numpy()
+    for row in events[:20]:
+        predict.predict_alert(*row)
+
+    samples = []
+    for row in events:
+        start = time.perf_counter()
+        predict.predict_alert(*row)
+        samples.append(time.perf_counter() - start)
+
+    p = percentiles(samples)
+    return {
+        "predict_alert.p50_ms": metric(p[50], "ms"),
+        "predict_alert.p95_ms": metric(p[95], "ms"),
+        "predict_alert.p99_ms": metric(p[99], "ms")
+    }
+
+
+def bench_batch_throughput(sizes, min_seconds=1.0):
+    import src.predict as predict
+
+    results = {}
+    for size in sizes:
+        batch = random_events(size, seed=2)
+        predict.predict_batch(data=batch)
+
+        rows, start = 0, time.perf_counter()
+        while time.perf_counter() - start < min_seconds:
+            predict.predict_batch(data=batch)
+            rows += size
+        rate = rows / (time.perf_counter() - start)
+        results[f"predict_batch.{size}.rows_per_s"] = metric(rate, "rows/s", "higher")
+    return results
+
+
+# Child process: cold-load the model through the registry
+LOAD_CHILD = r"""
+import sys, json, time
+sys.path.insert(0, ".")
+from src.utils import rss_bytes
+before = rss_bytes()
+start = time.perf_counter()
+from src.model_registry import ModelRegistry
+ModelRegistry(mmap_mode=sys.argv[1] or None).get()
+print(json.dumps({"seconds": time.perf_counter() - start, "rss": rss_bytes() - before}))
+"""
+
+
+def bench_model_load(repeats):
+    results = {}
+    for label, mmap_mode in (("model_load", ""), ("model_load_mmap", "r")):
+        runs = []
+        for _ in range(repeats):
+            out = subprocess.run([sys.executable, "-W", "ignore", "-c", LOAD_CHILD, mmap_mode],
+                                 capture_output=True, text=True, check=True)
+            runs.append(json.loads(out.stdout.strip().splitlines()[-1]))
+        results[f"{label}.seconds"] = metric(np.median([r["seconds"] for r in runs]), "s")
+        results[f"{label}.rss_mb"] = metric(np.median([r["rss"] for r in runs]) / 2**20, "MB")
+    return results
+
+
+# ---------------- TRAINING ----------------
+def bench_training(sizes, search):
+    from generate_usgs_dataset import generate
+
+    root = os.getcwd()
+    results = {}
+    for rows in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            os.makedirs(os.path.join(tmp, "models"))
+            data = os.path.join(tmp, "catalog.csv")
+            generate(rows, data, workers=1)
+
+            start = time.perf_counter()
+            subprocess.run(
+                [sys.executable, "-W", "ignore", os.path.join(root, "src", "train_model.py"),
+                 "--data", data, "--search", search],
+                cwd=tmp, capture_output=True, check=True
+            )
+            results[f"train.{search}.{rows}.seconds"] = metric(time.perf_counter() - start, "s")
+    return results
+
+
+# ---------------- DASHBOARD ----------------
+def bench_home_tab(repeats):
+    """
+    Home-tab data layer: cold (full scan + chart render) and warm (cached).
+    """
+    from src import dashboard_data
+
+    cold, warm = [], []
+    for _ in range(repeats):
+        dashboard_data._states.clear()
+        start = time.perf_counter()
+        dashboard_data.home_aggregates(HOME_DATA_PATH)
+        cold.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        dashboard_data.home_aggregates(HOME_DATA_PATH)
+        warm.append(time.perf_counter() - start)
+
+    return {
+        "home_tab.cold_ms": metric(np.median(cold) * 1000, "ms"),
+        "home_tab.cached_ms": metric(np.median(warm) * 1000, "ms")
+    }
+
+
+def bench_instrumentation(calls):
+    from benchmarks.bench_instrumentation import measure_overhead
+
+    t = measure_overhead(calls, rounds=3)
+    return {
+        "instrumentation.predict_alert_overhead_us": metric(t["alert_on"] - t["alert_off"], "us"),
+        "instrumentation.predict_batch_overhead_us": metric(t["batch_on"] - t["batch_off"], "us")
+    }
+
+
+# ---------------- RUN / COMPARE ----------------
+def run(args):
+    metrics = {}
+    steps = [
+        ("predict_alert latency", lambda: bench_predict_alert(args.calls)),
+        ("batch throughput", lambda: bench_batch_throughput(args.batch_sizes)),
+        ("model load", lambda: bench_model_load(args.load_repeats)),
+        ("home tab", lambda: bench_home_tab(args.home_repeats)),
+        ("instrumentation overhead", lambda: bench_instrumentation(args.calls)),
+        ("training", lambda: bench_training(args.train_sizes, args.train_search))
+    ]
+    for name, step in steps:
+        if name == "training" and args.skip_training:
+            continue
+        print(f"running {name} ...", flush=True)
+        metrics.update(step())
+
+    report = {"environment": environment(), "metrics": metrics}
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, datetime.now().strftime("%Y%m%d-%H%M%S") + ".json"
+    )
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"results -> {output}")
+
+    if args.save_baseline:
+        shutil.copyfile(output, BASELINE_PATH)
+        print(f"baseline -> {BASELINE_PATH}")
+
+    for name, m in metrics.items():
+        print(f"  {name:40s} {m['value']:14,.3f} {m['unit']}")
+    return 0
+
+
+def compare(args):
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+
+    regressions = 0
+    print(f"{'metric':40s} {'baseline':>12s} {'current':>12s} {'change':>8s}")
+    for name, cur in current["metrics"].items():
+        base = baseline["metrics"].get(name)
+        if base is None or base["value"] == 0:
+            continue
+
+        change = (cur["value"] - base["value"]) / base["value"]
+        worse = change if cur["better"] == "lower" else -change
+        flag = ""
+        if worse > args.threshold:
+            flag = "  REGRESSION"
+            regressions += 1
+        print(f"{name:40s} {base['value']:12,.3f} {cur['value']:12,.3f} {change:+8.1%}{flag}")
+
+    if baseline["environment"].get("host") != current["environment"].get("host"):
+        print("note: baseline was recorded on a different host")
+
+    print(f"\n{regressions} regression(s) beyond {args.threshold:.0%}")
+    return 1 if regressions else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.suite",
+                                     description="Performance benchmark suite")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="Run the suite and write JSON results")
+    run_parser.add_argument("--output")
+    run_parser.add_argument("--save-baseline", action="store_true")
+    run_parser.add_argument("--calls", type=int, default=2000)
+    run_parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 16, 256, 4096, 65536])
+    run_parser.add_argument("--load-repeats", type=int, default=3)
+    run_parser.add_argument("--home-repeats", type=int, default=20)
+    run_parser.add_argument("--train-sizes", type=int, nargs="+", default=[1000, 4000])
+    run_parser.add_argument("--train-search", default="halving", choices=["grid", "halving"])
+    run_parser.add_argument("--skip-training", action="store_true")
+
+    compare_parser = commands.add_parser("compare", help="Flag regressions against a baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--baseline", default=BASELINE_PATH)
+    compare_parser.add_argument("--threshold", type=float, default=0.10)
+
+    args = parser.parse_args()
+    sys.exit(run(args) if args.command == "run" else compare(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,331 @@
+import os
+import argparse
+from statistics import NormalDist
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from src.prediction_cache import PredictionCache
+
+# ETAS (epidemic-type aftershock sequence) parameters. Every event with
+# magnitude m >= mc triggers Poisson(k * 10**(alpha * (m - mc))) direct
+# aftershocks; times follow Omori-Utsu decay (t + c)**-p (days), and
+# magnitudes Gutenberg-Richter with b-value b, truncated at m_max.
+# Productivity is scaled by exp(-depth / depth_scale_km): deep events
+# produce few aftershocks.
+DEFAULT_PARAMS = {
+    "k": 0.05,
+    "alpha": 0.8,
+    "c": 0.01,
+    "p": 1.1,
+    "b": 1.0,
+    "mc": 3.0,
+    "m_max": 9.5,
+    "depth_scale_km": 300.0
+}
+
+# Sequences per task. Each block has its own random stream, so results
+# depend only on the seed, never on how many workers ran them.
+SIM_BLOCK = 1000
+
+# Upper bound on simulated events held at once per block; big mainshocks
+# run fewer sequences per block to stay under it
+EVENT_BUDGET = 2_000_000
+
+# A cascade this deep means the parameters are (nearly) supercritical.
+# Sequences still growing here are cut off and counted as truncated, so
+# their probability and expected count are lower bounds.
+MAX_GENERATIONS = 100
+
+# Inputs are snapped to this grid before simulating, so nearby inputs
+# share a cache entry and a cached answer is exactly what a fresh run gives
+INPUT_STEPS = {"magnitude": 0.01, "depth": 0.1}
+
+
+# ---------------- SIMULATION ----------------
+def _omori_cdf(tau, c, p):
+    """
+    Fraction of an event's direct aftershocks within tau days of it.
+    """
+    return 1 - (1 + tau / c) ** (1 - p)
+
+
+def _productivity(magnitude, params):
+    return params["k"] * 10 ** (params["alpha"] * (magnitude - params["mc"]))
+
+
+def _gr_magnitudes(rng, size, params):
+    """
+    Gutenberg-Richter magnitudes in [mc, m_max] by inverse transform.
+    """
+    beta = params["b"] * np.log(10)
+    span = 1 - np.exp(-beta * (params["m_max"] - params["mc"]))
+    return params["mc"] - np.log1p(-rng.random(size) * span) / beta
+
+
+def simulate_block(magnitude, depth, n_sims, min_magnitude, horizons, params, seed):
+    """
+    Run n_sims aftershock sequences of one mainshock up to max(horizons)
+    days. Returns (hits, count_sum, truncated): hits[j] is how many
+    sequences had an aftershock >= min_magnitude within horizons[j]
+    days, count_sum the total number of such aftershocks within the last
+    horizon, and truncated how many sequences were still producing
+    aftershocks after MAX_GENERATIONS.
+
+    Vectorized over all sequences, one generation at a time; children
+    are only drawn inside the remaining window, so nothing outside it
+    is simulated.
+    """
+    rng = np.random.default_rng(seed)
+    c, p = params["c"], params["p"]
+    horizons = np.asarray(horizons, dtype=np.float64)
+    days = horizons[-1]
+    depth_factor = np.exp(-max(depth, 0.0) / params["depth_scale_km"])
+
+    first = np.full(n_sims, np.inf)
+    count_sum = 0
+
+    # Generation 0: the mainshock at t = 0 in every sequence
+    sims = np.arange(n_sims)
+    times = np.zeros(n_sims)
+    mags = np.full(n_sims, float(magnitude))
+
+    truncated = 0
+    for generation in range(MAX_GENERATIONS + 1):
+        window = _omori_cdf(days - times, c, p)
+        expected = _productivity(mags, params) * depth_factor * window
+        n_children = rng.poisson(expected)
+        total = int(n_children.sum())
+        if total == 0:
+            break
+        if generation == MAX_GENERATIONS:
+            truncated = len(np.unique(sims[n_children > 0]))
+            break
+
+        parent = np.repeat(np.arange(len(sims)), n_children)
+        # Omori-Utsu delays by inverse transform, truncated to the window
+        u = rng.random(total) * window[parent]
+        delay = c * ((1 - u) ** (1 / (1 - p)) - 1)
+
+        sims = sims[parent]
+        times = times[parent] + delay
+        mags = _gr_magnitudes(rng, total, params)
+
+        big = mags >= min_magnitude
+        if big.any():
+            np.minimum.at(first, sims[big], times[big])
+            count_sum += int(big.sum())
+
+    hits = (first[:, None] <= horizons[None, :]).sum(axis=0)
+    return hits, count_sum, truncated
+
+
+def _simulate_task(task):
+    return simulate_block(*task)
+
+
+def _block_sizes(magnitude, depth, n_sims, params):
+    """
+    Sequences per block: SIM_BLOCK, fewer for mainshocks whose
+    sequences are expected to hold many events.
+    """
+    direct = _productivity(magnitude, params) * np.exp(-max(depth, 0.0) / params["depth_scale_km"])
+    per_sim = max(1.0, 5 * direct)
+    size = int(max(1, min(SIM_BLOCK, EVENT_BUDGET // per_sim)))
+    return [min(size, n_sims - start) for start in range(0, n_sims, size)]
+
+
+def wilson_interval(hits, n, confidence=0.95):
+    """
+    Wilson score interval for a binomial proportion; well behaved for
+    probabilities near 0 or 1, unlike the normal approximation.
+    """
+    hits = np.asarray(hits, dtype=np.float64)
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    phat = hits / n
+    denom = 1 + z * z / n
+    center = (phat + z * z / (2 * n)) / denom
+    half = z * np.sqrt(phat * (1 - phat) / n + z * z / (4 * n * n)) / denom
+    return np.clip(center - half, 0, 1), np.clip(center + half, 0, 1)
+
+
+# ---------------- MODEL ----------------
+class AftershockModel:
+    """
+    Monte Carlo ETAS forecast: probability of at least one aftershock of
+    magnitude >= min_magnitude within `days` days of a mainshock, with a
+    Wilson confidence band for the simulation error.
+
+    Results are cached per (magnitude, depth) on INPUT_STEPS, keyed on
+    every setting, so repeated inputs return without simulating.
+    Sequence blocks for events not in the cache run in a process pool
+    when workers > 1.
+    """
+
+    def __init__(self, params=None, min_magnitude=5.0, days=7.0, n_sims=2000,
+                 horizons=None, confidence=0.95, seed=0, workers=1, cache_size=10_000):
+        self.params = {**DEFAULT_PARAMS, **(params or {})}
+        if self.params["p"] <= 1:
+            raise ValueError("Omori exponent p must be > 1")
+        if min_magnitude < self.params["mc"]:
+            raise ValueError(f"min_magnitude must be >= mc ({self.params['mc']}); "
+                             "smaller events are not simulated")
+        self.min_magnitude = float(min_magnitude)
+        self.days = float(days)
+        self.horizons = sorted({float(h) for h in (horizons or [])} | {self.days})
+        if self.horizons[0] <= 0 or self.horizons[-1] > self.days:
+            raise ValueError("horizons must lie in (0, days]")
+        self.n_sims = int(n_sims)
+        self.confidence = confidence
+        self.seed = seed
+        self.workers = os.cpu_count() if workers is None else workers
+
+        self.cache = PredictionCache(maxsize=cache_size, features=("magnitude", "depth"),
+                                     precision=INPUT_STEPS)
+        # Any change to these changes every answer
+        self.version = (tuple(sorted(self.params.items())), self.min_magnitude,
+                        tuple(self.horizons), self.n_sims, self.confidence, self.seed)
+
+    def forecast(self, magnitude, depth=0.0):
+        """
+        Dict with probability, lower, upper (band at `confidence`),
+        expected_count of qualifying aftershocks, truncated: how many of
+        the n_sims sequences hit MAX_GENERATIONS (when nonzero, the
+        probability and count understate the forecast), and curve:
+        (days, probability, lower, upper) for each of `horizons`.
+        """
+        return self.forecast_batch([magnitude], [depth])[0]
+
+    def probability(self, magnitude, depth):
+        """
+        Forecast probability for each (magnitude, depth) pair.
+        """
+        return np.array([r["probability"] for r in
+                         self.forecast_batch(np.atleast_1d(magnitude), np.atleast_1d(depth))])
+
+    def forecast_batch(self, magnitude, depth):
+        """
+        forecast() for many mainshocks. Cached inputs return at once;
+        the rest are simulated together, spread over the process pool.
+        A missing or infinite magnitude or depth gives NaN throughout.
+        """
+        magnitude = np.asarray(magnitude, dtype=np.float64)
+        depth = np.asarray(depth, dtype=np.float64)
+        finite = np.isfinite(magnitude) & np.isfinite(depth)
+        keys = [self.cache.key(self.version, (float(m), float(d))) if ok else None
+                for m, d, ok in zip(magnitude, depth, finite)]
+        results = {None: self._undefined()}
+        missing = []
+        for key in keys:
+            if key in results:
+                continue
+            cached = self.cache.get(key)
+            if cached is None:
+                missing.append(key)
+                results[key] = None
+            else:
+                results[key] = cached
+
+        for key, result in zip(missing, self._simulate(missing)):
+            self.cache.put(key, result)
+            results[key] = result
+
+        return [dict(results[key]) for key in keys]
+
+    def _undefined(self):
+        nan = float("nan")
+        return {"probability": nan, "lower": nan, "upper": nan, "expected_count": nan,
+                "truncated": 0, "curve": [(h, nan, nan, nan) for h in self.horizons]}
+
+    def _simulate(self, keys):
+        if not keys:
+            return []
+        steps = self.cache.steps
+        inputs = [(k[1] * steps[0], k[2] * steps[1]) for k in keys]
+
+        tasks, owners = [], []
+        for i, (magnitude, depth) in enumerate(inputs):
+            for block, size in enumerate(_block_sizes(magnitude, depth, self.n_sims, self.params)):
+                # Same streams for every event (common random numbers):
+                # results don't depend on batch position or worker count
+                seed = np.random.SeedSequence(self.seed, spawn_key=(block,))
+                tasks.append((magnitude, depth, size, self.min_magnitude,
+                              self.horizons, self.params, seed))
+                owners.append(i)
+
+        if self.workers <= 1 or len(tasks) == 1:
+            outputs = [_simulate_task(task) for task in tasks]
+        else:
+            with ProcessPoolExecutor(min(self.workers, len(tasks))) as pool:
+                chunksize = max(1, len(tasks) // (4 * self.workers))
+                outputs = list(pool.map(_simulate_task, tasks, chunksize=chunksize))
+
+        hits = np.zeros((len(keys), len(self.horizons)), dtype=np.int64)
+        counts = np.zeros(len(keys), dtype=np.int64)
+        truncated = np.zeros(len(keys), dtype=np.int64)
+        for owner, (block_hits, block_count, block_truncated) in zip(owners, outputs):
+            hits[owner] += block_hits
+            counts[owner] += block_count
+            truncated[owner] += block_truncated
+
+        results = []
+        for i in range(len(keys)):
+            lower, upper = wilson_interval(hits[i], self.n_sims, self.confidence)
+            probability = hits[i] / self.n_sims
+            results.append({
+                "probability": float(probability[-1]),
+                "lower": float(lower[-1]),
+                "upper": float(upper[-1]),
+                "expected_count": float(counts[i] / self.n_sims),
+                "truncated": int(truncated[i]),
+                "curve": [(h, float(pr), float(lo), float(hi)) for h, pr, lo, hi
+                          in zip(self.horizons, probability, lower, upper)]
+            })
+        return results
+
+
+# ---------------- COMMAND LINE ----------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m src.aftershock",
+                                     description="ETAS Monte Carlo aftershock forecast")
+    parser.add_argument("--magnitude", type=float, nargs="+", required=True)
+    parser.add_argument("--depth", type=float, nargs="+", default=[10.0],
+                        help="One depth for all magnitudes, or one per magnitude")
+    parser.add_argument("--min-magnitude", type=float, default=5.0)
+    parser.add_argument("--days", type=float, default=7.0)
+    parser.add_argument("--horizons", type=float, nargs="*", default=[1.0],
+                        help="Extra horizons (days) for the probability curve")
+    parser.add_argument("--sims", type=int, default=10_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Worker processes (default: all cores, 1 = in-process)")
+    for name, value in DEFAULT_PARAMS.items():
+        parser.add_argument(f"--{name.replace('_', '-')}", type=float, default=value)
+    args = parser.parse_args(argv)
+
+    depths = args.depth * len(args.magnitude) if len(args.depth) == 1 else args.depth
+    if len(depths) != len(args.magnitude):
+        parser.error("--depth takes one value or one per --magnitude")
+
+    model = AftershockModel(
+        params={name: getattr(args, name) for name in DEFAULT_PARAMS},
+        min_magnitude=args.min_magnitude, days=args.days, n_sims=args.sims,
+        horizons=[h for h in args.horizons if h < args.days], seed=args.seed,
+        workers=args.workers
+    )
+    for magnitude, depth, result in zip(args.magnitude, depths,
+                                        model.forecast_batch(args.magnitude, depths)):
+        print(f"M{magnitude:.1f} at {depth:.0f} km: P(M>={args.min_magnitude:g} within "
+              f"{args.days:g} days) = {result['probability']:.1%} "
+              f"[{result['lower']:.1%}, {result['upper']:.1%}], "
+              f"expected {result['expected_count']:.2f}")
+        for days, probability, lower, upper in result["curve"][:-1]:
+            print(f"    within {days:g} days: {probability:.1%} [{lower:.1%}, {upper:.1%}]")
+        if result["truncated"]:
+            print(f"    ⚠️ {result['truncated']:,d} of {args.sims:,d} sequences hit "
+                  f"{MAX_GENERATIONS} generations and were cut off; the forecast "
+                  "is a lower bound")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+import numpy as np
+
+from sklearn.base import BaseEstimator, TransformerMixin
+
+# uint8 bin codes
+MIN_BINS = 2
+MAX_BINS = 256
+
+
+class QuantileSketch:
+    """
+    Streaming per-feature reservoir sample used to estimate quantile
+    bin edges and medians in one pass, in memory fixed by `capacity`.
+    """
+
+    def __init__(self, n_features, capacity=200_000, seed=42):
+        self.capacity = capacity
+        self.reservoir = np.empty((capacity, n_features))
+        self.filled = 0
+        self.seen = 0
+        self.rng = np.random.default_rng(seed)
+
+    def update(self, X):
+        X = np.asarray(X, dtype=np.float64)
+
+        # Fill the reservoir first
+        take = min(self.capacity - self.filled, len(X))
+        self.reservoir[self.filled:self.filled + take] = X[:take]
+        self.filled += take
+        self.seen += take
+
+        rest = X[take:]
+        if len(rest):
+            # Item number t replaces a random slot with probability capacity / t
+            positions = self.seen + 1 + np.arange(len(rest))
+            slots = (self.rng.random(len(rest)) * positions).astype(np.int64)
+            keep = slots < self.capacity
+            self.reservoir[slots[keep]] = rest[keep]
+            self.seen += len(rest)
+
+    def edges(self, max_bins=MAX_BINS):
+        """
+        Inner bin edges per feature (at most max_bins - 1 each).
+        """
+        if not MIN_BINS <= max_bins <= MAX_BINS:
+            # More bins would not fit the uint8 codes
+            raise ValueError(f"max_bins must be between {MIN_BINS} and {MAX_BINS}, got {max_bins}")
+        sample = self.reservoir[:self.filled]
+        quantiles = np.linspace(0, 1, max_bins + 1)[1:-1]
+        edges = []
+        for column in sample.T:
+            column = column[~np.isnan(column)]
+            if len(column) == 0:
+                edges.append(np.empty(0))
+                continue
+            edges.append(np.unique(np.quantile(column, quantiles)))
+        return edges
+
+    def medians(self):
+        return np.nanmedian(self.reservoir[:self.filled], axis=0)
+
+
+class QuantileBinner(BaseEstimator, TransformerMixin):
+    """
+    Map each feature to a uint8 bin code using precomputed edges.
+
+    Missing values take the code of the feature's median, which plays
+    the role of SimpleImputer(strategy="median") for binned models.
+    """
+
+    def __init__(self, edges=None, fill_values=None, feature_names=None):
+        self.edges = edges
+        self.fill_values = fill_values
+        self.feature_names = feature_names
+
+    def fit(self, X, y=None):
+        return self
+
+    def transform(self, X):
+        if self.feature_names is not None and hasattr(X, "columns"):
+            X = X[list(self.feature_names)]
+        X = np.asarray(X, dtype=np.float64)
+        X = np.where(np.isnan(X), self.fill_values, X)
+
+        codes = np.empty(X.shape, dtype=np.uint8)
+        for i, edges in enumerate(self.edges):
+            codes[:, i] = np.searchsorted(edges, X[:, i], side="right")
+        return codes
@@ -0,0 +1,338 @@
+import os
+import sys
+import json
+import time
+import uuid
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from src.utils import file_signature
+
+MANIFEST = "manifest.json"
+
+# convert() writes catalog.csv to catalog.cols/ unless told otherwise
+STORE_SUFFIX = ".cols"
+
+FORMAT_VERSION = 1
+
+# Text columns are stored as codes into the manifest's category list
+CODE_DTYPE = np.dtype("<i2")
+
+
+# ---------------- LOCATING STORES ----------------
+def store_path(path):
+    return os.path.splitext(path.rstrip("/"))[0] + STORE_SUFFIX
+
+
+def is_store(path):
+    return os.path.isfile(os.path.join(path, MANIFEST))
+
+
+def signature(path):
+    """
+    file_signature for a file, or for a store's manifest (which is
+    replaced on every append).
+    """
+    return file_signature(os.path.join(path, MANIFEST) if is_store(path) else path)
+
+
+def resolve(path):
+    """
+    Where to read `path` from: the path itself if it is a store; the
+    store convert() made from it, if that store was made from this
+    version of the file; otherwise the file.
+    """
+    if is_store(path):
+        return path
+    candidate = store_path(path)
+    if is_store(candidate):
+        source = _read_manifest(candidate).get("source_signature")
+        if source is not None and source == list(file_signature(path) or []):
+            return candidate
+    return path
+
+
+def _read_manifest(path):
+    with open(os.path.join(path, MANIFEST)) as f:
+        return json.load(f)
+
+
+def _write_manifest(path, manifest):
+    # Readers only trust the row count in the manifest, so replacing it
+    # last publishes an append atomically
+    tmp = os.path.join(path, MANIFEST + ".tmp")
+    with open(tmp, "w") as f:
+        json.dump(manifest, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, os.path.join(path, MANIFEST))
+
+
+# ---------------- READING ----------------
+class ColumnStore:
+    """
+    Snapshot of a column store: one raw little-endian binary file per
+    column plus a JSON manifest (names, dtypes, row count, categories).
+
+    Columns are memory-mapped, so reads are zero-copy NumPy views and
+    only the columns (and rows) actually touched are paged in. The row
+    count is fixed when the store is opened; rows appended later show
+    up on the next open.
+    """
+
+    def __init__(self, path, manifest):
+        self.path = path
+        self.manifest = manifest
+        self.rows = manifest["rows"]
+        self.store_id = manifest["store_id"]
+        self._specs = {spec["name"]: spec for spec in manifest["columns"]}
+        self._maps = {}
+
+    @classmethod
+    def open(cls, path):
+        return cls(path, _read_manifest(path))
+
+    @property
+    def columns(self):
+        return [spec["name"] for spec in self.manifest["columns"]]
+
+    def categories(self, name):
+        """
+        Category labels of a text column (codes index into them), else None.
+        """
+        return self._specs[name].get("categories")
+
+    def column(self, name):
+        """
+        Zero-copy view of a column: the values, or the int16 codes
+        (-1 for missing) of a text column.
+        """
+        array = self._maps.get(name)
+        if array is None:
+            spec = self._specs[name]
+            dtype = np.dtype(spec["dtype"])
+            if self.rows == 0:
+                array = np.empty(0, dtype=dtype)
+            else:
+                array = np.memmap(os.path.join(self.path, spec["file"]), dtype=dtype,
+                                  mode="r", shape=(self.rows,))
+            array = np.asarray(array)
+            self._maps[name] = array
+        return array
+
+    def to_frame(self, columns=None, start=0, stop=None):
+        """
+        DataFrame of the given columns (default all) and row range.
+        Numeric columns wrap the mapped arrays without copying; text
+        columns come back as categoricals.
+        """
+        data = {}
+        for name in columns or self.columns:
+            values = self.column(name)[start:stop]
+            categories = self.categories(name)
+            if categories is not None:
+                values = pd.Categorical.from_codes(values, categories)
+            data[name] = values
+        return pd.DataFrame(data, copy=False)
+
+
+# ---------------- WRITING ----------------
+def _column_spec(index, name, series):
+    dtype = series.to_numpy().dtype
+    if dtype.kind in "biuf":
+        return {"name": name, "file": f"{index}.bin", "dtype": dtype.newbyteorder("<").str}
+    return {"name": name, "file": f"{index}.bin", "dtype": CODE_DTYPE.str, "categories": []}
+
+
+def _encode(spec, series):
+    """
+    Bytes to append for one column. New text values extend the
+    column's category list; existing codes never change.
+    """
+    categories = spec.get("categories")
+    if categories is None:
+        dtype = np.dtype(spec["dtype"])
+        try:
+            original = series.to_numpy()
+            values = original.astype(dtype)
+            # Reject lossy casts (fractions into an int column, overflow,
+            # missing values into ints) instead of storing changed values
+            lossless = np.can_cast(original.dtype, dtype) or np.array_equal(
+                values, original, equal_nan=dtype.kind == "f")
+        except (TypeError, ValueError):
+            lossless = False
+        if not lossless:
+            raise ValueError(f"Column {spec['name']!r} does not fit the stored "
+                             f"type {spec['dtype']} without losing values")
+        return values.tobytes()
+
+    values = series.astype(object)
+    present = ~values.isna().to_numpy()
+    labels = values[present].astype(str)
+    known = set(categories)
+    categories.extend(label for label in pd.unique(labels) if label not in known)
+    if len(categories) > np.iinfo(CODE_DTYPE).max:
+        raise ValueError(f"Text column {spec['name']!r} has too many distinct values")
+
+    codes = np.full(len(series), -1, dtype=CODE_DTYPE)
+    codes[present] = pd.Categorical(labels, categories=categories).codes
+    return codes.tobytes()
+
+
+def create(path, df, source=None):
+    """
+    New store at `path` holding df, replacing any store already there.
+    """
+    return _build(path, [df], source)
+
+
+def _build(path, chunks, source):
+    # Written next to its destination and renamed into place, so readers
+    # never see a half-built store
+    parent = os.path.dirname(os.path.abspath(path))
+    os.makedirs(parent, exist_ok=True)
+    tmp = os.path.join(parent, f".{os.path.basename(path.rstrip('/'))}-{uuid.uuid4().hex[:8]}")
+    os.makedirs(tmp)
+    try:
+        for i, df in enumerate(chunks):
+            if i == 0:
+                _init_store(tmp, df, source)
+            append(tmp, df)
+        if not os.path.exists(os.path.join(tmp, MANIFEST)):
+            raise ValueError(f"{source or path}: nothing to store")
+
+        if os.path.isdir(path):
+            old = tmp + ".old"
+            os.replace(path, old)
+            os.replace(tmp, path)
+            _remove_tree(old)
+        else:
+            os.replace(tmp, path)
+    except BaseException:
+        if os.path.isdir(tmp):
+            _remove_tree(tmp)
+        raise
+    return path
+
+
+def _init_store(path, df, source):
+    # Column types come from the first chunk
+    df = df.rename(columns=lambda c: str(c).strip())
+    manifest = {
+        "format": FORMAT_VERSION,
+        "store_id": uuid.uuid4().hex,
+        "rows": 0,
+        "columns": [_column_spec(i, name, df[name]) for i, name in enumerate(df.columns)],
+        "source": source,
+        "source_signature": None if source is None else list(file_signature(source))
+    }
+    for spec in manifest["columns"]:
+        open(os.path.join(path, spec["file"]), "wb").close()
+    _write_manifest(path, manifest)
+
+
+def append(path, df):
+    """
+    Append the rows of df (same column names as the store) to it.
+
+    Column files are extended first and the manifest row count is
+    bumped last, so readers see either the old rows or all of the new
+    ones. One writer at a time.
+    """
+    manifest = _read_manifest(path)
+    df = df.rename(columns=lambda c: str(c).strip())
+    names = [spec["name"] for spec in manifest["columns"]]
+    if sorted(df.columns) != sorted(names):
+        raise ValueError(f"Columns {list(df.columns)} do not match the store's {names}")
+    if not len(df):
+        return manifest["rows"]
+
+    rows = manifest["rows"]
+    for spec in manifest["columns"]:
+        data = _encode(spec, df[spec["name"]])
+        file_path = os.path.join(path, spec["file"])
+        with open(file_path, "r+b") as f:
+            # Drop bytes from an append that died before its manifest update
+            f.truncate(rows * np.dtype(spec["dtype"]).itemsize)
+            f.seek(0, os.SEEK_END)
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+
+    manifest["rows"] = rows + len(df)
+    _write_manifest(path, manifest)
+    return manifest["rows"]
+
+
+def _remove_tree(path):
+    for name in os.listdir(path):
+        os.remove(os.path.join(path, name))
+    os.rmdir(path)
+
+
+def _source_chunks(path, chunk_size):
+    if path.endswith(".parquet") or path.endswith(".pq"):
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+        return
+
+    for chunk in pd.read_csv(path, chunksize=chunk_size):
+        chunk.columns = chunk.columns.str.strip()
+        yield chunk
+
+
+def convert(source, path=None, chunk_size=250_000):
+    """
+    Convert a CSV/Parquet catalog into a store (default: next to it, as
+    <name>.cols), streaming chunk by chunk. Returns the store path.
+    Column types come from the first chunk.
+    """
+    return _build(path or store_path(source), _source_chunks(source, chunk_size), source)
+
+
+# ---------------- COMMAND LINE ----------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m src.columnar",
+                                     description="Memory-mapped column store for catalogs")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    conv = commands.add_parser("convert", help="CSV/Parquet catalog -> column store")
+    conv.add_argument("source")
+    conv.add_argument("--output", default=None, help="Store directory (default: <source>.cols)")
+    conv.add_argument("--chunk-size", type=int, default=250_000)
+
+    add = commands.add_parser("append", help="Append a CSV/Parquet batch to a store")
+    add.add_argument("store")
+    add.add_argument("batch")
+    add.add_argument("--chunk-size", type=int, default=250_000)
+
+    info = commands.add_parser("info", help="Rows, columns and sizes of a store")
+    info.add_argument("store")
+
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    if args.command == "convert":
+        path = convert(args.source, args.output, args.chunk_size)
+        rows = ColumnStore.open(path).rows
+        print(f"{rows:,} rows -> {path} ({time.perf_counter() - start:.1f}s)", file=sys.stderr)
+    elif args.command == "append":
+        before = ColumnStore.open(args.store).rows
+        for chunk in _source_chunks(args.batch, args.chunk_size):
+            rows = append(args.store, chunk)
+        print(f"appended {rows - before:,} rows to {args.store} ({rows:,} total)", file=sys.stderr)
+    else:
+        store = ColumnStore.open(args.store)
+        print(f"{args.store}: {store.rows:,} rows, source {store.manifest['source']}")
+        for spec in store.manifest["columns"]:
+            size = os.path.getsize(os.path.join(args.store, spec["file"]))
+            kind = f"text ({len(spec['categories'])} values)" if "categories" in spec else spec["dtype"]
+            print(f"  {spec['name']:24s} {kind:20s} {size / 2**20:9.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
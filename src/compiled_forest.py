@@ -0,0 +1,472 @@
+import os
+import json
+import shutil
+import tempfile
+
+import numpy as np
+
+from src.features import FeatureBuilder, add_derived
+
+# Rows traversed per block; bounds the (trees x rows x classes) scratch array
+BLOCK_SIZE = 2048
+
+# Arrays persisted by CompiledForest.save, one .npy file each
+ARRAY_FIELDS = ["feature", "threshold", "children", "value",
+                "roots", "fill_values", "classes_"]
+
+
+class CompiledForest:
+    """
+    Array-backed forest evaluated with pure NumPy.
+
+    Every tree is flattened into shared node arrays. Leaf nodes point
+    to themselves, so a fixed number of traversal steps (the deepest
+    tree's depth) lands every (tree, row) pair on its leaf without
+    per-node branching in Python.
+    """
+
+    def __init__(self, feature, threshold, children, value, roots,
+                 max_depth, fill_values, classes, feature_names=None, derived=False,
+                 relative_children=False, value_scale=1.0, labels=None):
+        self.feature = feature
+        self.threshold = threshold
+        # Interleaved (left, right) pairs: child of node i is children[2 * i + go_right]
+        self.children = children
+        self.value = value
+        self.roots = roots
+        self.max_depth = int(max_depth)
+        self.fill_values = fill_values
+        self.classes_ = classes
+        self.feature_names = feature_names
+        # Model starts with a FeatureBuilder: append the derived columns first
+        self.derived = bool(derived)
+        # Compact exports store children as (child - node) offsets in a
+        # narrow unsigned type and leaf values as integers / value_scale
+        self.relative_children = bool(relative_children)
+        self.value_scale = float(value_scale)
+        # Decoded alert names, stored with compact exports
+        self.labels = labels
+
+    @property
+    def n_estimators(self):
+        return len(self.roots)
+
+    @property
+    def n_nodes(self):
+        return len(self.feature)
+
+    @property
+    def nbytes(self):
+        return sum(np.asarray(getattr(self, name)).nbytes for name in ARRAY_FIELDS)
+
+    @property
+    def left(self):
+        return self._absolute(self.children[0::2])
+
+    @property
+    def right(self):
+        return self._absolute(self.children[1::2])
+
+    def _absolute(self, children):
+        if self.relative_children:
+            return children + np.arange(self.n_nodes)
+        return children
+
+    def prepare(self, X):
+        """
+        Build, impute and cast input the way the sklearn pipeline does:
+        derived features and median fill in float64, then float32 for
+        the tree splits.
+        """
+        if self.feature_names is not None and hasattr(X, "columns"):
+            X = X[list(self.feature_names)]
+
+        X = np.array(X, dtype=np.float64, ndmin=2)
+        if self.derived:
+            X = add_derived(X)
+        missing = np.isnan(X)
+        if missing.any():
+            X = np.where(missing, self.fill_values, X)
+
+        return X.astype(np.float32)
+
+    def apply(self, X):
+        """
+        Return the leaf node reached in every tree, shape (n_trees, n_rows).
+        """
+        X = self.prepare(X)
+        return self._apply(X)
+
+    def _apply(self, X):
+        n_rows, n_features = X.shape
+        flat_X = X.ravel()
+
+        # (tree, row) pairs flattened tree-major; each pair tracks one node
+        nodes = np.repeat(self.roots, n_rows)
+        row_offset = np.tile(np.arange(n_rows, dtype=self.roots.dtype) * n_features,
+                             self.n_estimators)
+
+        for _ in range(self.max_depth):
+            x = np.take(flat_X, row_offset + np.take(self.feature, nodes))
+            go_right = x > np.take(self.threshold, nodes)
+            if self.relative_children:
+                nodes = nodes + np.take(self.children, 2 * nodes + go_right)
+            else:
+                nodes = np.take(self.children, 2 * nodes + go_right)
+
+        return nodes.reshape(self.n_estimators, n_rows)
+
+    def predict_proba(self, X, prepared=False):
+        """
+        Mean leaf class distribution over all trees.
+
+        Trees are accumulated in order and divided by the tree count,
+        exactly as RandomForestClassifier.predict_proba does. With
+        prepared=True, X is the output of prepare().
+        """
+        if not prepared:
+            X = self.prepare(X)
+        proba = np.empty((len(X), len(self.classes_)), dtype=np.float64)
+
+        for start in range(0, len(X), BLOCK_SIZE):
+            block = X[start:start + BLOCK_SIZE]
+            leaf_values = np.take(self.value, self._apply(block), axis=0)
+            # Summing over the slow (tree) axis accumulates tree by tree
+            proba[start:start + len(block)] = leaf_values.sum(axis=0)
+
+        proba /= self.n_estimators * self.value_scale
+        return proba
+
+    def contributions(self, X, prepared=False):
+        """
+        Tree-path decomposition of predict_proba, for every row at once.
+
+        Returns (bias, contributions): bias, shape (n_classes,), is the
+        mean root distribution; contributions, shape (n_rows,
+        n_features, n_classes), is the mean change in class distribution
+        along each row's path, credited to the feature of each split.
+        bias + contributions.sum(axis=1) equals predict_proba up to
+        float rounding.
+        """
+        if not prepared:
+            X = self.prepare(X)
+        n_rows, n_features = X.shape
+        out = np.zeros((n_rows, n_features, len(self.classes_)), dtype=np.float64)
+
+        for start in range(0, n_rows, BLOCK_SIZE):
+            block = X[start:start + BLOCK_SIZE]
+            out[start:start + len(block)] = self._path_deltas(block)
+
+        scale = self.n_estimators * self.value_scale
+        bias = np.take(self.value, self.roots, axis=0).sum(axis=0, dtype=np.float64) / scale
+        return bias, out / scale
+
+    def _path_deltas(self, X):
+        """
+        Sum over trees of (child value - parent value) per (row, split
+        feature), walking the same paths as _apply.
+        """
+        n_rows, n_features = X.shape
+        n_classes = len(self.classes_)
+        flat_X = X.ravel()
+
+        nodes = np.repeat(self.roots, n_rows)
+        row_offset = np.tile(np.arange(n_rows, dtype=np.int64) * n_features, self.n_estimators)
+        value = np.take(self.value, nodes, axis=0).astype(np.float64)
+        totals = np.zeros((n_classes, n_rows * n_features))
+
+        for _ in range(self.max_depth):
+            slot = row_offset + np.take(self.feature, nodes)
+            go_right = np.take(flat_X, slot) > np.take(self.threshold, nodes)
+            if self.relative_children:
+                children = nodes + np.take(self.children, 2 * nodes + go_right)
+            else:
+                children = np.take(self.children, 2 * nodes + go_right)
+
+            # Leaves loop onto themselves: drop finished paths so deep
+            # trees don't keep paying for shallow ones
+            active = children != nodes
+            if not active.all():
+                nodes, slot, value = children[active], slot[active], value[active]
+                row_offset = row_offset[active]
+            else:
+                nodes = children
+            if not len(nodes):
+                break
+
+            child_value = np.take(self.value, nodes, axis=0).astype(np.float64)
+            delta = child_value - value
+            for k in range(n_classes):
+                totals[k] += np.bincount(slot, weights=delta[:, k], minlength=n_rows * n_features)
+            value = child_value
+
+        return totals.reshape(n_classes, n_rows, n_features).transpose(1, 2, 0)
+
+    def predict(self, X):
+        proba = self.predict_proba(X)
+        return self.classes_.take(np.argmax(proba, axis=1), axis=0)
+
+    def save(self, directory):
+        """
+        Write one .npy file per array plus meta.json. The directory is
+        assembled next to its destination and renamed into place.
+        """
+        parent = os.path.dirname(os.path.abspath(directory))
+        os.makedirs(parent, exist_ok=True)
+        tmp_dir = tempfile.mkdtemp(dir=parent, prefix=".compiled-")
+
+        try:
+            for name in ARRAY_FIELDS:
+                np.save(os.path.join(tmp_dir, f"{name}.npy"), getattr(self, name))
+            with open(os.path.join(tmp_dir, "meta.json"), "w") as f:
+                json.dump({
+                    "max_depth": self.max_depth,
+                    "feature_names": self.feature_names,
+                    "derived": self.derived,
+                    "relative_children": self.relative_children,
+                    "value_scale": self.value_scale,
+                    "labels": self.labels
+                }, f)
+            if os.path.isdir(directory):
+                shutil.rmtree(directory)
+            os.replace(tmp_dir, directory)
+        except BaseException:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+
+    @classmethod
+    def load(cls, directory, mmap_mode=None):
+        """
+        Load a saved forest. With mmap_mode="r" the node arrays are
+        memory-mapped and shared between processes via the page cache.
+        """
+        arrays = {
+            name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode=mmap_mode)
+            for name in ARRAY_FIELDS
+        }
+        with open(os.path.join(directory, "meta.json")) as f:
+            meta = json.load(f)
+
+        return cls(
+            feature=arrays["feature"],
+            threshold=arrays["threshold"],
+            children=arrays["children"],
+            value=arrays["value"],
+            roots=np.asarray(arrays["roots"]),
+            max_depth=meta["max_depth"],
+            fill_values=np.asarray(arrays["fill_values"]),
+            classes=np.asarray(arrays["classes_"]),
+            feature_names=meta["feature_names"],
+            derived=meta.get("derived", False),
+            relative_children=meta.get("relative_children", False),
+            value_scale=meta.get("value_scale", 1.0),
+            labels=meta.get("labels")
+        )
+
+
+def _split_pipeline(model):
+    """
+    Return (feature_builder, imputer, forest) from a fitted Pipeline or
+    bare forest. The optional steps must come in that order.
+    """
+    # sklearn is only needed at compile time, not to evaluate a loaded forest
+    from sklearn.pipeline import Pipeline
+    from sklearn.impute import SimpleImputer
+    from sklearn.ensemble import RandomForestClassifier, ExtraTreesClassifier
+
+    feature_builder = None
+    imputer = None
+    forest = model
+
+    if isinstance(model, Pipeline):
+        steps = [step for _, step in model.steps if step != "passthrough"]
+        forest = steps[-1]
+        for step in steps[:-1]:
+            if isinstance(step, FeatureBuilder) and feature_builder is None and imputer is None:
+                feature_builder = step
+            elif isinstance(step, SimpleImputer) and imputer is None:
+                imputer = step
+            else:
+                raise ValueError(f"Cannot compile pipeline step: {step!r}")
+
+    if not isinstance(forest, (RandomForestClassifier, ExtraTreesClassifier)):
+        raise ValueError(f"Cannot compile estimator: {forest!r}")
+
+    if forest.n_outputs_ != 1:
+        raise ValueError("Only single-output forests can be compiled")
+
+    return feature_builder, imputer, forest
+
+
+def _leaf_distribution(tree, n_classes):
+    """
+    Per-node class distribution exactly as tree.predict_proba returns it.
+    """
+    value = tree.value[:, 0, :n_classes].astype(np.float64)
+
+    # Older scikit-learn stores weighted counts and normalizes at predict time
+    totals = value.sum(axis=1)
+    if not np.allclose(totals, 1.0):
+        totals[totals == 0.0] = 1.0
+        value = value / totals[:, np.newaxis]
+
+    return value
+
+
+def compile_forest(model):
+    """
+    Flatten a fitted (SimpleImputer +) forest into a CompiledForest.
+    """
+    feature_builder, imputer, forest = _split_pipeline(model)
+    n_classes = forest.n_classes_
+    n_features = forest.n_features_in_
+
+    features, thresholds, children, values, roots = [], [], [], [], []
+    max_depth = 0
+    offset = 0
+
+    for estimator in forest.estimators_:
+        tree = estimator.tree_
+        node_ids = np.arange(tree.node_count)
+        is_leaf = tree.children_left == -1
+
+        # Leaves loop back onto themselves
+        left = np.where(is_leaf, node_ids, tree.children_left) + offset
+        right = np.where(is_leaf, node_ids, tree.children_right) + offset
+        feature = np.where(is_leaf, 0, tree.feature)
+        threshold = np.where(is_leaf, 0.0, tree.threshold)
+
+        features.append(feature)
+        thresholds.append(threshold)
+        children.append(np.column_stack([left, right]).ravel())
+        values.append(_leaf_distribution(tree, n_classes))
+        roots.append(offset)
+
+        max_depth = max(max_depth, tree.max_depth)
+        offset += tree.node_count
+
+    index_dtype = np.int32 if offset < np.iinfo(np.int32).max else np.int64
+
+    if imputer is not None:
+        fill_values = np.asarray(imputer.statistics_, dtype=np.float64)
+        if np.isnan(fill_values).any():
+            raise ValueError("Imputer has empty features; cannot compile")
+    else:
+        fill_values = np.full(n_features, np.nan)
+
+    feature_names = getattr(model, "feature_names_in_", None)
+
+    return CompiledForest(
+        feature=np.concatenate(features).astype(index_dtype),
+        threshold=np.concatenate(thresholds).astype(np.float64),
+        children=np.concatenate(children).astype(index_dtype),
+        value=np.concatenate(values),
+        roots=np.asarray(roots, dtype=index_dtype),
+        max_depth=max_depth,
+        fill_values=fill_values,
+        classes=np.asarray(forest.classes_),
+        feature_names=None if feature_names is None else list(feature_names),
+        derived=feature_builder is not None
+    )
+
+
+# ---------------- COMPACT EXPORT ----------------
+def _node_depths(left, right, roots):
+    """
+    Depth of every node reachable from roots, -1 for the rest.
+    """
+    depth = np.full(len(left), -1, dtype=np.int64)
+    frontier = np.asarray(roots, dtype=np.int64)
+    level = 0
+    while len(frontier):
+        depth[frontier] = level
+        internal = frontier[left[frontier] != frontier]
+        frontier = np.concatenate([left[internal], right[internal]])
+        level += 1
+    return depth
+
+
+def _floor_float32(values):
+    """
+    Largest float32 <= each float64 value. For float32 inputs x,
+    x > t and x > _floor_float32(t) always agree, so splits are exact.
+    """
+    rounded = values.astype(np.float32)
+    above = rounded.astype(np.float64) > values
+    rounded[above] = np.nextafter(rounded[above], np.float32(-np.inf))
+    return rounded
+
+
+def compact_forest(forest, leaf_bits=16, max_trees=None, max_depth=None,
+                   target_bytes=None, labels=None):
+    """
+    Smaller copy of a CompiledForest for export.
+
+    - thresholds become float32, rounded down so every split on float32
+      input goes the same way as before
+    - feature ids and child offsets use the narrowest unsigned type
+    - leaf distributions are quantized to leaf_bits-bit integers
+      (None keeps float64, which keeps predictions bit-identical)
+    - max_trees keeps the first trees; max_depth turns nodes at that
+      depth into leaves holding their own class distribution
+    - target_bytes drops trailing trees until the arrays fit
+    """
+    n_trees = forest.n_estimators if max_trees is None else min(max_trees, forest.n_estimators)
+    end = forest.n_nodes if n_trees == forest.n_estimators else int(forest.roots[n_trees])
+    roots = np.asarray(forest.roots[:n_trees], dtype=np.int64)
+
+    left = np.asarray(forest.left[:end], dtype=np.int64)
+    right = np.asarray(forest.right[:end], dtype=np.int64)
+    is_leaf = left == np.arange(end)
+
+    depth = _node_depths(left, right, roots)
+    keep = depth >= 0
+    new_depth = forest.max_depth
+    if max_depth is not None and max_depth < forest.max_depth:
+        keep &= depth <= max_depth
+        is_leaf = is_leaf | (depth == max_depth)
+        new_depth = max_depth
+
+    # Renumber surviving nodes; order is preserved, so children still
+    # come after their parent and child offsets stay non-negative
+    new_id = np.cumsum(keep) - 1
+    old_ids = np.flatnonzero(keep)
+    node_ids = np.arange(len(old_ids))
+    leaf = is_leaf[old_ids]
+    new_left = np.where(leaf, node_ids, new_id[left[old_ids]])
+    new_right = np.where(leaf, node_ids, new_id[right[old_ids]])
+    offsets = np.column_stack([new_left - node_ids, new_right - node_ids]).ravel()
+
+    feature = np.where(leaf, 0, forest.feature[old_ids])
+    threshold = np.where(leaf, 0.0, np.asarray(forest.threshold[old_ids], dtype=np.float64))
+
+    value = np.asarray(forest.value[old_ids], dtype=np.float64) / forest.value_scale
+    value_scale = 1.0
+    if leaf_bits is not None:
+        value_scale = float(2 ** leaf_bits - 1)
+        value = np.rint(value * value_scale).astype(np.min_scalar_type(int(value_scale)))
+
+    compact = CompiledForest(
+        feature=feature.astype(np.min_scalar_type(int(feature.max()))),
+        threshold=_floor_float32(threshold),
+        children=offsets.astype(np.min_scalar_type(int(offsets.max()))),
+        value=value,
+        roots=new_id[roots].astype(np.int32 if len(old_ids) < 2**30 else np.int64),
+        max_depth=new_depth,
+        fill_values=np.asarray(forest.fill_values),
+        classes=np.asarray(forest.classes_),
+        feature_names=forest.feature_names,
+        derived=forest.derived,
+        relative_children=True,
+        value_scale=value_scale,
+        labels=labels if labels is not None else forest.labels
+    )
+
+    if target_bytes is not None and compact.nbytes > target_bytes and n_trees > 1:
+        # Keep the longest prefix of trees whose nodes fit the budget
+        per_node = (compact.nbytes - compact.fill_values.nbytes) / compact.n_nodes
+        tree_ends = np.append(compact.roots[1:], compact.n_nodes)
+        fits = int(np.searchsorted(tree_ends * per_node, target_bytes, side="right"))
+        return compact_forest(forest, leaf_bits, max(1, fits), max_depth, None, labels)
+
+    return compact
@@ -0,0 +1,180 @@
+import io
+import zlib
+import threading
+
+import numpy as np
+import pandas as pd
+
+from src import columnar
+from src.utils import signature_key
+
+HOME_DATA_PATH = "usgs_earthquake_realistic_1000.csv"
+
+HIGH_RISK_ALERTS = ["orange", "red"]
+
+ALERT_COLORS = {
+    "green": "#4caf50",
+    "yellow": "#ffeb3b",
+    "orange": "#ff9800",
+    "red": "#f44336"
+}
+
+# Bytes before the last scanned offset that must be unchanged for an
+# append-only update; anything else triggers a full rescan
+TAIL_CHECK_BYTES = 4096
+
+
+class HomeAggregates:
+    """
+    Everything the Home tab shows for one version of the dataset.
+    """
+
+    def __init__(self, version, alert_counts, chart_png, total_quakes):
+        self.version = version
+        self.alert_counts = alert_counts
+        # Every row, including those without an alert level
+        self.total_quakes = int(total_quakes)
+        self.high_risk_quakes = int(alert_counts.reindex(HIGH_RISK_ALERTS).fillna(0).sum())
+        self.most_common_alert = alert_counts.idxmax()
+        self.chart_png = chart_png
+
+
+class _DatasetState:
+    def __init__(self):
+        self.signature = None
+        self.offset = 0
+        self.tail_crc = None
+        self.columns = None
+        self.counts = {}
+        self.rows = 0
+        self.aggregates = None
+        self.store_id = None
+
+
+# Shared by every Streamlit session in this process
+_states = {}
+_lock = threading.Lock()
+
+
+def home_aggregates(path=HOME_DATA_PATH):
+    """
+    Home-tab aggregates for the CSV at `path`, recomputed only when the
+    file changes. Appended rows are parsed incrementally; any other
+    change (rewrite, truncation) triggers a full rescan. A current
+    column store for the file (src/columnar.py) is read instead: only
+    its alert codes, memory-mapped, counting just the appended rows.
+    """
+    source = columnar.resolve(path)
+    signature = columnar.signature(source)
+    with _lock:
+        state = _states.setdefault(path, _DatasetState())
+        if state.aggregates is not None and signature == state.signature:
+            return state.aggregates
+
+        if columnar.is_store(source):
+            _count_store(state, source)
+            return _publish(state, signature)
+
+        full_scan = not _is_append(state, path, signature)
+        with open(path, "rb") as f:
+            if full_scan:
+                state.__init__()
+                header = f.readline()
+                state.columns = pd.read_csv(io.BytesIO(header)).columns.str.strip()
+                state.offset = f.tell()
+            f.seek(state.offset)
+            appended = f.read()
+
+        # On appends, leave a partially written last line for the next call
+        complete = appended if full_scan else appended[:appended.rfind(b"\n") + 1]
+        if complete:
+            _count_rows(state, complete)
+            state.offset += len(complete)
+            state.tail_crc = _tail_crc(path, state.offset)
+
+        return _publish(state, signature)
+
+
+def _publish(state, signature):
+    state.signature = signature
+    counts = _sorted_counts(state.counts)
+    version = signature_key(signature)
+    if state.aggregates is None or not counts.equals(state.aggregates.alert_counts):
+        state.aggregates = HomeAggregates(version, counts, render_alert_chart(counts), state.rows)
+    elif state.rows != state.aggregates.total_quakes:
+        # Only rows without an alert were added: same chart
+        state.aggregates = HomeAggregates(version, counts, state.aggregates.chart_png, state.rows)
+    else:
+        state.aggregates.version = version
+    return state.aggregates
+
+
+def _count_store(state, path):
+    store = columnar.ColumnStore.open(path)
+    # Stores only grow; a different store_id means it was rebuilt
+    if store.store_id != state.store_id or store.rows < state.offset or state.columns is not None:
+        state.__init__()
+        state.store_id = store.store_id
+
+    codes = store.column("alert")[state.offset:]
+    categories = store.categories("alert")
+    present = codes[codes >= 0]
+    counts = np.bincount(present, minlength=len(categories))
+    # First-seen order, like the CSV path
+    seen, first = np.unique(present, return_index=True)
+    for code in seen[np.argsort(first, kind="stable")]:
+        alert = categories[code]
+        state.counts[alert] = state.counts.get(alert, 0) + int(counts[code])
+    state.rows += len(codes)
+    state.offset = store.rows
+
+
+def _is_append(state, path, signature):
+    if state.aggregates is None or signature is None or signature[0] < state.offset:
+        return False
+    return _tail_crc(path, state.offset) == state.tail_crc
+
+
+def _tail_crc(path, offset):
+    with open(path, "rb") as f:
+        start = max(0, offset - TAIL_CHECK_BYTES)
+        f.seek(start)
+        return zlib.crc32(f.read(offset - start))
+
+
+def _count_rows(state, data):
+    rows = pd.read_csv(io.BytesIO(data), header=None, names=state.columns,
+                       usecols=["alert"])
+    state.rows += len(rows)
+    for alert, count in rows["alert"].value_counts(sort=False).items():
+        state.counts[alert] = state.counts.get(alert, 0) + int(count)
+
+
+def _sorted_counts(counts):
+    # Most frequent first, like value_counts(); ties keep first-seen order
+    series = pd.Series(counts, dtype="int64", name="count")
+    series.index.name = "alert"
+    return series.sort_values(ascending=False, kind="stable")
+
+
+def render_alert_chart(alert_counts):
+    """
+    Small alert-level bar chart as PNG bytes, rendered once per version.
+    """
+    # Figure API instead of pyplot: no global state shared between sessions
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=(2.5, 1.8))  # very small, card-size
+    ax = fig.subplots()
+    bar_colors = [ALERT_COLORS.get(alert.lower(), "#607d8b") for alert in alert_counts.index]
+    ax.bar(alert_counts.index, alert_counts.values, color=bar_colors)
+    ax.set_title("Alert Levels", fontsize=9)
+    ax.set_ylabel("Count", fontsize=7)
+    ax.set_xlabel("", fontsize=7)
+    ax.tick_params(axis='x', labelsize=7)
+    ax.tick_params(axis='y', labelsize=7)
+    ax.grid(False)  # remove grid for clean card look
+
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format="png", dpi=200, bbox_inches="tight")
+    return buffer.getvalue()
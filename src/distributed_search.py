@@ -0,0 +1,339 @@
+#distributed_search.py
+import os
+import sys
+import json
+import time
+import sqlite3
+import socket
+import hashlib
+import argparse
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from sklearn.model_selection import ParameterGrid, StratifiedKFold
+from sklearn.metrics import f1_score
+
+# Allow `python src/distributed_search.py` as well as `python -m src.distributed_search`
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src import metrics
+from src.incremental import save_profile
+from src.train_model import (DATA_PATH, PARAM_GRID, build_pipeline, load_data,
+                             split_data, evaluate, save_model)
+
+SEARCH_DB = "models/search.db"
+
+# A running cell whose lease hasn't been renewed for this many seconds
+# is handed out again (its worker is presumed dead)
+DEFAULT_LEASE = 900
+
+# Lease renewals per lease period while a cell is fitting
+HEARTBEATS_PER_LEASE = 3
+
+
+# ---------------- QUEUE ----------------
+def _connect(db_path):
+    conn = sqlite3.connect(db_path, timeout=60.0, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    return conn
+
+
+def data_fingerprint(X_train, y_train):
+    """
+    Short hash of the training split, so every worker provably
+    evaluates the same rows.
+    """
+    digest = hashlib.sha1(np.ascontiguousarray(X_train.to_numpy(dtype=np.float64)).tobytes())
+    digest.update(np.asarray(y_train, dtype=np.int64).tobytes())
+    return digest.hexdigest()[:16]
+
+
+def init_queue(db_path, X_train, y_train, data_path=None, cv=5):
+    """
+    Create one pending cell per (parameter set, fold). Re-running on
+    an existing queue for the same data keeps its finished cells.
+    """
+    fingerprint = data_fingerprint(X_train, y_train)
+    candidates = list(ParameterGrid(PARAM_GRID))
+
+    os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+    conn = _connect(db_path)
+    with conn:
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS cells ("
+            " id INTEGER PRIMARY KEY,"
+            " candidate INTEGER NOT NULL,"
+            " params TEXT NOT NULL,"
+            " fold INTEGER NOT NULL,"
+            " status TEXT NOT NULL DEFAULT 'pending',"
+            " worker TEXT, claimed_at REAL, finished_at REAL,"
+            " score REAL, fit_seconds REAL,"
+            " UNIQUE (candidate, fold))"
+        )
+
+        meta = dict(conn.execute("SELECT key, value FROM meta"))
+        if meta and (meta["fingerprint"] != fingerprint or int(meta["cv"]) != cv):
+            raise ValueError(f"{db_path} belongs to a different dataset or cv; "
+                             "use a new --db or delete it")
+
+        conn.executemany("INSERT OR REPLACE INTO meta VALUES (?, ?)", [
+            ("fingerprint", fingerprint),
+            ("cv", str(cv)),
+            ("data_path", data_path or meta.get("data_path") or "")
+        ])
+        conn.executemany(
+            "INSERT OR IGNORE INTO cells (candidate, params, fold) VALUES (?, ?, ?)",
+            [(index, json.dumps(params, sort_keys=True), fold)
+             for index, params in enumerate(candidates) for fold in range(cv)]
+        )
+    conn.close()
+
+
+def _claim(conn, worker, lease):
+    now = time.time()
+    return conn.execute(
+        "UPDATE cells SET status = 'running', worker = ?, claimed_at = ? "
+        "WHERE id = (SELECT id FROM cells "
+        "            WHERE status = 'pending' OR (status = 'running' AND claimed_at < ?) "
+        "            ORDER BY id LIMIT 1) "
+        "RETURNING id, params, fold",
+        (worker, now, now - lease)
+    ).fetchone()
+
+
+class _Heartbeat:
+    """
+    Renews a claimed cell's lease from a background thread while it is
+    being fitted, so a fit longer than the lease isn't handed out again.
+    """
+
+    def __init__(self, db_path, cell_id, worker, lease):
+        self.db_path = db_path
+        self.cell_id = cell_id
+        self.worker = worker
+        self.interval = lease / HEARTBEATS_PER_LEASE
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        # SQLite connections can't be shared across threads
+        conn = _connect(self.db_path)
+        try:
+            while not self._stop.wait(self.interval):
+                conn.execute("UPDATE cells SET claimed_at = ? "
+                             "WHERE id = ? AND worker = ? AND status = 'running'",
+                             (time.time(), self.cell_id, self.worker))
+        finally:
+            conn.close()
+
+
+def _release_dead_local_cells(conn):
+    """
+    Hand back cells claimed by processes on this host that no longer
+    exist (e.g. a killed run), without waiting for their lease.
+    """
+    host = socket.gethostname()
+    rows = conn.execute("SELECT id, worker FROM cells WHERE status = 'running' "
+                        "AND worker LIKE ?", (f"{host}:%",)).fetchall()
+    for cell_id, worker in rows:
+        pid = int(worker.rsplit(":", 1)[1])
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            conn.execute("UPDATE cells SET status = 'pending', worker = NULL "
+                         "WHERE id = ? AND worker = ? AND status = 'running'",
+                         (cell_id, worker))
+        except PermissionError:
+            pass
+
+
+def progress(db_path):
+    conn = _connect(db_path)
+    counts = dict(conn.execute("SELECT status, COUNT(*) FROM cells GROUP BY status"))
+    conn.close()
+    return counts
+
+
+# ---------------- WORKER ----------------
+def work(db_path, X_train=None, y_train=None, lease=DEFAULT_LEASE, max_cells=None, log=print):
+    """
+    Pull cells until the queue is empty, fitting one (params, fold) per
+    cell. Without X_train/y_train the data is rebuilt from the catalog
+    path recorded by init_queue, which is how workers on other hosts
+    sharing the filesystem join in. Returns the number of cells done.
+    """
+    conn = _connect(db_path)
+    meta = dict(conn.execute("SELECT key, value FROM meta"))
+    if X_train is None:
+        X, y_encoded, _ = load_data(meta["data_path"])
+        X_train, _, y_train, _ = split_data(X, y_encoded)
+    if data_fingerprint(X_train, y_train) != meta["fingerprint"]:
+        raise ValueError("Training data does not match the search queue")
+
+    folds = list(StratifiedKFold(n_splits=int(meta["cv"])).split(X_train, y_train))
+    worker = f"{socket.gethostname()}:{os.getpid()}"
+    _release_dead_local_cells(conn)
+
+    done = 0
+    while max_cells is None or done < max_cells:
+        cell = _claim(conn, worker, lease)
+        if cell is None:
+            break
+        cell_id, params, fold = cell
+        train_idx, val_idx = folds[fold]
+
+        start = time.perf_counter()
+        with _Heartbeat(db_path, cell_id, worker, lease):
+            pipeline = build_pipeline().set_params(**json.loads(params))
+            pipeline.fit(X_train.iloc[train_idx], y_train[train_idx])
+            preds = pipeline.predict(X_train.iloc[val_idx])
+            score = f1_score(y_train[val_idx], preds, average="weighted")
+        fit_seconds = time.perf_counter() - start
+
+        # Fits are deterministic, so the first finished result wins, even
+        # if the lease was handed to another worker in the meantime
+        recorded = conn.execute(
+            "UPDATE cells SET status = 'done', worker = ?, score = ?, fit_seconds = ?, "
+            "finished_at = ? WHERE id = ? AND status != 'done'",
+            (worker, score, fit_seconds, time.time(), cell_id)
+        ).rowcount
+        if recorded == 1:
+            done += 1
+            log(f"  [{worker}] cell {cell_id} fold {fold} {params} "
+                f"| f1_weighted={score:.4f} ({fit_seconds:.1f}s)")
+        else:
+            log(f"  [{worker}] cell {cell_id} already finished by another worker")
+
+    conn.close()
+    return done
+
+
+# ---------------- AGGREGATE ----------------
+def best_candidate(db_path):
+    """
+    (params, mean CV score) of the best finished parameter set, picked
+    like GridSearchCV: highest mean score, ties go to the earlier
+    candidate in ParameterGrid order.
+    """
+    conn = _connect(db_path)
+    cv = int(dict(conn.execute("SELECT key, value FROM meta"))["cv"])
+    rows = conn.execute(
+        "SELECT candidate, params, COUNT(*), AVG(score) FROM cells "
+        "WHERE status = 'done' GROUP BY candidate ORDER BY candidate"
+    ).fetchall()
+    pending = conn.execute("SELECT COUNT(*) FROM cells WHERE status != 'done'").fetchone()[0]
+    conn.close()
+
+    if pending:
+        raise RuntimeError(f"{pending} cell(s) not finished yet; run more workers")
+    complete = [(score, -candidate, params) for candidate, params, n, score in rows if n == cv]
+    score, _, params = max(complete)
+    return json.loads(params), score
+
+
+def distributed_search(X_train, y_train, n_jobs=-1, db_path=SEARCH_DB, data_path=None,
+                       workers=None, lease=DEFAULT_LEASE):
+    """
+    Checkpointed drop-in for grid_search: queue every (params, fold)
+    cell in SQLite, drain it with local worker processes, then refit
+    the best parameter set on the whole training split.
+    """
+    if workers is None:
+        workers = os.cpu_count() if n_jobs in (None, -1) else n_jobs
+
+    init_queue(db_path, X_train, y_train, data_path)
+    counts = progress(db_path)
+    print(f"Search queue {db_path}: {counts.get('done', 0)} of "
+          f"{sum(counts.values())} cells already done")
+
+    if workers <= 1:
+        work(db_path, X_train, y_train, lease)
+    else:
+        with ProcessPoolExecutor(workers) as pool:
+            futures = [pool.submit(work, db_path, X_train, y_train, lease)
+                       for _ in range(workers)]
+            for future in futures:
+                future.result()
+
+    best_params, best_score = best_candidate(db_path)
+    best_model = build_pipeline().set_params(**best_params)
+    with metrics.stage("train.final_fit").timer():
+        best_model.fit(X_train, y_train)
+    return best_model, best_params, best_score
+
+
+# ---------------- COMMAND LINE ----------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m src.distributed_search",
+                                     description="Checkpointed grid search over a shared "
+                                                 "SQLite work queue")
+    parser.add_argument("--db", default=SEARCH_DB, help="Queue file (on a shared filesystem "
+                                                        "for multi-host runs)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    init = commands.add_parser("init", help="Create the queue for a catalog")
+    init.add_argument("--data", default=DATA_PATH)
+
+    worker = commands.add_parser("work", help="Drain cells (run on any number of hosts)")
+    worker.add_argument("--processes", type=int, default=1)
+    worker.add_argument("--lease", type=float, default=DEFAULT_LEASE,
+                        help="Seconds without a heartbeat before a cell is handed out again")
+
+    commands.add_parser("status", help="Show queue progress")
+    commands.add_parser("finalize", help="Refit the best parameters and save models/*.pkl "
+                                         "and the drift profile")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "init":
+        X, y_encoded, _ = load_data(args.data)
+        X_train, _, y_train, _ = split_data(X, y_encoded)
+        init_queue(args.db, X_train, y_train, os.path.abspath(args.data))
+        print(f"Queue ready: {progress(args.db)}")
+
+    elif args.command == "work":
+        if args.processes <= 1:
+            work(args.db, lease=args.lease)
+        else:
+            with ProcessPoolExecutor(args.processes) as pool:
+                futures = [pool.submit(work, args.db, lease=args.lease)
+                           for _ in range(args.processes)]
+                for future in futures:
+                    future.result()
+        print(f"Queue: {progress(args.db)}")
+
+    elif args.command == "status":
+        print(progress(args.db))
+
+    elif args.command == "finalize":
+        conn = _connect(args.db)
+        data_path = dict(conn.execute("SELECT key, value FROM meta"))["data_path"]
+        conn.close()
+
+        X, y_encoded, le = load_data(data_path)
+        X_train, X_test, y_train, y_test = split_data(X, y_encoded)
+        best_params, best_score = best_candidate(args.db)
+        print(f"Best params {best_params}, cv f1_weighted={best_score:.4f}")
+
+        best_model = build_pipeline().set_params(**best_params)
+        best_model.fit(X_train, y_train)
+        evaluate(best_model, X_test, y_test)
+        save_model(best_model, le)
+
+        # Reference for the drift check in src/incremental.py, as train() writes
+        save_profile(X)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,428 @@
+#evaluate_model.py
+import os
+import sys
+import json
+import time
+import argparse
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+# Allow `python src/evaluate_model.py` as well as `python -m src.evaluate_model`
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import src.predict as predict
+from src.features import FEATURES
+from src.model_registry import MODEL_PATH, ENCODER_PATH
+from src.score_catalog import _init_worker, _read_chunks, in_process_registry
+
+DEFAULT_BINS = 10
+DEFAULT_REPLICATES = 1000
+
+# Replicates per bootstrap task; fixed so results don't depend on --workers
+REPLICATE_BLOCK = 250
+
+# Floor for log loss, as sklearn clips probabilities
+EPS = 1e-15
+
+
+# ---------------- STREAMING ACCUMULATOR ----------------
+class EvaluationAccumulator:
+    """
+    Everything the report needs, as counts and sums that can be updated
+    chunk by chunk and merged across workers. Memory is independent of
+    the number of rows.
+
+    Rows are counted per joint cell (true class, predicted class,
+    confidence bin): the confusion matrix, per-class metrics and the
+    top-label calibration curve are all functions of these counts.
+    """
+
+    def __init__(self, n_classes, n_bins=DEFAULT_BINS):
+        self.n_classes = n_classes
+        self.n_bins = n_bins
+        n_cells = n_classes * n_classes * n_bins
+        self.cells = np.zeros(n_cells, dtype=np.int64)
+        self.confidence_sum = np.zeros(n_cells)
+        # One-vs-rest reliability per class: [class, probability bin, is true class]
+        self.class_counts = np.zeros((n_classes, n_bins, 2), dtype=np.int64)
+        self.class_proba_sum = np.zeros((n_classes, n_bins))
+        self.log_loss_sum = 0.0
+        self.brier_sum = 0.0
+        self.rows = 0
+        self.skipped = 0
+
+    def _bin(self, p):
+        return np.minimum((p * self.n_bins).astype(np.int64), self.n_bins - 1)
+
+    def update(self, y_true, proba):
+        """
+        y_true: encoded labels (-1 = unlabeled, skipped);
+        proba: (rows, n_classes) in label order.
+        """
+        labeled = y_true >= 0
+        self.skipped += int((~labeled).sum())
+        y_true, proba = y_true[labeled], proba[labeled]
+        if not len(y_true):
+            return
+
+        K, B = self.n_classes, self.n_bins
+        y_pred = proba.argmax(axis=1)
+        confidence = proba[np.arange(len(y_pred)), y_pred]
+        cell = (y_true * K + y_pred) * B + self._bin(confidence)
+        self.cells += np.bincount(cell, minlength=len(self.cells))
+        self.confidence_sum += np.bincount(cell, weights=confidence, minlength=len(self.cells))
+
+        is_true = y_true[:, None] == np.arange(K)
+        bins = self._bin(proba)
+        for k in range(K):
+            key = bins[:, k] * 2 + is_true[:, k]
+            self.class_counts[k] += np.bincount(key, minlength=2 * B).reshape(B, 2)
+            self.class_proba_sum[k] += np.bincount(bins[:, k], weights=proba[:, k], minlength=B)
+
+        p_true = proba[np.arange(len(y_true)), y_true]
+        self.log_loss_sum += float(-np.log(np.clip(p_true, EPS, 1.0)).sum())
+        self.brier_sum += float(((proba - is_true) ** 2).sum())
+        self.rows += len(y_true)
+
+    def merge(self, other):
+        self.cells += other.cells
+        self.confidence_sum += other.confidence_sum
+        self.class_counts += other.class_counts
+        self.class_proba_sum += other.class_proba_sum
+        self.log_loss_sum += other.log_loss_sum
+        self.brier_sum += other.brier_sum
+        self.rows += other.rows
+        self.skipped += other.skipped
+        return self
+
+    def confusion_matrix(self):
+        K, B = self.n_classes, self.n_bins
+        return self.cells.reshape(K, K, B).sum(axis=2)
+
+
+# ---------------- METRICS (VECTORIZED OVER REPLICATES) ----------------
+def _safe_divide(a, b):
+    return np.divide(a, b, out=np.zeros(np.broadcast(a, b).shape), where=b > 0)
+
+
+def cell_metrics(cells, confidence_mean, n_classes, n_bins):
+    """
+    Metrics for a batch of joint-cell count vectors, shape (R, cells).
+    Returns arrays with a leading replicate axis. Calibration uses each
+    cell's mean confidence, which is exact for the observed data.
+    """
+    K, B = n_classes, n_bins
+    counts = cells.reshape(-1, K, K, B)
+    cm = counts.sum(axis=3)
+    n = cm.sum(axis=(1, 2))
+
+    tp = np.diagonal(cm, axis1=1, axis2=2)
+    support = cm.sum(axis=2)
+    predicted = cm.sum(axis=1)
+    precision = _safe_divide(tp, predicted)
+    recall = _safe_divide(tp, support)
+    f1 = _safe_divide(2 * precision * recall, precision + recall)
+
+    # Top-label calibration: per confidence bin, accuracy vs mean confidence
+    correct = np.diagonal(counts, axis1=1, axis2=2).sum(axis=2)  # (R, B)
+    bin_counts = counts.sum(axis=(1, 2))
+    bin_conf = (counts * confidence_mean.reshape(K, K, B)).sum(axis=(1, 2))
+    gap = np.abs(_safe_divide(correct, bin_counts) - _safe_divide(bin_conf, bin_counts))
+    ece = (gap * bin_counts).sum(axis=1) / n
+
+    return {
+        "accuracy": tp.sum(axis=1) / n,
+        "macro_f1": f1.mean(axis=1),
+        "weighted_f1": (f1 * support).sum(axis=1) / n,
+        "precision": precision,
+        "recall": recall,
+        "f1": f1,
+        "ece": ece
+    }
+
+
+def _bootstrap_block(cells, replicates, seed):
+    """
+    Joint-cell counts of `replicates` bootstrap resamples of the rows.
+
+    Resampling N row indices with replacement and counting them per
+    cell is a multinomial draw over the cells, so one vectorized draw
+    per replicate replaces N index lookups and never re-scores a row.
+    """
+    rng = np.random.default_rng(seed)
+    n = int(cells.sum())
+    return rng.multinomial(n, cells / n, size=replicates)
+
+
+def bootstrap(acc, replicates=DEFAULT_REPLICATES, confidence=0.95, seed=0, workers=1):
+    """
+    Percentile confidence intervals for every metric in cell_metrics.
+    Replicate blocks run in parallel; each block has its own
+    SeedSequence child, so results are the same for any worker count.
+    """
+    blocks = [min(REPLICATE_BLOCK, replicates - start)
+              for start in range(0, replicates, REPLICATE_BLOCK)]
+    seeds = np.random.SeedSequence(seed).spawn(len(blocks))
+
+    if workers <= 1 or len(blocks) == 1:
+        draws = [_bootstrap_block(acc.cells, size, s) for size, s in zip(blocks, seeds)]
+    else:
+        with ProcessPoolExecutor(min(workers, len(blocks))) as pool:
+            draws = list(pool.map(_bootstrap_block, [acc.cells] * len(blocks), blocks, seeds))
+
+    confidence_mean = _safe_divide(acc.confidence_sum, acc.cells)
+    samples = cell_metrics(np.concatenate(draws), confidence_mean, acc.n_classes, acc.n_bins)
+    tail = (1 - confidence) / 2 * 100
+    return {name: np.percentile(values, [tail, 100 - tail], axis=0)
+            for name, values in samples.items()}
+
+
+# ---------------- SCORING ----------------
+def _evaluate_chunk(chunk, labels, n_bins):
+    """
+    Score one chunk and fold it into a fresh accumulator.
+    Top-level so it can run in a process pool.
+    """
+    current = predict.registry.get()
+    proba = predict._predict_proba(current, chunk[FEATURES].to_numpy(dtype=float))
+    # Model columns are encoded class ids; put them in label order
+    full = np.zeros((len(proba), len(labels)))
+    full[:, current.classes_.astype(np.int64)] = proba
+
+    alerts = chunk["alert"].astype(str).to_numpy()
+    y_true = np.searchsorted(labels, alerts)
+    known = (y_true < len(labels)) & (np.asarray(labels, dtype=object)[
+        np.minimum(y_true, len(labels) - 1)] == alerts)
+    y_true = np.where(known & chunk["alert"].notna().to_numpy(), y_true, -1)
+
+    acc = EvaluationAccumulator(len(labels), n_bins)
+    acc.update(y_true, full)
+    return acc
+
+
+def stream_evaluate(data_path, model_path=MODEL_PATH, encoder_path=ENCODER_PATH,
+                    chunk_size=250_000, workers=None, n_bins=DEFAULT_BINS, log=sys.stderr):
+    """
+    Score a labeled CSV/Parquet catalog chunk by chunk in a process pool
+    and accumulate the evaluation counts. At most 2 x workers chunks are
+    in memory at once. Returns (accumulator, labels, model version).
+    """
+    workers = os.cpu_count() if workers is None else workers
+    # Only for the labels (and single-worker scoring); the caller's
+    # registry is restored afterwards
+    with in_process_registry(model_path, encoder_path) as registry:
+        current = registry.get()
+        labels = np.array([str(label) for label in current.label_encoder.classes_])
+
+        acc = EvaluationAccumulator(len(labels), n_bins)
+        start = time.perf_counter()
+
+        def completed(part):
+            acc.merge(part)
+            rate = acc.rows / (time.perf_counter() - start)
+            print(f"  {acc.rows:,} rows ({rate:,.0f} rows/s)", file=log)
+
+        chunks = _read_chunks(data_path, chunk_size, 0)
+        if workers <= 1:
+            for chunk in chunks:
+                completed(_evaluate_chunk(chunk, labels, n_bins))
+        else:
+            with ProcessPoolExecutor(workers, initializer=_init_worker,
+                                     initargs=(model_path, encoder_path)) as pool:
+                pending = deque()
+                for chunk in chunks:
+                    pending.append(pool.submit(_evaluate_chunk, chunk, labels, n_bins))
+                    if len(pending) >= 2 * workers:
+                        completed(pending.popleft().result())
+                while pending:
+                    completed(pending.popleft().result())
+
+    return acc, labels, current.version
+
+
+# ---------------- REPORT ----------------
+def _with_ci(value, ci):
+    return {"value": float(value), "ci": [float(ci[0]), float(ci[1])]}
+
+
+def build_report(acc, labels, replicates=DEFAULT_REPLICATES, confidence=0.95,
+                 seed=0, workers=1):
+    if acc.rows == 0:
+        raise ValueError(f"no labeled rows to evaluate ({acc.skipped:,} rows had a "
+                         "missing or unknown alert)")
+    confidence_mean = _safe_divide(acc.confidence_sum, acc.cells)
+    point = {name: values[0] for name, values in
+             cell_metrics(acc.cells[None], confidence_mean, acc.n_classes, acc.n_bins).items()}
+    ci = bootstrap(acc, replicates, confidence, seed, workers) if replicates else None
+
+    def metric(name, index=None):
+        value = point[name] if index is None else point[name][index]
+        if ci is None:
+            return {"value": float(value), "ci": None}
+        bounds = ci[name] if index is None else ci[name][:, index]
+        return _with_ci(value, bounds)
+
+    cm = acc.confusion_matrix()
+    K, B = acc.n_classes, acc.n_bins
+    counts = acc.cells.reshape(K, K, B)
+    bin_counts = counts.sum(axis=(0, 1))
+    bin_correct = np.diagonal(counts).sum(axis=1)
+    bin_conf = acc.confidence_sum.reshape(K, K, B).sum(axis=(0, 1))
+    edges = np.linspace(0, 1, B + 1)
+
+    return {
+        "rows": acc.rows,
+        "skipped_rows": acc.skipped,
+        "labels": list(labels),
+        "accuracy": metric("accuracy"),
+        "macro_f1": metric("macro_f1"),
+        "weighted_f1": metric("weighted_f1"),
+        "log_loss": acc.log_loss_sum / acc.rows,
+        "brier": acc.brier_sum / acc.rows,
+        "confusion_matrix": cm.tolist(),
+        "per_class": {
+            str(label): {
+                "precision": metric("precision", k),
+                "recall": metric("recall", k),
+                "f1": metric("f1", k),
+                "support": int(cm[k].sum())
+            }
+            for k, label in enumerate(labels)
+        },
+        "calibration": {
+            "bins": B,
+            "ece": metric("ece"),
+            "top_label": [
+                {"bin": [float(edges[b]), float(edges[b + 1])], "count": int(bin_counts[b]),
+                 "mean_confidence": float(bin_conf[b] / bin_counts[b]) if bin_counts[b] else None,
+                 "accuracy": float(bin_correct[b] / bin_counts[b]) if bin_counts[b] else None}
+                for b in range(B)
+            ],
+            "per_class": {
+                str(label): [
+                    {"bin": [float(edges[b]), float(edges[b + 1])],
+                     "count": int(acc.class_counts[k, b].sum()),
+                     "mean_probability": float(acc.class_proba_sum[k, b] / acc.class_counts[k, b].sum())
+                     if acc.class_counts[k, b].sum() else None,
+                     "fraction_positive": float(acc.class_counts[k, b, 1] / acc.class_counts[k, b].sum())
+                     if acc.class_counts[k, b].sum() else None}
+                    for b in range(B)
+                ]
+                for k, label in enumerate(labels)
+            }
+        },
+        "bootstrap": {"replicates": replicates, "confidence": confidence, "seed": seed}
+    }
+
+
+def evaluate(data_path, output=None, model_path=MODEL_PATH, encoder_path=ENCODER_PATH,
+             chunk_size=250_000, workers=None, n_bins=DEFAULT_BINS,
+             replicates=DEFAULT_REPLICATES, confidence=0.95, seed=0):
+    start = time.perf_counter()
+    acc, labels, version = stream_evaluate(data_path, model_path, encoder_path,
+                                           chunk_size, workers, n_bins)
+    scored = time.perf_counter()
+    report = build_report(acc, labels, replicates, confidence, seed,
+                          os.cpu_count() if workers is None else workers)
+    report = {
+        "model": {"path": model_path, "version": version},
+        "data": os.path.abspath(data_path),
+        **report,
+        "seconds": {"scoring": scored - start, "bootstrap": time.perf_counter() - scored}
+    }
+
+    if output:
+        os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+        with open(output + ".tmp", "w") as f:
+            json.dump(report, f, indent=2)
+        os.replace(output + ".tmp", output)
+    return report
+
+
+# ---------------- PRINTING / COMPARISON ----------------
+def _fmt(metric):
+    if metric["ci"] is None:
+        return f"{metric['value']:.4f}"
+    lo, hi = metric["ci"]
+    return f"{metric['value']:.4f} [{lo:.4f}, {hi:.4f}]"
+
+
+def print_report(report):
+    print(f"model {report['model']['version']} on {report['rows']:,} rows "
+          f"({report['skipped_rows']:,} unlabeled skipped)")
+    for name in ("accuracy", "macro_f1", "weighted_f1"):
+        print(f"  {name:12s} {_fmt(report[name])}")
+    print(f"  {'ece':12s} {_fmt(report['calibration']['ece'])}")
+    print(f"  log_loss     {report['log_loss']:.4f}   brier {report['brier']:.4f}")
+    print(f"\n  {'class':8s} {'precision':>26s} {'recall':>26s} {'f1':>26s} {'support':>9s}")
+    for label, m in report["per_class"].items():
+        print(f"  {label:8s} {_fmt(m['precision']):>26s} {_fmt(m['recall']):>26s} "
+              f"{_fmt(m['f1']):>26s} {m['support']:9,d}")
+
+
+def compare(baseline, candidate):
+    """
+    Headline and per-class metric deltas between two reports. A change
+    is marked significant when the two confidence intervals don't overlap.
+    """
+    rows = [(name, baseline[name], candidate[name])
+            for name in ("accuracy", "macro_f1", "weighted_f1")]
+    rows.append(("ece", baseline["calibration"]["ece"], candidate["calibration"]["ece"]))
+    for label in candidate["per_class"]:
+        if label in baseline["per_class"]:
+            rows.append((f"f1[{label}]", baseline["per_class"][label]["f1"],
+                         candidate["per_class"][label]["f1"]))
+
+    print(f"{'metric':14s} {'baseline':>9s} {'candidate':>10s} {'change':>9s}")
+    for name, old, new in rows:
+        flag = ""
+        if old["ci"] and new["ci"] and (new["ci"][0] > old["ci"][1] or new["ci"][1] < old["ci"][0]):
+            flag = "  significant"
+        print(f"{name:14s} {old['value']:9.4f} {new['value']:10.4f} "
+              f"{new['value'] - old['value']:+9.4f}{flag}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m src.evaluate_model",
+                                     description="Streaming model evaluation with "
+                                                 "bootstrap confidence intervals")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="Evaluate a model on a labeled catalog")
+    run.add_argument("--data", required=True, help="CSV or .parquet catalog with alert")
+    run.add_argument("--output", help="JSON report path")
+    run.add_argument("--model", default=MODEL_PATH, help="Model pickle or compact export directory")
+    run.add_argument("--encoder", default=ENCODER_PATH)
+    run.add_argument("--chunk-size", type=int, default=250_000)
+    run.add_argument("--workers", type=int, default=None,
+                     help="Worker processes (default: all cores, 1 = in-process)")
+    run.add_argument("--bins", type=int, default=DEFAULT_BINS, help="Calibration bins")
+    run.add_argument("--bootstrap", type=int, default=DEFAULT_REPLICATES,
+                     help="Bootstrap replicates (0 = no intervals)")
+    run.add_argument("--confidence", type=float, default=0.95)
+    run.add_argument("--seed", type=int, default=0)
+
+    diff = commands.add_parser("compare", help="Compare two JSON reports")
+    diff.add_argument("baseline")
+    diff.add_argument("candidate")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "run":
+        report = evaluate(args.data, args.output, args.model, args.encoder, args.chunk_size,
+                          args.workers, args.bins, args.bootstrap, args.confidence, args.seed)
+        print_report(report)
+        if args.output:
+            print(f"\n✅ Report saved -> {args.output}")
+    elif args.command == "compare":
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        with open(args.candidate) as f:
+            candidate = json.load(f)
+        compare(baseline, candidate)
+
+
+if __name__ == "__main__":
+    main()
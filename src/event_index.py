@@ -0,0 +1,455 @@
+import os
+import sys
+import json
+import heapq
+import shutil
+import argparse
+import tempfile
+import threading
+
+import numpy as np
+import pandas as pd
+
+from src import columnar
+from src.features import FEATURES, read_catalog
+from src.utils import signature_key
+
+INDEX_DIR = "models/event_index"
+CATALOG_PATH = "usgs_earthquake_realistic_1000.csv"
+
+POSITION_COLUMNS = ["latitude", "longitude", "time"]
+
+# Points per KD-tree leaf; leaves are scanned with one vectorized
+# distance, so larger leaves mean fewer Python-level heap steps
+LEAF_SIZE = 128
+
+# Lat/lon grid cell size in degrees
+CELL_DEG = 1.0
+
+EARTH_RADIUS_KM = 6371.0
+
+
+def haversine_km(lat, lon, lats, lons):
+    lat, lon = np.radians(lat), np.radians(lon)
+    lats, lons = np.radians(lats), np.radians(lons)
+    a = (np.sin((lats - lat) / 2) ** 2
+         + np.cos(lat) * np.cos(lats) * np.sin((lons - lon) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+# ---------------- INDEX ----------------
+class EventIndex:
+    """
+    Nearest historical events for one version of a catalog.
+
+    - feature space: an implicit balanced KD-tree over the five inputs,
+      standardized (median fill for missing values, unit variance).
+      Node i has children 2i+1 and 2i+2 and covers a contiguous range of
+      the reordered points, so only split dims and values are stored.
+    - geography: events bucketed into a CELL_DEG lat/lon grid in CSR
+      form (cell offsets + event ids sorted by cell, then time), plus a
+      time-sorted id list for pure time-window queries.
+
+    Every array is a flat .npy file, memory-mapped on load, and the
+    catalog's own columns are kept alongside to return whole events.
+    """
+
+    def __init__(self, arrays, meta):
+        self.arrays = arrays
+        self.meta = meta
+        self.version = meta["version"]
+        self.n_events = meta["n_events"]
+        self.has_positions = meta["has_positions"]
+        self._center = np.array(meta["center"])
+        self._scale = np.array(meta["scale"])
+        # Category codes decode with one take; the extra None is code -1
+        self._categories = {name: np.array(values + [None], dtype=object)
+                            for name, values in meta["categories"].items()}
+        self._splits = None
+
+    # ---------------- BUILD ----------------
+    @classmethod
+    def build(cls, df, version=None, leaf_size=LEAF_SIZE, cell_deg=CELL_DEG):
+        n = len(df)
+        raw = df[FEATURES].to_numpy(dtype=np.float64)
+        center = np.nanmedian(raw, axis=0) if n else np.zeros(len(FEATURES))
+        center = np.where(np.isnan(center), 0.0, center)
+        filled = np.where(np.isnan(raw), center, raw)
+        scale = filled.std(axis=0) if n else np.ones(len(FEATURES))
+        scale = np.where(scale > 0, scale, 1.0)
+        points = (filled - center) / scale
+
+        depth = max(0, int(np.ceil(np.log2(max(n, 1) / leaf_size))))
+        split_dim, split_value, order = _build_kd(points, depth)
+
+        arrays = {
+            "kd_points": points[order].astype(np.float32),
+            "kd_ids": order.astype(np.int64),
+            "split_dim": split_dim,
+            "split_value": split_value
+        }
+
+        categories = {}
+        for name in df.columns:
+            column = df[name]
+            if column.dtype.kind not in "biuf":
+                # Text (e.g. alert) as category codes, -1 for missing
+                column = column.astype("category")
+                categories[name] = [str(c) for c in column.cat.categories]
+                column = column.cat.codes
+            arrays[f"col_{name}"] = column.to_numpy()
+
+        has_positions = all(name in df.columns for name in POSITION_COLUMNS)
+        if has_positions:
+            arrays.update(_build_grid(df, cell_deg))
+
+        meta = {
+            "version": version,
+            "n_events": n,
+            "columns": list(df.columns),
+            "categories": categories,
+            "center": center.tolist(),
+            "scale": scale.tolist(),
+            "kd_depth": depth,
+            "has_positions": has_positions,
+            "cell_deg": cell_deg
+        }
+        return cls(arrays, meta)
+
+    def save(self, directory):
+        # Assembled next to its destination and renamed into place, so a
+        # concurrent reader never sees a half-written index
+        parent = os.path.dirname(os.path.abspath(directory))
+        os.makedirs(parent, exist_ok=True)
+        tmp_dir = tempfile.mkdtemp(dir=parent, prefix=".event-index-")
+        try:
+            for name, array in self.arrays.items():
+                np.save(os.path.join(tmp_dir, f"{name}.npy"), array)
+            with open(os.path.join(tmp_dir, "meta.json"), "w") as f:
+                json.dump({**self.meta, "arrays": list(self.arrays)}, f)
+            if os.path.isdir(directory):
+                shutil.rmtree(directory)
+            os.replace(tmp_dir, directory)
+        except BaseException:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+
+    @classmethod
+    def load(cls, directory, mmap_mode="r"):
+        with open(os.path.join(directory, "meta.json")) as f:
+            meta = json.load(f)
+        # Plain ndarray views of the maps: same pages, cheaper slicing
+        arrays = {name: np.asarray(np.load(os.path.join(directory, f"{name}.npy"),
+                                           mmap_mode=mmap_mode))
+                  for name in meta.pop("arrays")}
+        return cls(arrays, meta)
+
+    # ---------------- EVENTS ----------------
+    def events(self, ids, **extra):
+        """
+        Catalog rows for event ids, in the given order, plus any extra
+        columns (one value per id).
+        """
+        ids = np.asarray(ids, dtype=np.int64)
+        columns = {}
+        for name in self.meta["columns"]:
+            values = self.arrays[f"col_{name}"][ids]
+            if name in self._categories:
+                values = self._categories[name][values]
+            columns[name] = values
+        columns.update(extra)
+        return pd.DataFrame(columns, index=pd.Index(ids, name="event"))
+
+    # ---------------- FEATURE SPACE ----------------
+    def nearest(self, values, k=5):
+        """
+        The k events closest to `values` (the five inputs) in
+        standardized feature space, with a `distance` column.
+        """
+        k = min(k, self.n_events)
+        if k <= 0:
+            return self.events([], distance=[])
+
+        query = np.asarray(values, dtype=np.float64)
+        query = (np.where(np.isnan(query), self._center, query) - self._center) / self._scale
+        ids, distances = self._kd_query(query, k)
+        return self.events(ids, distance=distances)
+
+    def _kd_query(self, query, k):
+        points = self.arrays["kd_points"]
+        if self._splits is None:
+            # Python lists: the walk reads them one scalar at a time
+            self._splits = (self.arrays["split_dim"].tolist(),
+                            self.arrays["split_value"].tolist())
+        split_dim, split_value = self._splits
+        n_internal = len(split_dim)
+        coords = query.tolist()
+
+        best_d = np.full(k, np.inf)
+        best_i = np.zeros(k, dtype=np.int64)
+        worst = np.inf
+
+        # Best-first: (lower bound on squared distance, node, start, stop)
+        heap = [(0.0, 0, 0, self.n_events)]
+        while heap:
+            bound, node, start, stop = heapq.heappop(heap)
+            if bound >= worst:
+                break
+
+            if node >= n_internal:
+                d = ((points[start:stop] - query) ** 2).sum(axis=1)
+                d = np.concatenate([best_d, d])
+                i = np.concatenate([best_i, np.arange(start, stop)])
+                keep = np.argpartition(d, k - 1)[:k] if len(d) > k else slice(None)
+                best_d, best_i = d[keep], i[keep]
+                worst = best_d.max()
+                continue
+
+            mid = (start + stop) // 2
+            gap = coords[split_dim[node]] - split_value[node]
+            near, far = (2 * node + 1, 2 * node + 2) if gap <= 0 else (2 * node + 2, 2 * node + 1)
+            near_range, far_range = ((start, mid), (mid, stop)) if gap <= 0 else ((mid, stop), (start, mid))
+            heapq.heappush(heap, (bound, near, *near_range))
+            far_bound = max(bound, gap * gap)
+            if far_bound < worst:
+                heapq.heappush(heap, (far_bound, far, *far_range))
+
+        order = np.argsort(best_d, kind="stable")
+        return self.arrays["kd_ids"][best_i[order]], np.sqrt(best_d[order])
+
+    # ---------------- GEOGRAPHY ----------------
+    def _require_positions(self):
+        if not self.has_positions:
+            raise ValueError("This catalog has no latitude/longitude/time columns; "
+                             "regenerate it with generate_usgs_dataset.py")
+
+    def within(self, latitude, longitude, radius_km, start=None, end=None):
+        """
+        Events within radius_km of a point, optionally with start <=
+        time < end (epoch ms), nearest first, with a `distance_km` column.
+        """
+        self._require_positions()
+        positions = self._grid_candidates(latitude, longitude, radius_km)
+        ids, distances = self._filter(positions, latitude, longitude, radius_km, start, end)
+        return self.events(ids, distance_km=distances)
+
+    def nearest_geo(self, latitude, longitude, k=5, start=None, end=None):
+        """
+        The k events closest to a point on the globe (optionally within
+        a time window), nearest first, with a `distance_km` column.
+        """
+        self._require_positions()
+        radius = 2 * self.meta["cell_deg"] * 111.2
+        max_radius = np.pi * EARTH_RADIUS_KM
+        while True:
+            positions = self._grid_candidates(latitude, longitude, radius)
+            ids, distances = self._filter(positions, latitude, longitude, radius, start, end)
+            # Everything within radius is found, so k of them are the k nearest
+            if len(ids) >= k or radius >= max_radius:
+                return self.events(ids[:k], distance_km=distances[:k])
+            radius = min(radius * 4, max_radius)
+
+    def between(self, start=None, end=None, limit=None):
+        """
+        Events with start <= time < end (epoch ms), oldest first.
+        """
+        self._require_positions()
+        times = self.arrays["time_sorted"]
+        lo = 0 if start is None else np.searchsorted(times, np.int64(start), side="left")
+        hi = len(times) if end is None else np.searchsorted(times, np.int64(end), side="left")
+        if limit is not None:
+            hi = min(hi, lo + limit)
+        return self.events(self.arrays["time_ids"][lo:hi])
+
+    def _grid_candidates(self, latitude, longitude, radius_km):
+        """
+        Positions (into the cell-sorted arrays) of every event in grid
+        cells that overlap the circle's bounding box.
+        """
+        cell = self.meta["cell_deg"]
+        n_rows, n_cols = int(round(180 / cell)), int(round(360 / cell))
+        offsets = self.arrays["cell_offsets"]
+
+        angle = radius_km / EARTH_RADIUS_KM
+        lat_lo = latitude - np.degrees(angle)
+        lat_hi = latitude + np.degrees(angle)
+        row_lo = max(0, int((lat_lo + 90) // cell))
+        row_hi = min(n_rows - 1, int((lat_hi + 90) // cell))
+
+        # Circles that reach a pole span every longitude
+        if lat_lo <= -90 or lat_hi >= 90 or angle >= np.pi / 2:
+            col_ranges = [(0, n_cols - 1)]
+        else:
+            dlon = np.degrees(np.arcsin(min(1.0, np.sin(angle) / np.cos(np.radians(latitude)))))
+            col_lo = int((longitude - dlon + 180) // cell)
+            col_hi = int((longitude + dlon + 180) // cell)
+            if col_hi - col_lo + 1 >= n_cols:
+                col_ranges = [(0, n_cols - 1)]
+            elif col_lo < 0:
+                col_ranges = [(col_lo + n_cols, n_cols - 1), (0, col_hi)]
+            elif col_hi >= n_cols:
+                col_ranges = [(col_lo, n_cols - 1), (0, col_hi - n_cols)]
+            else:
+                col_ranges = [(col_lo, col_hi)]
+
+        # Within one grid row, a run of columns is one contiguous slice
+        slices = [np.arange(offsets[row * n_cols + lo], offsets[row * n_cols + hi + 1])
+                  for row in range(row_lo, row_hi + 1) for lo, hi in col_ranges]
+        return np.concatenate(slices) if slices else np.zeros(0, dtype=np.int64)
+
+    def _filter(self, positions, latitude, longitude, radius_km, start, end):
+        if start is not None or end is not None:
+            times = self.arrays["geo_time"][positions]
+            keep = np.ones(len(positions), dtype=bool)
+            if start is not None:
+                keep &= times >= np.int64(start)
+            if end is not None:
+                keep &= times < np.int64(end)
+            positions = positions[keep]
+
+        # Haversine on stored radians and cos(latitude)
+        lat, lon = np.radians(latitude), np.radians(longitude)
+        lats = self.arrays["geo_lat"][positions]
+        a = (np.sin((lats - lat) / 2) ** 2
+             + np.cos(lat) * self.arrays["geo_cos_lat"][positions]
+             * np.sin((self.arrays["geo_lon"][positions] - lon) / 2) ** 2)
+        distances = 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+        inside = distances <= radius_km
+        positions, distances = positions[inside], distances[inside]
+        order = np.argsort(distances, kind="stable")
+        return self.arrays["geo_ids"][positions[order]], distances[order]
+
+
+def _build_kd(points, depth):
+    """
+    (split_dim, split_value, order) for an implicit KD-tree of `depth`
+    levels: each node splits its range at the midpoint of the widest
+    dimension (median partition).
+    """
+    n_internal = 2 ** depth - 1
+    split_dim = np.zeros(n_internal, dtype=np.int8)
+    split_value = np.zeros(n_internal, dtype=np.float32)
+    order = np.arange(len(points))
+
+    ranges = [(0, len(points))]
+    for level in range(depth):
+        next_ranges = []
+        for offset, (start, stop) in enumerate(ranges):
+            node = 2 ** level - 1 + offset
+            mid = (start + stop) // 2
+            block = points[order[start:stop]]
+            if len(block):
+                dim = int(np.argmax(block.max(axis=0) - block.min(axis=0)))
+                part = np.argpartition(block[:, dim], mid - start) if stop - start > 1 \
+                    else np.arange(stop - start)
+                order[start:stop] = order[start:stop][part]
+                split_dim[node] = dim
+                # float32 like the stored points, so the query compares like for like
+                split_value[node] = np.float32(points[order[mid], dim]) if mid < stop \
+                    else np.float32(points[order[start], dim])
+            next_ranges += [(start, mid), (mid, stop)]
+        ranges = next_ranges
+    return split_dim, split_value, order
+
+
+def _build_grid(df, cell_deg):
+    latitude = df["latitude"].to_numpy(dtype=np.float64)
+    longitude = df["longitude"].to_numpy(dtype=np.float64)
+    time = df["time"].to_numpy(dtype=np.int64)
+
+    n_rows, n_cols = int(round(180 / cell_deg)), int(round(360 / cell_deg))
+    row = np.clip(((latitude + 90) // cell_deg).astype(np.int64), 0, n_rows - 1)
+    col = (((longitude + 180) // cell_deg).astype(np.int64)) % n_cols
+    cells = row * n_cols + col
+
+    order = np.lexsort((time, cells))
+    offsets = np.zeros(n_rows * n_cols + 1, dtype=np.int64)
+    np.cumsum(np.bincount(cells, minlength=n_rows * n_cols), out=offsets[1:])
+
+    by_time = np.argsort(time, kind="stable")
+    return {
+        "cell_offsets": offsets,
+        "geo_ids": order.astype(np.int64),
+        # Radians, ready for haversine
+        "geo_lat": np.radians(latitude[order]),
+        "geo_lon": np.radians(longitude[order]),
+        "geo_cos_lat": np.cos(np.radians(latitude[order])),
+        "geo_time": time[order],
+        "time_ids": by_time.astype(np.int64),
+        "time_sorted": time[by_time]
+    }
+
+
+# ---------------- PER-VERSION CACHE ----------------
+# Loaded indexes shared by every caller in this process
+_indexes = {}
+_lock = threading.Lock()
+
+
+def event_index(path=CATALOG_PATH, index_dir=INDEX_DIR):
+    """
+    Index for the catalog at `path`, built once per file version and
+    stored under index_dir/<version>; later processes memory-map it.
+    """
+    source = columnar.resolve(path)
+    version = signature_key(columnar.signature(source), os.path.abspath(source))
+    with _lock:
+        cached = _indexes.get(path)
+        if cached is not None and cached.version == version:
+            return cached
+
+        directory = os.path.join(index_dir, version)
+        try:
+            index = EventIndex.load(directory)
+        except (OSError, ValueError, KeyError):
+            index = EventIndex.build(read_catalog(source), version=version)
+            try:
+                index.save(directory)
+                index = EventIndex.load(directory)
+            except OSError:
+                # Read-only disk: keep serving the in-memory index
+                pass
+        _indexes[path] = index
+        return index
+
+
+# ---------------- COMMAND LINE ----------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m src.event_index",
+                                     description="Nearest historical events")
+    parser.add_argument("--catalog", default=CATALOG_PATH, help="CSV or .parquet catalog")
+    parser.add_argument("--index-dir", default=INDEX_DIR)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    commands.add_parser("build", help="Build (or reuse) the index for this catalog version")
+
+    similar = commands.add_parser("similar", help="k nearest events in feature space")
+    for name in FEATURES:
+        similar.add_argument(f"--{name}", type=float, required=True)
+    similar.add_argument("-k", type=int, default=5)
+
+    near = commands.add_parser("near", help="Events near a point, optionally in a time window")
+    near.add_argument("--lat", type=float, required=True)
+    near.add_argument("--lon", type=float, required=True)
+    near.add_argument("--radius-km", type=float, default=None,
+                      help="All events within this radius (default: the k nearest)")
+    near.add_argument("-k", type=int, default=5)
+    near.add_argument("--start", type=int, default=None, help="Epoch ms, inclusive")
+    near.add_argument("--end", type=int, default=None, help="Epoch ms, exclusive")
+
+    args = parser.parse_args(argv)
+    index = event_index(args.catalog, args.index_dir)
+
+    if args.command == "build":
+        print(f"{index.n_events:,} events indexed -> "
+              f"{os.path.join(args.index_dir, index.version)}", file=sys.stderr)
+    elif args.command == "similar":
+        print(index.nearest([getattr(args, name) for name in FEATURES], k=args.k).to_string())
+    elif args.radius_km is not None:
+        print(index.within(args.lat, args.lon, args.radius_km, args.start, args.end).to_string())
+    else:
+        print(index.nearest_geo(args.lat, args.lon, args.k, args.start, args.end).to_string())
+
+
+if __name__ == "__main__":
+    main()
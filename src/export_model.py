@@ -0,0 +1,128 @@
+#export_model.py
+import os
+import sys
+import json
+import argparse
+import subprocess
+
+import joblib
+from sklearn.metrics import accuracy_score, f1_score
+
+# Allow `python src/export_model.py` as well as `python -m src.export_model`
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from src.compiled_forest import compile_forest, compact_forest
+from src.model_registry import MODEL_PATH, ENCODER_PATH
+from src.train_model import DATA_PATH, load_data, split_data
+
+COMPACT_PATH = "models/compact"
+
+# Child process: cold-load one model through the registry, as a
+# Streamlit session or scoring worker would
+LOAD_CHILD = r"""
+import sys, json, time
+sys.path.insert(0, sys.argv[2])
+from src.utils import rss_bytes
+before = rss_bytes()
+start = time.perf_counter()
+from src.model_registry import ModelRegistry
+ModelRegistry(model_path=sys.argv[1], encoder_path=sys.argv[3], compiled_dir=None).get()
+print(json.dumps({"seconds": time.perf_counter() - start, "rss": rss_bytes() - before}))
+"""
+
+
+def path_size(path):
+    if os.path.isdir(path):
+        return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+    return os.path.getsize(path)
+
+
+def measure_load(model_path, encoder_path, repeats=3):
+    """
+    Median (seconds, RSS bytes) to import the registry and load a model.
+    """
+    runs = []
+    for _ in range(repeats):
+        out = subprocess.run(
+            [sys.executable, "-W", "ignore", "-c", LOAD_CHILD, model_path, ROOT, encoder_path],
+            capture_output=True, text=True, check=True
+        )
+        runs.append(json.loads(out.stdout.strip().splitlines()[-1]))
+    runs.sort(key=lambda r: r["seconds"])
+    middle = runs[len(runs) // 2]
+    return middle["seconds"], middle["rss"]
+
+
+def heldout_scores(predict, data_path, columns):
+    """
+    (accuracy, weighted F1) on the held-out split train_model.py uses.
+    """
+    X, y_encoded, _ = load_data(data_path)
+    _, X_test, _, y_test = split_data(X, y_encoded)
+    preds = predict(X_test[columns])
+    return accuracy_score(y_test, preds), f1_score(y_test, preds, average="weighted")
+
+
+def export(model_path=MODEL_PATH, encoder_path=ENCODER_PATH, output=COMPACT_PATH,
+           leaf_bits=16, max_trees=None, max_depth=None, target_bytes=None):
+    """
+    Write a compact export of a fitted forest pipeline to `output`.
+    Returns (full CompiledForest, compact CompiledForest, sklearn model).
+    """
+    model = joblib.load(model_path)
+    label_encoder = joblib.load(encoder_path)
+
+    full = compile_forest(model)
+    compact = compact_forest(full, leaf_bits=leaf_bits, max_trees=max_trees,
+                             max_depth=max_depth, target_bytes=target_bytes,
+                             labels=[str(label) for label in label_encoder.classes_])
+    compact.save(output)
+    return full, compact, model
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export the forest in a compact, "
+                                                 "fast-loading format")
+    parser.add_argument("--model", default=MODEL_PATH)
+    parser.add_argument("--encoder", default=ENCODER_PATH)
+    parser.add_argument("--output", default=COMPACT_PATH)
+    parser.add_argument("--leaf-bits", type=int, default=16, choices=[0, 8, 16],
+                        help="Leaf probability quantization (0 = float64, exact)")
+    parser.add_argument("--max-trees", type=int, default=None)
+    parser.add_argument("--max-depth", type=int, default=None)
+    parser.add_argument("--target-mb", type=float, default=None,
+                        help="Drop trailing trees until the arrays fit")
+    parser.add_argument("--data", default=DATA_PATH,
+                        help="Catalog for the held-out accuracy/F1 report ('' to skip)")
+    args = parser.parse_args(argv)
+
+    target_bytes = None if args.target_mb is None else int(args.target_mb * 2**20)
+    full, compact, model = export(args.model, args.encoder, args.output,
+                                  args.leaf_bits or None, args.max_trees,
+                                  args.max_depth, target_bytes)
+
+    print(f"✅ Compact model saved -> {args.output}")
+    print(f"trees {full.n_estimators} -> {compact.n_estimators}, "
+          f"nodes {full.n_nodes:,} -> {compact.n_nodes:,}, "
+          f"max depth {full.max_depth} -> {compact.max_depth}")
+
+    before_load = measure_load(args.model, args.encoder)
+    after_load = measure_load(args.output, args.encoder)
+
+    print(f"\n{'':14s} {'size MB':>9s} {'load s':>8s} {'RSS MB':>8s}")
+    for name, path, (seconds, rss) in (("pickle", args.model, before_load),
+                                       ("compact", args.output, after_load)):
+        print(f"{name:14s} {path_size(path) / 2**20:9.2f} {seconds:8.3f} {rss / 2**20:8.1f}")
+
+    if args.data:
+        # Models trained before src/features.py take only the raw columns
+        columns = list(full.feature_names)
+        acc, f1 = heldout_scores(model.predict, args.data, columns)
+        compact_acc, compact_f1 = heldout_scores(compact.predict, args.data, columns)
+        print(f"\nheld-out accuracy {acc:.4f} -> {compact_acc:.4f} ({compact_acc - acc:+.4f})")
+        print(f"held-out F1       {f1:.4f} -> {compact_f1:.4f} ({compact_f1 - f1:+.4f})")
+
+
+if __name__ == "__main__":
+    main()
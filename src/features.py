@@ -0,0 +1,204 @@
+import os
+import json
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from src import columnar
+from src.utils import file_signature, signature_key
+
+# Raw model inputs, in training order
+FEATURES = ["magnitude", "depth", "cdi", "mmi", "sig"]
+
+# Engineered columns appended after FEATURES
+DERIVED_FEATURES = ["risk_score", "aftershock_probability"]
+
+# Bump when a formula changes so cached feature files are rebuilt
+FEATURE_VERSION = 1
+
+FEATURE_CACHE_DIR = "data/features"
+
+
+# ---------------- FORMULAS ----------------
+# Work on scalars and arrays alike; predict_alert and predict_batch
+# both rely on these for the risk score and aftershock outputs.
+def risk_score(magnitude, depth, mmi, sig):
+    """
+    Weighted risk score (0-100) aligned with seismic reality.
+    """
+    score = (
+        magnitude * 8 +                        # magnitude impact
+        (10 - np.minimum(depth / 100, 10)) * 4 +   # depth impact
+        mmi * 4 +                              # shaking intensity
+        (sig / 200)                            # significance
+    )
+    return np.minimum(score, 100)
+
+
+def aftershock_probability(magnitude, depth):
+    """
+    Aftershock probability as a fraction between 0 and 1.
+    """
+    prob = (
+        (magnitude / 9) * 0.6 +
+        (1 - np.minimum(depth / 300, 1)) * 0.4
+    )
+    return np.clip(prob, 0, 1)
+
+
+def add_derived(X):
+    """
+    NumPy feature pipeline: (n, len(FEATURES)) float array in FEATURES
+    order -> (n, len(FEATURES) + len(DERIVED_FEATURES)).
+    """
+    X = np.asarray(X, dtype=np.float64)
+    magnitude, depth, mmi, sig = X[:, 0], X[:, 1], X[:, 3], X[:, 4]
+    return np.column_stack([
+        X,
+        risk_score(magnitude, depth, mmi, sig),
+        aftershock_probability(magnitude, depth)
+    ])
+
+
+# ---------------- SKLEARN TRANSFORMER ----------------
+class FeatureBuilder:
+    """
+    Pipeline step that appends DERIVED_FEATURES to the raw FEATURES.
+
+    Takes a DataFrame with at least the FEATURES columns (or an array in
+    FEATURES order). Derived columns already present in a DataFrame,
+    e.g. from load_features, are used as-is instead of recomputed.
+
+    Implements the estimator protocol (get_params/set_params/fit/
+    transform) directly rather than subclassing sklearn's BaseEstimator,
+    so inference code can import this module without loading sklearn.
+    """
+
+    def get_params(self, deep=True):
+        return {}
+
+    def set_params(self, **params):
+        if params:
+            raise ValueError(f"FeatureBuilder has no parameters: {sorted(params)}")
+        return self
+
+    def fit(self, X, y=None):
+        self.feature_names_in_ = np.array(FEATURES, dtype=object)
+        self.n_features_in_ = len(FEATURES)
+        return self
+
+    def transform(self, X):
+        if not hasattr(X, "columns"):
+            return add_derived(X)
+
+        raw = X[FEATURES].to_numpy(dtype=np.float64)
+        if all(name in X.columns for name in DERIVED_FEATURES):
+            return np.column_stack([raw, X[DERIVED_FEATURES].to_numpy(dtype=np.float64)])
+        return add_derived(raw)
+
+    def fit_transform(self, X, y=None):
+        return self.fit(X, y).transform(X)
+
+    def get_feature_names_out(self, input_features=None):
+        return np.array(FEATURES + DERIVED_FEATURES, dtype=object)
+
+    def __repr__(self):
+        return "FeatureBuilder()"
+
+
+# ---------------- ON-DISK FEATURE CACHE ----------------
+def load_features(path, cache_dir=FEATURE_CACHE_DIR):
+    """
+    Read a catalog with its derived feature columns.
+
+    The first call per version of the file (size + mtime) and
+    FEATURE_VERSION parses it, computes DERIVED_FEATURES and stores
+    every column as its own .npy under cache_dir. Later calls load
+    those arrays instead of parsing the catalog again.
+    Returns a DataFrame with the catalog columns plus DERIVED_FEATURES;
+    text columns come back from the cache as categoricals.
+    """
+    # A column store is already binary: nothing to gain from caching it
+    path = columnar.resolve(path)
+    if cache_dir is None or columnar.is_store(path):
+        return with_derived(read_catalog(path))
+
+    key = signature_key(file_signature(path), FEATURE_VERSION)
+    stem = os.path.splitext(os.path.basename(path))[0]
+    directory = os.path.join(cache_dir, f"{stem}-{key}")
+
+    df = _load_cached(directory)
+    if df is None:
+        df = with_derived(read_catalog(path))
+        _save_cached(directory, df, path)
+    return df
+
+
+def read_catalog(path, columns=None):
+    """
+    Catalog as a DataFrame, optionally only some columns. Reads the
+    column store for `path` when it has a current one (src/columnar.py),
+    so those columns are memory-mapped instead of parsed.
+    """
+    path = columnar.resolve(path)
+    if columnar.is_store(path):
+        return columnar.ColumnStore.open(path).to_frame(columns)
+    if path.endswith(".parquet"):
+        df = pd.read_parquet(path, columns=columns)
+    else:
+        wanted = None if columns is None else set(columns)
+        df = pd.read_csv(path, usecols=None if wanted is None else lambda c: c.strip() in wanted)
+    df.columns = df.columns.str.strip()
+    return df if columns is None else df[list(columns)]
+
+
+def with_derived(df):
+    """
+    Copy of df with DERIVED_FEATURES (re)computed from its FEATURES columns.
+    """
+    X = add_derived(df[FEATURES].to_numpy(dtype=np.float64))
+    df = df.drop(columns=DERIVED_FEATURES, errors="ignore")
+    return df.assign(**{name: X[:, len(FEATURES) + i]
+                        for i, name in enumerate(DERIVED_FEATURES)})
+
+
+def _load_cached(directory):
+    try:
+        with open(os.path.join(directory, "meta.json")) as f:
+            meta = json.load(f)
+        columns = {name: np.load(os.path.join(directory, f"{i}.npy"))
+                   for i, name in enumerate(meta["columns"])}
+    except (OSError, ValueError, KeyError):
+        return None
+
+    for name, categories in meta["categories"].items():
+        columns[name] = pd.Categorical.from_codes(columns[name], categories)
+    return pd.DataFrame(columns)
+
+
+def _save_cached(directory, df, source):
+    # Assembled next to its destination and renamed into place, so a
+    # concurrent reader never sees a half-written cache entry
+    parent = os.path.dirname(os.path.abspath(directory))
+    os.makedirs(parent, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(dir=parent, prefix=".features-")
+    try:
+        categories = {}
+        for i, name in enumerate(df.columns):
+            column = df[name]
+            if column.dtype.kind not in "biuf":
+                # Text (e.g. alert) as category codes, -1 for missing
+                column = column.astype("category")
+                categories[name] = [str(c) for c in column.cat.categories]
+                column = column.cat.codes
+            np.save(os.path.join(tmp_dir, f"{i}.npy"), column.to_numpy())
+        with open(os.path.join(tmp_dir, "meta.json"), "w") as f:
+            json.dump({"source": source, "feature_version": FEATURE_VERSION,
+                       "columns": list(df.columns), "categories": categories}, f)
+        os.replace(tmp_dir, directory)
+    except OSError:
+        # Another process finished the same entry first, or the disk is
+        # read-only; the caller still has the computed frame
+        shutil.rmtree(tmp_dir, ignore_errors=True)
@@ -0,0 +1,257 @@
+#incremental.py
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+import joblib
+
+# Allow `python src/incremental.py` as well as `python -m src.incremental`
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.features import FEATURES, read_catalog
+from src.model_registry import MODEL_PATH, ENCODER_PATH
+
+PROFILE_PATH = "models/feature_profile.json"
+
+PROFILE_BINS = 10
+
+# Population stability index thresholds (common rule of thumb)
+PSI_WARN = 0.1
+PSI_RETRAIN = 0.25
+
+
+# ---------------- DRIFT ----------------
+def build_profile(X, bins=PROFILE_BINS):
+    """
+    Reference distribution of the raw inputs: decile edges and the
+    share of rows in each bin, per feature.
+    """
+    profile = {"rows": int(len(X)), "features": {}}
+    for name in FEATURES:
+        values = pd.Series(X[name], dtype=float).dropna().to_numpy()
+        edges = np.unique(np.quantile(values, np.linspace(0, 1, bins + 1)[1:-1]))
+        counts = np.bincount(np.searchsorted(edges, values, side="right"),
+                             minlength=len(edges) + 1)
+        profile["features"][name] = {
+            "edges": edges.tolist(),
+            "shares": (counts / max(len(values), 1)).tolist()
+        }
+    return profile
+
+
+def save_profile(X, path=PROFILE_PATH):
+    write_profile(build_profile(X), path)
+
+
+def write_profile(profile, path=PROFILE_PATH):
+    with open(path, "w") as f:
+        json.dump(profile, f)
+
+
+def load_profile(path=PROFILE_PATH):
+    with open(path) as f:
+        return json.load(f)
+
+
+def drift_report(profile, X, eps=1e-4):
+    """
+    PSI of each feature in X against the reference profile.
+    O(rows x log bins); the training catalog is not read again.
+    """
+    report = {}
+    for name in FEATURES:
+        reference = profile["features"][name]
+        edges = np.asarray(reference["edges"])
+        expected = np.maximum(np.asarray(reference["shares"]), eps)
+
+        values = pd.Series(X[name], dtype=float).dropna().to_numpy()
+        counts = np.bincount(np.searchsorted(edges, values, side="right"),
+                             minlength=len(edges) + 1)
+        actual = np.maximum(counts / max(len(values), 1), eps)
+        report[name] = float(np.sum((actual - expected) * np.log(actual / expected)))
+    return report
+
+
+def needs_retrain(report):
+    return max(report.values()) >= PSI_RETRAIN
+
+
+def print_drift(report):
+    for name, psi in report.items():
+        level = "RETRAIN" if psi >= PSI_RETRAIN else "watch" if psi >= PSI_WARN else "ok"
+        print(f"  {name:10s} PSI={psi:.3f}  {level}")
+    if needs_retrain(report):
+        print("⚠️ Input distribution has shifted: run a full retrain (src/train_model.py)")
+
+
+# ---------------- INCREMENTAL UPDATE ----------------
+def _widen_tree(estimator, columns, n_classes):
+    """
+    Re-home a tree fitted on a subset of classes onto the full class
+    axis: its leaf distributions move to `columns` and the classes it
+    never saw get probability 0.
+    """
+    from sklearn.tree._tree import Tree
+
+    state = estimator.tree_.__getstate__()
+    values = np.zeros((state["values"].shape[0], 1, n_classes), dtype=state["values"].dtype)
+    values[:, :, columns] = state["values"]
+
+    tree = Tree(estimator.n_features_in_, np.array([n_classes], dtype=np.intp), 1)
+    tree.__setstate__({**state, "values": values})
+    estimator.tree_ = tree
+    estimator.classes_ = np.arange(n_classes, dtype=np.float64)
+    estimator.n_classes_ = n_classes
+
+
+def add_trees(model, label_encoder, batch, n_trees=20, max_trees=None):
+    """
+    Grow the fitted pipeline's forest with n_trees trees trained only
+    on `batch` (FEATURES + alert), then retire the oldest trees beyond
+    max_trees (default None: keep every tree). The preprocessing steps
+    and label encoder are reused unchanged, so cost depends on the
+    batch size only.
+    """
+    from sklearn.base import clone
+
+    forest = model.steps[-1][1]
+    preprocess = model[:-1]
+
+    unknown = set(batch["alert"].dropna()) - set(label_encoder.classes_)
+    if unknown:
+        raise ValueError(f"Unknown alert level(s) {sorted(unknown)}; "
+                         "a full retrain is needed to add classes")
+    batch = batch.dropna(subset=["alert"])
+    Xt = preprocess.transform(batch[FEATURES])
+    y = label_encoder.transform(batch["alert"])
+
+    # Same hyperparameters as the forest; a fresh seed per update
+    seed = None
+    if isinstance(forest.random_state, (int, np.integer)):
+        seed = int(forest.random_state) + getattr(forest, "trees_added_", 0) + len(forest.estimators_)
+    new_forest = clone(forest).set_params(n_estimators=n_trees, warm_start=False,
+                                          random_state=seed)
+    new_forest.fit(Xt, y)
+
+    # The batch may lack some alert levels; line the new trees' class
+    # columns up with the forest's before mixing them in
+    columns = np.searchsorted(forest.classes_, new_forest.classes_)
+    if len(columns) != len(forest.classes_):
+        for estimator in new_forest.estimators_:
+            _widen_tree(estimator, columns, len(forest.classes_))
+
+    forest.estimators_ = forest.estimators_ + new_forest.estimators_
+    forest.trees_added_ = getattr(forest, "trees_added_", 0) + n_trees
+
+    retired = 0 if max_trees is None else max(0, len(forest.estimators_) - max_trees)
+    if retired:
+        forest.estimators_ = forest.estimators_[retired:]
+    forest.set_params(n_estimators=len(forest.estimators_))
+
+    return {"batch_rows": int(len(batch)), "trees_added": n_trees,
+            "trees_retired": retired, "trees": len(forest.estimators_)}
+
+
+def publish(model, model_path=MODEL_PATH, versions_dir=None):
+    """
+    Keep a timestamped copy under versions_dir (default: "versions"
+    next to model_path) and atomically replace model_path, so a
+    running ModelRegistry hot-swaps to it.
+    """
+    if versions_dir is None:
+        versions_dir = os.path.join(os.path.dirname(model_path), "versions")
+    os.makedirs(versions_dir, exist_ok=True)
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%d-%H%M%S-%f")
+    version_path = os.path.join(versions_dir, f"best_model-{stamp}.pkl")
+    joblib.dump(model, version_path)
+
+    parent = os.path.dirname(os.path.abspath(model_path))
+    fd, tmp_path = tempfile.mkstemp(dir=parent, suffix=".pkl.tmp")
+    os.close(fd)
+    try:
+        shutil.copyfile(version_path, tmp_path)
+        os.replace(tmp_path, model_path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return version_path
+
+
+def update(batch_path, model_path=MODEL_PATH, encoder_path=ENCODER_PATH,
+           n_trees=20, max_trees=None, profile_path=PROFILE_PATH, force=False):
+    """
+    Drift check, then add trees for the batch and publish a new version.
+    Without force, a batch that warrants a full retrain is not applied.
+    """
+    batch = read_catalog(batch_path)
+
+    report = None
+    if profile_path and os.path.exists(profile_path):
+        report = drift_report(load_profile(profile_path), batch)
+        print("Drift vs training data:")
+        print_drift(report)
+        if needs_retrain(report) and not force:
+            print("Skipping incremental update (use --force to apply anyway)")
+            return None
+
+    start = time.perf_counter()
+    model = joblib.load(model_path)
+    label_encoder = joblib.load(encoder_path)
+    summary = add_trees(model, label_encoder, batch, n_trees, max_trees)
+    version_path = publish(model, model_path)
+    summary["seconds"] = time.perf_counter() - start
+    summary["version"] = version_path
+    summary["drift"] = report
+
+    print(f"✅ +{summary['trees_added']} trees on {summary['batch_rows']:,} rows, "
+          f"{summary['trees_retired']} retired -> {summary['trees']} trees "
+          f"in {summary['seconds']:.1f}s ({version_path})")
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m src.incremental",
+                                     description="Incremental model updates and drift checks")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    up = commands.add_parser("update", help="Add trees trained on a new labeled batch")
+    up.add_argument("--batch", required=True, help="CSV/Parquet of new events with alert")
+    up.add_argument("--trees", type=int, default=20)
+    up.add_argument("--max-trees", type=int, default=None,
+                    help="Retire the oldest trees beyond this many (default: keep all)")
+    up.add_argument("--model", default=MODEL_PATH)
+    up.add_argument("--encoder", default=ENCODER_PATH)
+    up.add_argument("--profile", default=PROFILE_PATH)
+    up.add_argument("--force", action="store_true", help="Apply even if drift says retrain")
+
+    drift = commands.add_parser("drift", help="Compare a batch with the training profile")
+    drift.add_argument("--batch", required=True)
+    drift.add_argument("--profile", default=PROFILE_PATH)
+
+    profile = commands.add_parser("profile", help="(Re)build the training profile")
+    profile.add_argument("--data", required=True)
+    profile.add_argument("--profile", default=PROFILE_PATH)
+
+    args = parser.parse_args(argv)
+
+    if args.command == "update":
+        update(args.batch, args.model, args.encoder, args.trees, args.max_trees,
+               args.profile, args.force)
+    elif args.command == "drift":
+        report = drift_report(load_profile(args.profile), read_catalog(args.batch))
+        print_drift(report)
+        sys.exit(1 if needs_retrain(report) else 0)
+    elif args.command == "profile":
+        save_profile(read_catalog(args.data), args.profile)
+        print(f"✅ Feature profile saved -> {args.profile}")
+
+
+if __name__ == "__main__":
+    main()
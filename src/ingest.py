@@ -0,0 +1,364 @@
+import os
+import sys
+import json
+import math
+import time
+import asyncio
+import argparse
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import src.predict as predict
+from src.server import _score_rows, RESULT_KEYS
+from src.metrics import Counter, Histogram, SIZE_BUCKETS
+
+# Event ids remembered for deduplication and alert-change tracking
+MAX_TRACKED_EVENTS = 100_000
+
+
+# ---------------- PARSING ----------------
+def _number(value):
+    return math.nan if value is None else float(value)
+
+
+def parse_features(message):
+    """
+    Yield (event id, updated, feature tuple) for each event in a USGS
+    GeoJSON message: a single Feature or a FeatureCollection, as text,
+    bytes or an already-decoded dict. Depth comes from the third
+    geometry coordinate; a missing cdi/mmi is passed on as NaN for the
+    model's imputer.
+    """
+    if isinstance(message, (str, bytes)):
+        message = json.loads(message)
+
+    features = message["features"] if message.get("type") == "FeatureCollection" else [message]
+    for feature in features:
+        properties = feature["properties"]
+        depth = feature["geometry"]["coordinates"][2]
+        values = (
+            _number(properties["mag"]),
+            _number(depth),
+            _number(properties.get("cdi")),
+            _number(properties.get("mmi")),
+            _number(properties.get("sig"))
+        )
+        updated = properties.get("updated") or properties.get("time") or 0
+        yield str(feature["id"]), int(updated), values
+
+
+# ---------------- SOURCES ----------------
+async def tail_file(path, from_start=False, poll=0.05):
+    """
+    Follow a newline-delimited GeoJSON file like `tail -F`, surviving
+    truncation and rotation. Partial trailing lines wait for their newline.
+    """
+    f = None
+    inode = None
+    buffer = b""
+    try:
+        while True:
+            if f is None:
+                try:
+                    f = open(path, "rb")
+                except FileNotFoundError:
+                    from_start = True  # everything in a new file is new
+                    await asyncio.sleep(poll)
+                    continue
+                inode = os.fstat(f.fileno()).st_ino
+                if not from_start:
+                    f.seek(0, os.SEEK_END)
+                from_start = True  # a rotated file is read from its start
+
+            chunk = f.read(1 << 16)
+            if chunk:
+                buffer += chunk
+                *lines, buffer = buffer.split(b"\n")
+                for line in lines:
+                    if line.strip():
+                        yield line
+                continue
+
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                stat = None
+            if stat is None or stat.st_ino != inode or stat.st_size < f.tell():
+                f.close()
+                f, buffer = None, b""
+                continue
+            await asyncio.sleep(poll)
+    finally:
+        if f is not None:
+            f.close()
+
+
+async def unix_socket(path, queue_size=1024):
+    """
+    Accept any number of local producers on a Unix socket, each
+    sending newline-delimited GeoJSON. A full buffer stops reading
+    from the producers, so they are throttled by the socket.
+    """
+    lines = asyncio.Queue(queue_size)
+
+    async def handle(reader, writer):
+        try:
+            async for line in reader:
+                if line.strip():
+                    await lines.put(line)
+        finally:
+            writer.close()
+
+    if os.path.exists(path):
+        os.unlink(path)
+    server = await asyncio.start_unix_server(handle, path)
+    try:
+        while True:
+            yield await lines.get()
+    finally:
+        server.close()
+        if os.path.exists(path):
+            os.unlink(path)
+
+
+async def from_queue(queue):
+    """
+    Drain an asyncio.Queue stand-in for a message broker; None ends it.
+    """
+    while True:
+        message = await queue.get()
+        if message is None:
+            return
+        yield message
+
+
+# ---------------- SINKS ----------------
+def jsonl_sink(f):
+    """
+    Write each emitted change as one JSON line to an open text file.
+    """
+    async def emit(change):
+        f.write(json.dumps(change) + "\n")
+        f.flush()
+    return emit
+
+
+# ---------------- PIPELINE ----------------
+class IngestPipeline:
+    """
+    source -> parse/dedupe -> micro-batch scoring -> alert-change sink.
+
+    Stages are joined by bounded queues, so a slow stage makes the one
+    before it wait instead of growing memory; ultimately the source
+    stops being read. A revised event is scored only if its `updated`
+    time is newer than the last one seen for its id, and a change is
+    emitted only when its predicted alert differs from the previous one.
+    """
+
+    def __init__(self, emit, executor=None, max_batch=256, max_wait=0.005,
+                 queue_size=1024, max_tracked=MAX_TRACKED_EVENTS):
+        self.emit = emit
+        self.executor = executor or ThreadPoolExecutor(1)
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.events = asyncio.Queue(queue_size)
+        self.changes = asyncio.Queue(queue_size)
+        self.max_tracked = max_tracked
+
+        # id -> [updated, last emitted alert], least recently seen first
+        self._tracked = OrderedDict()
+
+        self.received = Counter()
+        self.invalid = Counter()
+        self.duplicates = Counter()
+        self.scored = Counter()
+        self.emitted = Counter()
+        self.batch_size = Histogram(SIZE_BUCKETS)
+        self.score_latency = Histogram()
+        self.alert_latency = Histogram()
+
+    # -- stage 1 --
+    async def _admit(self, source):
+        async for message in source:
+            received = time.perf_counter()
+            self.received.inc()
+            try:
+                events = list(parse_features(message))
+            except (ValueError, KeyError, TypeError, IndexError, AttributeError):
+                self.invalid.inc()
+                continue
+            for event_id, updated, values in events:
+                state = self._tracked.get(event_id)
+                if state is not None and updated <= state[0]:
+                    self.duplicates.inc()
+                    continue
+                self._track(event_id, updated)
+                await self.events.put((event_id, updated, values, received))
+        await self.events.put(None)
+
+    def _track(self, event_id, updated):
+        state = self._tracked.pop(event_id, None)
+        self._tracked[event_id] = [updated, None if state is None else state[1]]
+        if len(self._tracked) > self.max_tracked:
+            self._tracked.popitem(last=False)
+
+    # -- stage 2 --
+    async def _score(self):
+        loop = asyncio.get_running_loop()
+        done = False
+        while not done:
+            first = await self.events.get()
+            if first is None:
+                break
+            batch = [first]
+            deadline = loop.time() + self.max_wait
+
+            while len(batch) < self.max_batch:
+                if self.events.empty():
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        break
+                    try:
+                        item = await asyncio.wait_for(self.events.get(), remaining)
+                    except asyncio.TimeoutError:
+                        break
+                else:
+                    item = self.events.get_nowait()
+                if item is None:
+                    done = True
+                    break
+                batch.append(item)
+
+            start = time.perf_counter()
+            results = await loop.run_in_executor(
+                self.executor, _score_rows, [values for _, _, values, _ in batch]
+            )
+            self.score_latency.observe(time.perf_counter() - start)
+            self.batch_size.observe(len(batch))
+            self.scored.inc(len(batch))
+
+            for (event_id, updated, _, received), result in zip(batch, results):
+                state = self._tracked.get(event_id)
+                if state is None:
+                    # Evicted meanwhile: treat as new
+                    self._track(event_id, updated)
+                    state = self._tracked[event_id]
+                previous = state[1]
+                alert = result[0]
+                if alert == previous:
+                    continue
+                state[1] = alert
+                change = {"id": event_id, "updated": updated, "previous_alert": previous,
+                          **dict(zip(RESULT_KEYS, result))}
+                await self.changes.put((change, received))
+        await self.changes.put(None)
+
+    # -- stage 3 --
+    async def _emit(self):
+        while True:
+            item = await self.changes.get()
+            if item is None:
+                return
+            change, received = item
+            latency = time.perf_counter() - received
+            change["latency_ms"] = round(latency * 1000, 3)
+            await self.emit(change)
+            self.alert_latency.observe(latency)
+            self.emitted.inc()
+
+    async def run(self, source):
+        """
+        Process `source` (an async iterator of messages) until it ends.
+        """
+        await asyncio.get_running_loop().run_in_executor(self.executor, predict.registry.get)
+        stages = [asyncio.create_task(stage)
+                  for stage in (self._admit(source), self._score(), self._emit())]
+        try:
+            await asyncio.gather(*stages)
+        finally:
+            for stage in stages:
+                stage.cancel()
+
+    def metrics(self):
+        return {
+            "received": self.received.value,
+            "invalid": self.invalid.value,
+            "duplicates": self.duplicates.value,
+            "scored": self.scored.value,
+            "emitted": self.emitted.value,
+            "event_queue_depth": self.events.qsize(),
+            "change_queue_depth": self.changes.qsize(),
+            "batch_size": self.batch_size.snapshot(),
+            "score_latency_seconds": self.score_latency.snapshot(),
+            "alert_latency_seconds": self.alert_latency.snapshot(),
+            "alert_latency_p50": self.alert_latency.quantile(0.50),
+            "alert_latency_p99": self.alert_latency.quantile(0.99)
+        }
+
+
+async def _report(pipeline, every):
+    while True:
+        await asyncio.sleep(every)
+        _print_metrics(pipeline)
+
+
+def _print_metrics(pipeline):
+    m = pipeline.metrics()
+    print(f"received={m['received']} invalid={m['invalid']} duplicates={m['duplicates']} "
+          f"scored={m['scored']} emitted={m['emitted']} "
+          f"queue={m['event_queue_depth']} "
+          f"alert p50<={m['alert_latency_p50'] * 1000:g}ms "
+          f"p99<={m['alert_latency_p99'] * 1000:g}ms", file=sys.stderr, flush=True)
+
+
+async def ingest(source, output=None, max_batch=256, max_wait=0.005, queue_size=1024,
+                 report_every=10.0):
+    out = open(output, "a") if output else sys.stdout
+    pipeline = IngestPipeline(jsonl_sink(out), max_batch=max_batch, max_wait=max_wait,
+                              queue_size=queue_size)
+    reporter = asyncio.create_task(_report(pipeline, report_every)) if report_every else None
+    try:
+        await pipeline.run(source)
+    finally:
+        if reporter is not None:
+            reporter.cancel()
+        _print_metrics(pipeline)
+        if output:
+            out.close()
+    return pipeline
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m src.ingest",
+                                     description="Score a live GeoJSON event feed and emit "
+                                                 "alert-level changes")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--tail", help="Follow a newline-delimited GeoJSON file")
+    source.add_argument("--socket", help="Listen on a Unix socket for GeoJSON lines")
+    parser.add_argument("--from-start", action="store_true",
+                        help="With --tail, read the existing file content first")
+    parser.add_argument("--output", help="Append alert changes here as JSON lines "
+                                         "(default: stdout)")
+    parser.add_argument("--max-batch", type=int, default=256)
+    parser.add_argument("--max-wait-ms", type=float, default=5.0,
+                        help="Close a scoring batch this long after its first event")
+    parser.add_argument("--queue-size", type=int, default=1024,
+                        help="Events buffered between stages before the source is paused")
+    parser.add_argument("--report-every", type=float, default=10.0,
+                        help="Seconds between metrics lines on stderr (0 = only at exit)")
+    args = parser.parse_args(argv)
+
+    if args.tail:
+        events = tail_file(args.tail, from_start=args.from_start)
+    else:
+        events = unix_socket(args.socket, args.queue_size)
+
+    try:
+        asyncio.run(ingest(events, args.output, args.max_batch, args.max_wait_ms / 1000,
+                           args.queue_size, args.report_every))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
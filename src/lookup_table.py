@@ -0,0 +1,282 @@
+import os
+import json
+import time
+import shutil
+import argparse
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import src.predict as predict
+from src.features import FEATURES
+from src.model_registry import ModelRegistry, MODEL_PATH, ENCODER_PATH
+
+TABLE_PATH = "models/table"
+
+# (low, high, step) per input, covering the Predict tab's bounds.
+# Queries are snapped to the nearest grid point.
+DEFAULT_GRID = {
+    "magnitude": (0.0, 10.0, 0.1),
+    "depth": (0.0, 700.0, 50.0),
+    "cdi": (0.0, 10.0, 1.0),
+    "mmi": (0.0, 10.0, 0.5),
+    "sig": (0.0, 1000.0, 100.0)
+}
+
+# Confidence is stored in tenths of a percent, the precision predict_alert returns
+CONFIDENCE_SCALE = 1000
+
+# Rows evaluated per forest call inside a build task
+BUILD_BLOCK = 200_000
+
+
+def grid_axes(grid):
+    return [np.round(np.arange(int(round((hi - lo) / step)) + 1) * step + lo, 10)
+            for lo, hi, step in (grid[name] for name in FEATURES)]
+
+
+# ---------------- TABLE ----------------
+class LookupTable:
+    """
+    Precomputed (alert, confidence) for every point of a quantized grid
+    over the five inputs, stored as flat memory-mapped arrays.
+    """
+
+    def __init__(self, alert, confidence, grid, labels, model_version):
+        self.alert = alert
+        self.confidence = confidence
+        self.grid = grid
+        self.labels = labels
+        self.model_version = model_version
+        self.shape = [len(axis) for axis in grid_axes(grid)]
+        # (low, high, step, size) per feature, in FEATURES order
+        self._axes = [(*grid[name], size) for name, size in zip(FEATURES, self.shape)]
+
+    @property
+    def n_cells(self):
+        return len(self.alert)
+
+    def lookup(self, values):
+        """
+        (alert, confidence) for the nearest grid point, or None when a
+        value is outside the grid (or NaN).
+        """
+        index = 0
+        for value, (lo, hi, step, size) in zip(values, self._axes):
+            if not lo <= value <= hi:
+                return None
+            index = index * size + int(round((value - lo) / step))
+        return (self.labels[self.alert[index]],
+                self.confidence[index] / CONFIDENCE_SCALE)
+
+    def save(self, directory):
+        parent = os.path.dirname(os.path.abspath(directory))
+        os.makedirs(parent, exist_ok=True)
+        tmp_dir = tempfile.mkdtemp(dir=parent, prefix=".table-")
+        try:
+            np.save(os.path.join(tmp_dir, "alert.npy"), self.alert)
+            np.save(os.path.join(tmp_dir, "confidence.npy"), self.confidence)
+            _write_meta(tmp_dir, self.grid, self.labels, self.model_version)
+            if os.path.isdir(directory):
+                shutil.rmtree(directory)
+            os.replace(tmp_dir, directory)
+        except BaseException:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+
+    @classmethod
+    def load(cls, directory, mmap_mode="r"):
+        with open(os.path.join(directory, "meta.json")) as f:
+            meta = json.load(f)
+        return cls(
+            alert=np.load(os.path.join(directory, "alert.npy"), mmap_mode=mmap_mode),
+            confidence=np.load(os.path.join(directory, "confidence.npy"), mmap_mode=mmap_mode),
+            grid={name: tuple(meta["grid"][name]) for name in FEATURES},
+            labels=meta["labels"],
+            model_version=meta["model_version"]
+        )
+
+
+def _write_meta(directory, grid, labels, model_version):
+    with open(os.path.join(directory, "meta.json"), "w") as f:
+        json.dump({
+            "grid": {name: list(grid[name]) for name in FEATURES},
+            "labels": list(labels),
+            "model_version": model_version
+        }, f)
+
+
+# ---------------- BUILD ----------------
+def _init_worker(model_path, encoder_path):
+    predict.registry = ModelRegistry(model_path, encoder_path, mmap_mode="r")
+
+
+def _build_slab(directory, grid, start, stop):
+    """
+    Evaluate grid rows for magnitude indices [start, stop) and write
+    them straight into the shared output arrays.
+    """
+    axes = grid_axes(grid)
+    slab_cells = int(np.prod([len(axis) for axis in axes[1:]]))
+    alert = np.load(os.path.join(directory, "alert.npy"), mmap_mode="r+")
+    confidence = np.load(os.path.join(directory, "confidence.npy"), mmap_mode="r+")
+
+    current = predict.registry.get()
+    points = np.stack(np.meshgrid(axes[0][start:stop], *axes[1:], indexing="ij"),
+                      axis=-1).reshape(-1, len(FEATURES))
+    offset = start * slab_cells
+    for first in range(0, len(points), BUILD_BLOCK):
+        block = points[first:first + BUILD_BLOCK]
+        proba = predict._predict_proba(current, block)
+        best = proba.argmax(axis=1)
+        cells = slice(offset + first, offset + first + len(block))
+        alert[cells] = current.classes_[best]
+        confidence[cells] = np.rint(proba[np.arange(len(best)), best] * CONFIDENCE_SCALE)
+
+    alert.flush()
+    confidence.flush()
+    labels = tuple(str(label) for label in current.label_encoder.classes_)
+    return current.version, labels
+
+
+def build_table(output=TABLE_PATH, grid=None, model_path=MODEL_PATH,
+                encoder_path=ENCODER_PATH, workers=None, log=print):
+    """
+    Evaluate the model on every grid point, in parallel slabs along
+    the magnitude axis, and save the table to `output`.
+    """
+    grid = {**DEFAULT_GRID, **(grid or {})}
+    workers = os.cpu_count() if workers is None else workers
+    axes = grid_axes(grid)
+    n_cells = int(np.prod([len(axis) for axis in axes]))
+
+    parent = os.path.dirname(os.path.abspath(output))
+    os.makedirs(parent, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(dir=parent, prefix=".table-")
+    start_time = time.perf_counter()
+    try:
+        np.lib.format.open_memmap(os.path.join(tmp_dir, "alert.npy"), mode="w+",
+                                  dtype=np.uint8, shape=(n_cells,))
+        np.lib.format.open_memmap(os.path.join(tmp_dir, "confidence.npy"), mode="w+",
+                                  dtype=np.uint16, shape=(n_cells,))
+
+        n_slabs = max(1, min(len(axes[0]), 4 * workers))
+        bounds = np.linspace(0, len(axes[0]), n_slabs + 1).astype(int)
+        tasks = [(tmp_dir, grid, int(a), int(b)) for a, b in zip(bounds[:-1], bounds[1:]) if b > a]
+
+        if workers <= 1:
+            _init_worker(model_path, encoder_path)
+            versions = {_build_slab(*task) for task in tasks}
+        else:
+            with ProcessPoolExecutor(workers, initializer=_init_worker,
+                                     initargs=(model_path, encoder_path)) as pool:
+                versions = set(pool.map(_build_slab, *zip(*tasks)))
+        if len(versions) != 1:
+            raise RuntimeError("Model changed while the table was being built")
+
+        version, labels = versions.pop()
+        _write_meta(tmp_dir, grid, labels, version)
+        if os.path.isdir(output):
+            shutil.rmtree(output)
+        os.replace(tmp_dir, output)
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+    log(f"Built {n_cells:,} cells in {time.perf_counter() - start_time:.1f}s -> {output}")
+    return LookupTable.load(output)
+
+
+# ---------------- AGREEMENT ----------------
+def random_inputs(n, grid, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({name: rng.uniform(grid[name][0], grid[name][1], n)
+                         for name in FEATURES})
+
+
+def agreement(table, inputs, labels=None):
+    """
+    Compare table answers with the real model on `inputs`, and both
+    with the true alert `labels` if given. Out-of-grid rows are counted
+    and left out of the comparison.
+    """
+    exact = predict.predict_batch(data=inputs)
+    answers = [table.lookup(row) for row in inputs[FEATURES].to_numpy()]
+    in_grid = np.array([answer is not None for answer in answers])
+
+    hits = [answer for answer in answers if answer is not None]
+    exact = exact[in_grid]
+    table_alert = np.array([alert for alert, _ in hits], dtype=object)
+    table_conf = np.array([round(conf * 100, 1) for _, conf in hits])
+    report = {
+        "rows": len(inputs),
+        "in_grid": float(in_grid.mean()),
+        "alert_agreement": float(np.mean(table_alert == exact["alert"].to_numpy())) if hits else None,
+        "mean_confidence_error": float(np.mean(np.abs(table_conf - exact["confidence"].to_numpy())))
+        if hits else None
+    }
+    if labels is not None:
+        truth = np.asarray(labels, dtype=object)[in_grid]
+        report["table_accuracy"] = float(np.mean(table_alert == truth)) if hits else None
+        report["model_accuracy"] = float(np.mean(exact["alert"].to_numpy() == truth)) if hits else None
+    return report
+
+
+def holdout_events(data_path):
+    """
+    Inputs and true alert levels of train_model.py's held-out test
+    split: the events the table is checked on.
+    """
+    from src.train_model import load_data, split_data
+
+    X, y_encoded, le = load_data(data_path, None)
+    _, X_test, _, y_test = split_data(X, y_encoded)
+    return X_test[FEATURES].reset_index(drop=True), le.inverse_transform(y_test)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the predict_alert lookup table")
+    parser.add_argument("--output", default=TABLE_PATH)
+    parser.add_argument("--model", default=MODEL_PATH)
+    parser.add_argument("--encoder", default=ENCODER_PATH)
+    parser.add_argument("--workers", type=int, default=None)
+    for name, (lo, hi, step) in DEFAULT_GRID.items():
+        parser.add_argument(f"--{name}-step", type=float, default=step,
+                            help=f"Grid step over {lo:g}-{hi:g}")
+    parser.add_argument("--data", default="usgs_earthquake_realistic_1000.csv",
+                        help="Labeled catalog; agreement is measured on its held-out split")
+    parser.add_argument("--samples", type=int, default=20_000,
+                        help="Random in-bounds points for a secondary agreement check "
+                             "(0 to skip)")
+    args = parser.parse_args()
+
+    grid = {name: (lo, hi, getattr(args, f"{name}_step"))
+            for name, (lo, hi, _) in DEFAULT_GRID.items()}
+    table = build_table(args.output, grid, args.model, args.encoder, args.workers)
+
+    size = table.alert.nbytes + table.confidence.nbytes
+    print(f"Grid {' x '.join(map(str, table.shape))}, {size / 2**20:.1f} MB")
+
+    predict.registry = ModelRegistry(args.model, args.encoder)
+    inputs, labels = holdout_events(args.data)
+    report = agreement(table, inputs, labels)
+    if report["alert_agreement"] is None:
+        print(f"None of the {report['rows']:,} held-out events fall inside the grid")
+    else:
+        print(f"Held-out split of {args.data} ({report['rows']:,} events, "
+              f"{report['in_grid']:.0%} inside the grid): alert agreement "
+              f"{report['alert_agreement']:.2%}, mean confidence error "
+              f"{report['mean_confidence_error']:.2f}pp, accuracy "
+              f"{report['table_accuracy']:.2%} (model {report['model_accuracy']:.2%})")
+
+    if args.samples:
+        report = agreement(table, random_inputs(args.samples, grid))
+        print(f"Agreement on {report['rows']:,} random in-bounds events: "
+              f"alert {report['alert_agreement']:.2%}, "
+              f"mean confidence error {report['mean_confidence_error']:.2f}pp")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,332 @@
+import io
+import os
+import time
+import bisect
+import pstats
+import cProfile
+import tempfile
+import functools
+import threading
+import tracemalloc
+from contextlib import contextmanager
+from urllib.parse import urlparse, parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Latency buckets in seconds (upper bounds), 0.5 ms .. 10 s
+LATENCY_BUCKETS = [0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0]
+
+# Batch-size buckets (upper bounds)
+SIZE_BUCKETS = [1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024]
+
+
+class Counter:
+    """
+    Monotonic counter.
+    """
+
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram with a running sum, cumulative like Prometheus.
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = list(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def quantile(self, q):
+        """
+        Upper bound of the bucket holding the q-th observation.
+        """
+        if self.count == 0:
+            return 0.0
+        target = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets + [float("inf")], self.counts):
+            seen += count
+            if seen >= target:
+                return bound
+        return float("inf")
+
+    def snapshot(self):
+        cumulative = []
+        seen = 0
+        for bound, count in zip(self.buckets + ["+Inf"], self.counts):
+            seen += count
+            cumulative.append((bound, seen))
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "mean": self.sum / self.count if self.count else 0.0,
+            "buckets": cumulative
+        }
+
+
+# ---------------- STAGE TIMERS ----------------
+# Set to False to turn every Stage.observe into a no-op (used to
+# measure the instrumentation's own overhead)
+enabled = True
+
+_stages = {}
+_stages_lock = threading.Lock()
+
+
+class Stage:
+    """
+    Call count and latency histogram for one named code path.
+    Hot paths time themselves with perf_counter and call observe();
+    elsewhere `with stage(name).timer():` is simpler.
+    """
+
+    def __init__(self, name, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.latency = Histogram(buckets)
+
+    def observe(self, seconds):
+        if enabled:
+            self.latency.observe(seconds)
+
+    @contextmanager
+    def timer(self):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+
+def stage(name):
+    """
+    Process-wide Stage for `name`, created on first use.
+    """
+    found = _stages.get(name)
+    if found is None:
+        with _stages_lock:
+            found = _stages.setdefault(name, Stage(name))
+    return found
+
+
+def set_enabled(flag):
+    global enabled
+    enabled = bool(flag)
+
+
+def stages_snapshot():
+    return {name: s.latency.snapshot() for name, s in sorted(_stages.items())}
+
+
+def reset_stages():
+    with _stages_lock:
+        for s in _stages.values():
+            s.latency = Histogram(s.latency.buckets)
+
+
+# ---------------- PROMETHEUS TEXT FORMAT ----------------
+# Callables returning {metric_name: number}, rendered as gauges
+_collectors = []
+
+
+def register_collector(collect):
+    _collectors.append(collect)
+
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def render_prometheus(prefix="earthquake"):
+    """
+    All stages (as one histogram labelled by stage) plus collector
+    gauges, in the Prometheus text exposition format.
+    """
+    name = f"{prefix}_stage_seconds"
+    lines = [f"# HELP {name} Wall time of instrumented stages.",
+             f"# TYPE {name} histogram"]
+    for stage_name, snap in stages_snapshot().items():
+        label = f'stage="{_label(stage_name)}"'
+        for bound, count in snap["buckets"]:
+            lines.append(f'{name}_bucket{{{label},le="{bound}"}} {count}')
+        lines.append(f"{name}_sum{{{label}}} {snap['sum']:.9f}")
+        lines.append(f"{name}_count{{{label}}} {snap['count']}")
+
+    for collect in _collectors:
+        for metric_name, value in collect().items():
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                continue
+            full = f"{prefix}_{metric_name}"
+            lines.append(f"# TYPE {full} gauge")
+            lines.append(f"{full} {value}")
+    return "\n".join(lines) + "\n"
+
+
+def write_textfile(path, prefix="earthquake"):
+    """
+    Atomically write the metrics for node_exporter's textfile collector.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".prom.tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(render_prometheus(prefix))
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+# ---------------- PROFILING HOOKS ----------------
+class _ProfileSession:
+    """
+    One cProfile.Profile shared by the calls wrapped with @profiled.
+    cProfile follows a single thread, so profiled calls are serialized
+    while a session is active.
+    """
+
+    def __init__(self):
+        self.profiler = cProfile.Profile()
+        self.lock = threading.Lock()
+        self.calls = 0
+
+    def call(self, fn, *args, **kwargs):
+        with self.lock:
+            self.calls += 1
+            self.profiler.enable()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.profiler.disable()
+
+
+_profile = None
+
+
+def profiled(fn):
+    """
+    Decorator: run `fn` under the active profile session, if any.
+    Costs one global lookup when profiling is off.
+    """
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        session = _profile
+        if session is None:
+            return fn(*args, **kwargs)
+        return session.call(fn, *args, **kwargs)
+    return wrapper
+
+
+def start_profile():
+    global _profile
+    if _profile is None:
+        _profile = _ProfileSession()
+
+
+def stop_profile(sort="cumulative", limit=30, path=None):
+    """
+    End the profile session and return its top functions as text;
+    `path` also saves the raw stats for snakeviz/pstats.
+    """
+    global _profile
+    session, _profile = _profile, None
+    if session is None:
+        return "profiling was not running\n"
+    with session.lock:
+        if path:
+            session.profiler.dump_stats(path)
+        out = io.StringIO()
+        stats = pstats.Stats(session.profiler, stream=out)
+        if not stats.stats:
+            return "no profiled calls\n"
+        stats.sort_stats(sort).print_stats(limit)
+    return f"{session.calls} profiled call(s)\n" + out.getvalue()
+
+
+def start_tracemalloc(frames=5):
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(frames)
+
+
+def stop_tracemalloc(limit=25):
+    """
+    Top allocation sites since start_tracemalloc(), then stop tracing.
+    """
+    if not tracemalloc.is_tracing():
+        return "tracemalloc was not running\n"
+    snapshot = tracemalloc.take_snapshot()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    lines = [f"traced: current {current / 2**20:.1f} MB, peak {peak / 2**20:.1f} MB"]
+    for stat in snapshot.statistics("lineno")[:limit]:
+        lines.append(str(stat))
+    return "\n".join(lines) + "\n"
+
+
+# ---------------- HTTP EXPORTER ----------------
+class _ExporterHandler(BaseHTTPRequestHandler):
+    """
+    GET /metrics                 Prometheus text
+    GET /profile/start           start cProfile for @profiled calls
+    GET /profile/stop?limit=30   stop and return the top functions
+    GET /tracemalloc/start
+    GET /tracemalloc/stop?limit=25
+    """
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        limit = int(query.get("limit", [30])[0])
+
+        routes = {
+            "/metrics": lambda: render_prometheus(),
+            "/profile/start": lambda: (start_profile(), "profiling started\n")[1],
+            "/profile/stop": lambda: stop_profile(limit=limit),
+            "/tracemalloc/start": lambda: (start_tracemalloc(), "tracemalloc started\n")[1],
+            "/tracemalloc/stop": lambda: stop_tracemalloc(limit=limit)
+        }
+        route = routes.get(url.path)
+        if route is None:
+            self.send_error(404)
+            return
+        body = route().encode()
+        self.send_response(200)
+        content_type = "text/plain; version=0.0.4" if url.path == "/metrics" else "text/plain"
+        self.send_header("Content-Type", f"{content_type}; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_exporter(port=9108, host="127.0.0.1"):
+    """
+    Serve the exporter from a daemon thread; returns the HTTP server
+    (call .shutdown() to stop it).
+    """
+    server = ThreadingHTTPServer((host, port), _ExporterHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-exporter",
+                     daemon=True).start()
+    return server
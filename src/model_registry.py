@@ -0,0 +1,209 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+
+import joblib
+import numpy as np
+
+from src.compiled_forest import CompiledForest, compile_forest
+from src.utils import file_signature, signature_key, rss_bytes
+
+MODEL_PATH = "models/best_model.pkl"
+ENCODER_PATH = "models/label_encoder.pkl"
+
+# Compiled engine arrays are cached here, one directory per model version
+COMPILED_DIR = "models/compiled"
+
+
+class ModelVersion:
+    """
+    One loaded model/encoder pair. Immutable once published, so a
+    prediction that grabbed it keeps a consistent view even if the
+    registry swaps to a newer version mid-call.
+    """
+
+    def __init__(self, version, model, label_encoder, engine, load_seconds):
+        self.version = version
+        self.model = model
+        self.label_encoder = label_encoder
+        self.engine = engine
+        self.load_seconds = load_seconds
+        self.loaded_at = time.time()
+        # Encoded class ids in predict_proba column order
+        self.classes_ = engine.classes_ if model is None else model.classes_
+
+
+class LabelDecoder:
+    """
+    Minimal stand-in for a fitted LabelEncoder, built from the label
+    names stored with a compact export (no sklearn needed).
+    """
+
+    def __init__(self, labels):
+        self.classes_ = np.asarray(labels, dtype=object)
+
+    def inverse_transform(self, y):
+        return self.classes_[np.asarray(y)]
+
+
+class ModelRegistry:
+    """
+    Lazily loads models/best_model.pkl + models/label_encoder.pkl and
+    hot-swaps to a new version when either file changes on disk.
+
+    - Nothing is unpickled until the first get().
+    - get() re-stats the files at most every check_interval seconds.
+    - mmap_mode is passed to joblib.load, and the compiled engine
+      arrays are cached as .npy files and memory-mapped, so worker
+      processes share one copy through the page cache.
+    - The last keep_versions versions stay loaded and can be pinned
+      with get(version=...).
+    - model_path may also be a compact export directory (see
+      src/export_model.py): only the compiled arrays are loaded, the
+      sklearn model is not, and `model` is None.
+    """
+
+    def __init__(self, model_path=MODEL_PATH, encoder_path=ENCODER_PATH,
+                 mmap_mode=None, check_interval=2.0, keep_versions=2,
+                 compiled_dir=COMPILED_DIR):
+        self.model_path = model_path
+        self.encoder_path = encoder_path
+        self.mmap_mode = mmap_mode
+        self.check_interval = check_interval
+        self.keep_versions = keep_versions
+        self.compiled_dir = compiled_dir
+
+        self._lock = threading.Lock()
+        self._versions = OrderedDict()
+        self._current = None
+        self._signatures = None
+        self._next_check = 0.0
+
+        self._metrics = {
+            "loads": 0,
+            "reload_errors": 0,
+            "last_load_seconds": 0.0,
+            "last_load_rss_delta_bytes": 0
+        }
+
+    # ---------------- PUBLIC API ----------------
+    def get(self, version=None):
+        """
+        Return the current ModelVersion (or a retained older one).
+        """
+        if version is not None:
+            with self._lock:
+                return self._versions[version]
+
+        now = time.monotonic()
+        if self._current is None or now >= self._next_check:
+            self._refresh(now)
+        return self._current
+
+    def reload(self):
+        """
+        Force a re-stat of the model files on the next get().
+        """
+        self._next_check = 0.0
+        return self.get()
+
+    @property
+    def versions(self):
+        return list(self._versions)
+
+    def metrics(self):
+        """
+        Load statistics plus current process RSS.
+        """
+        current = self._current
+        return {
+            **self._metrics,
+            "version": None if current is None else current.version,
+            "versions_loaded": len(self._versions),
+            "rss_bytes": rss_bytes()
+        }
+
+    # ---------------- LOADING ----------------
+    def _refresh(self, now):
+        with self._lock:
+            if self._current is not None and now < self._next_check:
+                return
+            self._next_check = now + self.check_interval
+
+            signatures = self._file_signatures()
+            if signatures == self._signatures:
+                return
+
+            try:
+                loaded = self._load(signatures)
+            except Exception:
+                # A half-written retrain: keep serving the old version
+                if self._current is None:
+                    raise
+                self._metrics["reload_errors"] += 1
+                return
+
+            self._versions[loaded.version] = loaded
+            while len(self._versions) > self.keep_versions:
+                self._versions.popitem(last=False)
+
+            self._signatures = signatures
+            self._current = loaded
+
+    def _load(self, signatures):
+        rss_before = rss_bytes()
+        start = time.perf_counter()
+
+        version = signature_key(*signatures)
+        if os.path.isdir(self.model_path):
+            model = None
+            engine = CompiledForest.load(self.model_path, mmap_mode=self.mmap_mode)
+            if engine.labels is not None:
+                label_encoder = LabelDecoder(engine.labels)
+            else:
+                label_encoder = joblib.load(self.encoder_path)
+        else:
+            model = joblib.load(self.model_path, mmap_mode=self.mmap_mode)
+            label_encoder = joblib.load(self.encoder_path)
+            engine = self._load_engine(model, version)
+
+        # Files changed while we were reading them; retry on next check
+        if self._file_signatures() != signatures:
+            raise RuntimeError("Model files changed during load")
+
+        load_seconds = time.perf_counter() - start
+        self._metrics["loads"] += 1
+        self._metrics["last_load_seconds"] = load_seconds
+        self._metrics["last_load_rss_delta_bytes"] = rss_bytes() - rss_before
+
+        return ModelVersion(version, model, label_encoder, engine, load_seconds)
+
+    def _file_signatures(self):
+        model_file = self.model_path
+        if os.path.isdir(model_file):
+            # Compact exports are renamed into place with a fresh meta.json
+            model_file = os.path.join(model_file, "meta.json")
+        return file_signature(model_file), file_signature(self.encoder_path)
+
+    def _load_engine(self, model, version):
+        """
+        Compiled forest for this version, or None if the model can't
+        be compiled. Cached on disk so it is built once per version.
+        """
+        directory = None
+        if self.mmap_mode is not None and self.compiled_dir is not None:
+            directory = os.path.join(self.compiled_dir, version)
+            if os.path.isdir(directory):
+                return CompiledForest.load(directory, mmap_mode=self.mmap_mode)
+
+        try:
+            engine = compile_forest(model)
+        except ValueError:
+            return None
+
+        if directory is None:
+            return engine
+
+        engine.save(directory)
+        return CompiledForest.load(directory, mmap_mode=self.mmap_mode)
@@ -0,0 +1,139 @@
+import time
+
+import numpy as np
+import pandas as pd
+
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import LabelEncoder
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import accuracy_score, f1_score
+
+from src.binning import QuantileSketch, QuantileBinner, MAX_BINS
+from src.features import FEATURES
+from src.incremental import build_profile
+
+# Hyperparameters of the current best grid-search model
+DEFAULT_PARAMS = {"n_estimators": 200, "max_depth": 15, "min_samples_split": 5}
+
+# Every fifth row is held out for evaluation, matching test_size=0.2
+HOLDOUT_EVERY = 5
+
+
+def _chunks(path, chunk_size):
+    for chunk in pd.read_csv(path, chunksize=chunk_size):
+        chunk.columns = chunk.columns.str.strip()
+        yield chunk
+
+
+def _merge_counts(keys, counts, new_keys):
+    """
+    Fold a chunk of cell keys into the running (unique key, count) arrays.
+    """
+    all_keys = np.concatenate([keys, new_keys])
+    all_counts = np.concatenate([counts, np.ones(len(new_keys), dtype=np.int64)])
+    unique, inverse = np.unique(all_keys, return_inverse=True)
+    return unique, np.bincount(inverse, weights=all_counts).astype(np.int64)
+
+
+def _decode(keys, n_features):
+    codes = np.empty((len(keys), n_features), dtype=np.uint8)
+    for i in range(n_features):
+        codes[:, i] = (keys >> (8 * i)) & 0xFF
+    labels = (keys >> (8 * n_features)).astype(np.int64)
+    return codes, labels
+
+
+def build_binned_dataset(path, chunk_size=250_000, max_bins=MAX_BINS):
+    """
+    Two streaming passes over the CSV.
+
+    Pass 1 feeds a QuantileSketch to get bin edges and medians and
+    collects the label set. Pass 2 bins every row to uint8 codes and
+    counts identical (codes, label) cells, so memory grows with the
+    number of distinct cells rather than with the number of rows.
+
+    Distinct cells are at most min(rows, n_classes * max_bins**5). With
+    five continuous inputs the grid only fills up for small max_bins:
+    at 256 bins nearly every row is its own cell and the count table
+    grows with the catalog (~16 bytes per training row, plus the
+    temporaries of one merge). At 8 bins it stops at 4 * 8**5 = 131,072
+    cells, at the cost of accuracy (see benchmarks/bench_out_of_core.py).
+
+    Returns (binner, label_encoder, train cells, test cells, rows,
+    sketch).
+    """
+    sketch = QuantileSketch(len(FEATURES))
+    labels = set()
+    for chunk in _chunks(path, chunk_size):
+        sketch.update(chunk[FEATURES].to_numpy(dtype=np.float64))
+        labels.update(chunk["alert"].dropna().unique())
+
+    le = LabelEncoder().fit(np.array(sorted(labels), dtype=object))
+    binner = QuantileBinner(sketch.edges(max_bins), sketch.medians(), FEATURES)
+
+    empty = (np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64))
+    train, test = empty, empty
+    row = 0
+    for chunk in _chunks(path, chunk_size):
+        chunk = chunk.dropna(subset=["alert"])
+        codes = binner.transform(chunk[FEATURES]).astype(np.int64)
+        keys = le.transform(chunk["alert"]).astype(np.int64) << (8 * len(FEATURES))
+        for i in range(len(FEATURES)):
+            keys |= codes[:, i] << (8 * i)
+
+        holdout = (row + np.arange(len(chunk))) % HOLDOUT_EVERY == 0
+        train = _merge_counts(*train, keys[~holdout])
+        test = _merge_counts(*test, keys[holdout])
+        row += len(chunk)
+
+    return binner, le, train, test, row, sketch
+
+
+def train_out_of_core(path, chunk_size=250_000, max_bins=MAX_BINS, n_jobs=-1,
+                      **model_params):
+    """
+    Fit a RandomForest on the binned cell counts of a CSV of any size.
+
+    Returns (pipeline, label_encoder, report). The pipeline takes the
+    same five raw feature columns as the in-memory model, so
+    src/predict.py loads and uses it unchanged. report["profile"] is
+    the drift reference (src/incremental.py), built from the sketch's
+    sample of the inputs.
+    """
+    start = time.perf_counter()
+    binner, le, (train_keys, train_counts), (test_keys, test_counts), rows, sketch = \
+        build_binned_dataset(path, chunk_size, max_bins)
+    binning_seconds = time.perf_counter() - start
+
+    X_cells, y_cells = _decode(train_keys, len(FEATURES))
+
+    # class_weight="balanced" computed on row counts, not on unique cells
+    class_totals = np.bincount(y_cells, weights=train_counts, minlength=len(le.classes_))
+    balance = train_counts.sum() / (len(le.classes_) * np.maximum(class_totals, 1))
+    sample_weight = train_counts * balance[y_cells]
+
+    params = {**DEFAULT_PARAMS, **model_params}
+    forest = RandomForestClassifier(random_state=42, n_jobs=n_jobs, **params)
+    forest.fit(X_cells, y_cells, sample_weight=sample_weight)
+    forest.set_params(n_jobs=None)
+
+    model = Pipeline([("binner", binner), ("model", forest)])
+
+    profile = build_profile(pd.DataFrame(sketch.reservoir[:sketch.filled], columns=FEATURES))
+    profile["rows"] = sketch.seen
+
+    report = {
+        "rows": rows,
+        "profile": profile,
+        "train_cells": len(train_keys),
+        "binning_seconds": binning_seconds,
+        "total_seconds": time.perf_counter() - start
+    }
+    if len(test_keys):
+        X_test, y_test = _decode(test_keys, len(FEATURES))
+        preds = forest.predict(X_test)
+        report["test_accuracy"] = accuracy_score(y_test, preds, sample_weight=test_counts)
+        report["test_f1_weighted"] = f1_score(y_test, preds, average="weighted",
+                                              sample_weight=test_counts)
+
+    return model, le, report
@@ -1,59 +1,428 @@
+import time
+import argparse
+
+import numpy as np
 import pandas as pd
-import joblib
+
+from src.model_registry import ModelRegistry
+from src.prediction_cache import PredictionCache
+from src.features import FEATURES, DERIVED_FEATURES, risk_score, aftershock_probability
+from src import metrics
 
 # ---------------- LOAD MODEL & ENCODER ----------------
-model = joblib.load("models/best_model.pkl")
-label_encoder = joblib.load("models/label_encoder.pkl")
+# Loaded lazily on first prediction and hot-reloaded when the files change
+registry = ModelRegistry()
+
+# Batches up to this size use the compiled NumPy engine (lowest latency);
+# larger ones go through sklearn's Cython traversal (highest throughput)
+COMPILED_MAX_ROWS = 512
+
+# Opt-in cache of model outputs for predict_alert; see enable_cache()
+cache = None
+
+# Opt-in precomputed grid answers for predict_alert; see enable_table()
+table = None
+
+# Opt-in ETAS Monte Carlo forecast for the aftershock output; see
+# enable_aftershock_model()
+aftershock_model = None
+
+# Per-feature attributions for explain_alert, keyed on the exact inputs;
+# a new model version empties it
+explanations = PredictionCache(maxsize=2_000, features=FEATURES,
+                               precision={name: 1e-9 for name in FEATURES})
+
+# ---------------- STAGE TIMERS ----------------
+# Exported by src/metrics.py (Prometheus text, see serve_exporter)
+_clock = time.perf_counter
+_alert_stage = metrics.stage("predict_alert")
+_batch_stage = metrics.stage("predict_batch")
+_features_stage = metrics.stage("predict.features")
+_lookup_stage = metrics.stage("predict.lookup")
+_frame_stage = metrics.stage("predict.frame")
+_impute_stage = metrics.stage("predict.impute")
+_forest_stage = metrics.stage("predict.forest")
+_decode_stage = metrics.stage("predict.decode")
+_explain_stage = metrics.stage("predict.explain")
+
+
+def __getattr__(name):
+    # Keeps `from src.predict import model` working without import-time loading
+    if name in ("model", "label_encoder", "engine"):
+        return getattr(registry.get(), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def _predict_proba(current, X):
+    """
+    Class probabilities for a float array of FEATURES columns, from
+    whichever engine suits the batch size. Both paths are bit-identical.
+    Compact exports have no sklearn model and always use the engine.
+    """
+    if current.engine is not None and (current.model is None or len(X) <= COMPILED_MAX_ROWS):
+        start = _clock()
+        prepared = current.engine.prepare(X)
+        mid = _clock()
+        proba = current.engine.predict_proba(prepared, prepared=True)
+        _impute_stage.observe(mid - start)
+        _forest_stage.observe(_clock() - mid)
+        return proba
+
+    # Pipeline.predict_proba, step by step so each stage can be timed
+    start = _clock()
+    Xt = pd.DataFrame(X, columns=FEATURES)
+    frame_done = _clock()
+    for _, step in current.model.steps[:-1]:
+        Xt = step.transform(Xt)
+    impute_done = _clock()
+    proba = current.model.steps[-1][1].predict_proba(Xt)
+    _frame_stage.observe(frame_done - start)
+    _impute_stage.observe(impute_done - frame_done)
+    _forest_stage.observe(_clock() - impute_done)
+    return proba
+
+
+def enable_cache(maxsize=10_000, ttl=None, precision=None):
+    """
+    Cache predict_alert model outputs, keyed on the five inputs
+    quantized to `precision` (e.g. {"magnitude": 0.01, "depth": 0.1}).
+    Risk score and aftershock probability are still computed exactly.
+    """
+    global cache
+    cache = PredictionCache(maxsize=maxsize, ttl=ttl, precision=precision,
+                            features=FEATURES)
+    return cache
+
+
+def disable_cache():
+    global cache
+    cache = None
+
+
+def enable_aftershock_model(**settings):
+    """
+    Report the aftershock output as an ETAS Monte Carlo forecast
+    (src/aftershock.py): P(aftershock >= min_magnitude within `days`),
+    cached per input. settings go to AftershockModel. The model's own
+    inputs are unchanged.
+    """
+    global aftershock_model
+    from src.aftershock import AftershockModel
+    aftershock_model = AftershockModel(**settings)
+    return aftershock_model
 
 
+def disable_aftershock_model():
+    global aftershock_model
+    aftershock_model = None
+
+
+def enable_table(path="models/table"):
+    """
+    Answer predict_alert from a lookup table built by src/lookup_table.py
+    (nearest grid point, O(1) indexing). Inputs outside the grid, or a
+    table built for a different model version, fall back to the model.
+    """
+    global table
+    from src.lookup_table import LookupTable
+    table = LookupTable.load(path, mmap_mode="r")
+    return table
+
+
+def disable_table():
+    global table
+    table = None
+
+
+@metrics.profiled
 def predict_alert(magnitude, depth, cdi, mmi, sig):
     """
     Predict earthquake alert level and compute
     realistic risk & aftershock metrics.
     """
+    start = _clock()
+
+    # ---------------- RISK SCORE & AFTERSHOCK PROBABILITY ----------------
+    # Shared formulas (src/features.py), also used as model features
+    risk = float(risk_score(magnitude, depth, mmi, sig))
+    active_aftershock = aftershock_model
+    # The simulation needs a magnitude and depth; without them, the formula
+    if active_aftershock is not None and np.isfinite([magnitude, depth]).all():
+        aftershock_prob = active_aftershock.forecast(magnitude, depth)["probability"]
+    else:
+        aftershock_prob = float(aftershock_probability(magnitude, depth))
+    features_done = _clock()
+    _features_stage.observe(features_done - start)
+
+    # ---------------- PREDICTION ----------------
+    # One snapshot per call, so a hot reload can't mix model versions
+    current = registry.get()
+    values = (magnitude, depth, cdi, mmi, sig)
+
+    active_table = table
+    cached = None
+    if active_table is not None and active_table.model_version == current.version:
+        cached = active_table.lookup(values)
 
-    # ---------------- RISK SCORE CALCULATION ----------------
-    # Weighted formula aligned with seismic reality
-    risk_score = (
-    magnitude * 8 +          # magnitude impact
-    (10 - min(depth / 100, 10)) * 4 +   # depth impact
-    mmi * 4 +                # shaking intensity
-    (sig / 200)              # significance
-)
+    active_cache = cache
+    if cached is None and active_cache is not None:
+        key = active_cache.key(current.version, values)
+        cached = active_cache.get(key)
 
-    risk_score = min(risk_score, 100)
+    if active_table is not None or active_cache is not None:
+        _lookup_stage.observe(_clock() - features_done)
 
+    if cached is not None:
+        alert, confidence = cached
+    else:
+        alert, confidence = _model_alert(current, values)
+        if active_cache is not None:
+            active_cache.put(key, (alert, confidence))
 
-    # ---------------- AFTERSHOCK PROBABILITY ----------------
-    aftershock_prob = (
-        (magnitude / 9) * 0.6 +
-        (1 - min(depth / 300, 1)) * 0.4
+    # ---------------- RETURN RESULTS ----------------
+    result = (
+        alert,
+        round(risk, 1),
+        round(confidence * 100, 1),
+        round(aftershock_prob * 100, 1)
     )
+    _alert_stage.observe(_clock() - start)
+    return result
 
-    # Cap probability between 0 and 1
-    aftershock_prob = max(0, min(aftershock_prob, 1))
 
+def _model_alert(current, values):
+    """
+    (alert, max class probability) for one event.
+    """
     # ---------------- ML MODEL INPUT ----------------
     # IMPORTANT: Must match training features EXACTLY
-    input_df = pd.DataFrame([{
-        "magnitude": magnitude,
-        "depth": depth,
-        "cdi": cdi,
-        "mmi": mmi,
-        "sig": sig
-    }])
+    input_row = np.array([values], dtype=float)
 
-    # ---------------- PREDICTION ----------------
-    pred_encoded = model.predict(input_df)
-    probabilities = model.predict_proba(input_df)
+    probabilities = _predict_proba(current, input_row)
+    start = _clock()
+    pred_encoded = current.classes_[probabilities.argmax(axis=1)]
 
-    alert = label_encoder.inverse_transform(pred_encoded)[0]
+    alert = current.label_encoder.inverse_transform(pred_encoded)[0]
     confidence = probabilities[0].max()
+    _decode_stage.observe(_clock() - start)
+    return alert, confidence
+
+
+def _round_like_python(values, ndigits):
+    """
+    Vectorized round() that matches Python's correctly-rounded
+    float rounding, including values that sit on a .5 tie.
+    """
+    values = np.asarray(values, dtype=float)
+    rounded = np.round(values, ndigits)
+
+    # np.round scales by 10**ndigits first, which can push a value
+    # across a tie; only those few elements need the exact scalar path
+    scaled = values * 10 ** ndigits
+    near_tie = np.abs(np.abs(scaled - np.trunc(scaled)) - 0.5) < 1e-6
+    if near_tie.any():
+        rounded[near_tie] = [round(float(v), ndigits) for v in values[near_tie]]
+
+    return rounded
+
+
+@metrics.profiled
+def predict_batch(magnitude=None, depth=None, cdi=None, mmi=None, sig=None, data=None):
+    """
+    Vectorized counterpart of predict_alert for many events.
+
+    Takes either five equal-length arrays or a DataFrame with the
+    five feature columns, and returns a DataFrame with one row per
+    event: alert, risk_score, confidence, aftershock_probability.
+    Values are identical to calling predict_alert on each row.
+    """
+    start = _clock()
+
+    # ---------------- ML MODEL INPUT ----------------
+    if data is not None:
+        input_df = pd.DataFrame(data)[FEATURES]
+    else:
+        input_df = pd.DataFrame({
+            "magnitude": np.atleast_1d(magnitude),
+            "depth": np.atleast_1d(depth),
+            "cdi": np.atleast_1d(cdi),
+            "mmi": np.atleast_1d(mmi),
+            "sig": np.atleast_1d(sig)
+        })
+
+    magnitude = input_df["magnitude"].to_numpy(dtype=float)
+    depth = input_df["depth"].to_numpy(dtype=float)
+    mmi = input_df["mmi"].to_numpy(dtype=float)
+    sig = input_df["sig"].to_numpy(dtype=float)
+
+    # ---------------- RISK SCORE & AFTERSHOCK PROBABILITY ----------------
+    risk = risk_score(magnitude, depth, mmi, sig)
+    active_aftershock = aftershock_model
+    aftershock_prob = aftershock_probability(magnitude, depth)
+    if active_aftershock is not None:
+        simulated = np.isfinite(magnitude) & np.isfinite(depth)
+        aftershock_prob[simulated] = active_aftershock.probability(magnitude[simulated],
+                                                                   depth[simulated])
+
+    # ---------------- PREDICTION ----------------
+    # One forest pass: predict() is argmax over predict_proba()
+    current = registry.get()
+    probabilities = _predict_proba(current, input_df.to_numpy(dtype=float))
+    decode_start = _clock()
+    best = probabilities.argmax(axis=1)
+
+    alert = current.label_encoder.inverse_transform(current.classes_[best])
+    confidence = probabilities[np.arange(len(best)), best]
+    _decode_stage.observe(_clock() - decode_start)
 
     # ---------------- RETURN RESULTS ----------------
-    return (
-        alert,
-        round(risk_score, 1),
-        round(confidence * 100, 1),
-        round(aftershock_prob * 100, 1)
-    )
+    result = pd.DataFrame({
+        "alert": alert,
+        "risk_score": _round_like_python(risk, 1),
+        "confidence": _round_like_python(confidence * 100, 1),
+        "aftershock_probability": _round_like_python(aftershock_prob * 100, 1)
+    }, index=input_df.index)
+    _batch_stage.observe(_clock() - start)
+    return result
+
+
+# ---------------- FEATURE ATTRIBUTIONS ----------------
+def _attribution_engine(current):
+    if current.engine is None:
+        raise ValueError("Feature attributions need the compiled forest engine, "
+                         "and this model could not be compiled")
+    return current.engine
+
+
+def attribution_features(engine):
+    """
+    Names of the engine's input columns, in contribution order.
+    """
+    names = list(engine.feature_names or FEATURES)
+    return names + DERIVED_FEATURES if engine.derived else names
+
+
+def _class_labels(current):
+    return list(current.label_encoder.inverse_transform(current.classes_))
+
+
+def _contributions(current, X):
+    """
+    (bias, contributions) for a float array of FEATURES columns, with
+    duplicate rows computed once.
+    """
+    start = _clock()
+    engine = _attribution_engine(current)
+    unique, inverse = np.unique(X, axis=0, return_inverse=True)
+    bias, contributions = engine.contributions(unique)
+    _explain_stage.observe(_clock() - start)
+    return bias, contributions[inverse.reshape(-1)]
+
+
+def explain_alert(magnitude, depth, cdi, mmi, sig):
+    """
+    Why the model chose its alert for one event.
+
+    Returns a DataFrame with a "base" row (the forest's prior) and one
+    row per model input, and one column per alert level ordered from
+    most to least likely. Values are percentage points: each column sums
+    to that level's probability, so the first column sums to the
+    confidence predict_alert reports.
+    """
+    current = registry.get()
+    values = (magnitude, depth, cdi, mmi, sig)
+    key = explanations.key(current.version, values)
+
+    cached = explanations.get(key)
+    if cached is None:
+        bias, contributions = _contributions(current, np.array([values], dtype=float))
+        cached = (bias, contributions[0])
+        explanations.put(key, cached)
+    bias, contributions = cached
+
+    order = np.argsort(-(bias + contributions.sum(axis=0)), kind="stable")
+    labels = _class_labels(current)
+    table = np.vstack([bias, contributions])[:, order] * 100
+    return pd.DataFrame(table, index=["base"] + attribution_features(current.engine),
+                        columns=[labels[k] for k in order])
+
+
+def explain_batch(magnitude=None, depth=None, cdi=None, mmi=None, sig=None,
+                  data=None, target=None):
+    """
+    Per-feature attributions for many events in one forest pass.
+
+    Same inputs as predict_batch. Returns a DataFrame with one row per
+    event: alert, the explained level (target, default the predicted
+    alert), base, and one column per model input, in percentage points
+    toward the explained level. base plus the input columns equals that
+    level's probability.
+    """
+    if data is not None:
+        input_df = pd.DataFrame(data)[FEATURES]
+    else:
+        input_df = pd.DataFrame({
+            "magnitude": np.atleast_1d(magnitude),
+            "depth": np.atleast_1d(depth),
+            "cdi": np.atleast_1d(cdi),
+            "mmi": np.atleast_1d(mmi),
+            "sig": np.atleast_1d(sig)
+        })
+
+    current = registry.get()
+    bias, contributions = _contributions(current, input_df.to_numpy(dtype=float))
+    probabilities = bias + contributions.sum(axis=1)
+    labels = np.array(_class_labels(current), dtype=object)
+
+    best = probabilities.argmax(axis=1)
+    if target is None:
+        explained = best
+    else:
+        if target not in labels:
+            raise ValueError(f"Unknown alert level {target!r}; expected one of {list(labels)}")
+        explained = np.full(len(input_df), list(labels).index(target))
+
+    rows = np.arange(len(input_df))
+    result = pd.DataFrame({
+        "alert": labels[best],
+        "target": labels[explained],
+        "base": bias[explained] * 100
+    }, index=input_df.index)
+    for i, name in enumerate(attribution_features(current.engine)):
+        result[name] = contributions[rows, i, explained] * 100
+    return result
+
+
+# ---------------- COMMAND LINE ----------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m src.predict",
+                                     description="Earthquake alert prediction")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    score = commands.add_parser("score", help="Score a CSV/Parquet event catalog")
+    score.add_argument("--input", required=True, help="CSV or .parquet catalog")
+    score.add_argument("--output", required=True,
+                       help="CSV file, or .parquet directory of part files")
+    score.add_argument("--chunk-size", type=int, default=100_000)
+    score.add_argument("--workers", type=int, default=None,
+                       help="Worker processes (default: all cores, 1 = in-process)")
+    score.add_argument("--resume", action="store_true",
+                       help="Continue from the last completed chunk")
+    score.add_argument("--model", default=registry.model_path,
+                       help="Model pickle or compact export directory")
+    score.add_argument("--encoder", default=registry.encoder_path)
+    score.add_argument("--explain", action="store_true",
+                       help="Add per-feature attribution columns (contrib_<feature>)")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "score":
+        from src.score_catalog import score_catalog
+        score_catalog(args.input, args.output, chunk_size=args.chunk_size,
+                      workers=args.workers, resume=args.resume,
+                      model_path=args.model, encoder_path=args.encoder,
+                      explain=args.explain)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+import math
+import time
+import threading
+from collections import OrderedDict
+
+# Quantization step per input; inputs closer than this share a cache entry
+DEFAULT_PRECISION = {
+    "magnitude": 0.01,
+    "depth": 0.1,
+    "cdi": 0.01,
+    "mmi": 0.01,
+    "sig": 0.1
+}
+
+
+def _quantize(value, step):
+    """
+    Grid index of one input. Missing and infinite inputs can't be
+    rounded, so each gets its own key slot: "nan", "inf" or "-inf".
+    """
+    value = math.nan if value is None else float(value)
+    if not math.isfinite(value):
+        return str(value)
+    return round(value / step)
+
+
+class PredictionCache:
+    """
+    Bounded LRU cache with optional TTL for model outputs.
+
+    Keys are the model version plus each input rounded to a grid of
+    `precision` steps. Entries are small fixed-size tuples, so maxsize
+    bounds memory. Seeing a new model version drops every entry.
+    """
+
+    def __init__(self, maxsize=10_000, ttl=None, precision=None,
+                 features=("magnitude", "depth", "cdi", "mmi", "sig")):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.features = list(features)
+        steps = {**DEFAULT_PRECISION, **(precision or {})}
+        self.steps = [steps[name] for name in self.features]
+
+        self._entries = OrderedDict()
+        self._version = None
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def key(self, version, values):
+        return (version,) + tuple(
+            _quantize(value, step) for value, step in zip(values, self.steps)
+        )
+
+    def get(self, key):
+        """
+        Cached value for key, or None on a miss.
+        """
+        with self._lock:
+            self._check_version(key[0])
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            value, expires_at = entry
+            if expires_at is not None and time.monotonic() >= expires_at:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        expires_at = None if self.ttl is None else time.monotonic() + self.ttl
+        with self._lock:
+            self._check_version(key[0])
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _check_version(self, version):
+        if version != self._version:
+            if self._entries:
+                self._entries.clear()
+                self.invalidations += 1
+            self._version = version
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations
+        }
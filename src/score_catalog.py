@@ -0,0 +1,241 @@
+import os
+import sys
+import json
+import time
+from collections import deque
+from functools import partial
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+import src.predict as predict
+from src import columnar
+from src.model_registry import ModelRegistry, MODEL_PATH, ENCODER_PATH
+
+PREDICTION_COLUMNS = ["alert", "risk_score", "confidence", "aftershock_probability"]
+
+# Output names of the predict_batch columns; prefixed so they never clash
+# with input columns (a labeled catalog already has "alert")
+OUTPUT_PREFIX = "predicted_"
+
+
+# ---------------- WORKERS ----------------
+def _init_worker(model_path, encoder_path):
+    # Each worker loads lazily; memory-mapped engine arrays are shared
+    predict.registry = ModelRegistry(model_path, encoder_path, mmap_mode="r")
+
+
+@contextmanager
+def in_process_registry(model_path, encoder_path):
+    """
+    _init_worker for in-process runs: the caller's registry is put back
+    afterwards, so scoring doesn't change what the rest of the
+    interpreter predicts with.
+    """
+    previous = predict.registry
+    _init_worker(model_path, encoder_path)
+    try:
+        yield predict.registry
+    finally:
+        predict.registry = previous
+
+
+def _score_chunk(chunk, explain=False):
+    """
+    Input columns followed by the predict_batch columns (predicted_*),
+    and with explain=True the attributions toward the predicted alert.
+    """
+    scored = predict.predict_batch(data=chunk)
+    frames = [chunk, scored[PREDICTION_COLUMNS].add_prefix(OUTPUT_PREFIX)]
+    if explain:
+        explained = predict.explain_batch(data=chunk)
+        contributions = explained.drop(columns=["alert", "target"])
+        frames.append(contributions.add_prefix("contrib_"))
+    return pd.concat(frames, axis=1)
+
+
+# ---------------- INPUT ----------------
+def _is_parquet(path):
+    return path.endswith(".parquet") or path.endswith(".pq")
+
+
+def _read_chunks(path, chunk_size, skip_rows):
+    """
+    Yield DataFrames of chunk_size rows, starting after skip_rows rows.
+    """
+    path = columnar.resolve(path)
+    if columnar.is_store(path):
+        store = columnar.ColumnStore.open(path)
+        for start in range(skip_rows, store.rows, chunk_size):
+            yield store.to_frame(start=start, stop=start + chunk_size)
+        return
+
+    if _is_parquet(path):
+        import pyarrow.parquet as pq
+
+        skipped = 0
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            if skipped < skip_rows:
+                skipped += batch.num_rows
+                continue
+            yield batch.to_pandas()
+        return
+
+    reader = pd.read_csv(path, chunksize=chunk_size,
+                         skiprows=range(1, skip_rows + 1))
+    for chunk in reader:
+        chunk.columns = chunk.columns.str.strip()
+        yield chunk
+
+
+# ---------------- OUTPUT ----------------
+class _CsvSink:
+    """
+    Single CSV file; resume truncates to the last checkpointed byte.
+    """
+
+    def __init__(self, path, resume_bytes):
+        mode = "r+b" if resume_bytes is not None else "wb"
+        self.file = open(path, mode)
+        if resume_bytes is not None:
+            self.file.truncate(resume_bytes)
+            self.file.seek(resume_bytes)
+        self.header = not resume_bytes
+
+    def write(self, index, frame):
+        frame.to_csv(self.file, header=self.header, index=False)
+        self.header = False
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        return self.file.tell()
+
+    def close(self):
+        self.file.close()
+
+
+class _ParquetSink:
+    """
+    Directory of part files, one per chunk; resume drops unfinished parts.
+    """
+
+    def __init__(self, path, resume_chunks):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        for name in os.listdir(path):
+            if name.startswith("part-") and int(name[5:10]) >= (resume_chunks or 0):
+                os.remove(os.path.join(path, name))
+
+    def write(self, index, frame):
+        part = os.path.join(self.path, f"part-{index:05d}.parquet")
+        frame.to_parquet(part + ".tmp", index=False)
+        os.replace(part + ".tmp", part)
+        return None
+
+    def close(self):
+        pass
+
+
+# ---------------- CHECKPOINT ----------------
+def _load_checkpoint(path, input_path, chunk_size, explain):
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        state = json.load(f)
+    if state["input_signature"] != list(columnar.signature(input_path)):
+        raise ValueError("Input changed since the checkpoint was written; "
+                         "rerun without --resume")
+    if state["chunk_size"] != chunk_size:
+        raise ValueError(f"Checkpoint was written with --chunk-size {state['chunk_size']}")
+    if state.get("explain", False) != explain:
+        raise ValueError("Checkpoint was written with a different --explain setting")
+    return state
+
+
+def _save_checkpoint(path, state):
+    with open(path + ".tmp", "w") as f:
+        json.dump(state, f)
+    os.replace(path + ".tmp", path)
+
+
+# ---------------- DRIVER ----------------
+def score_catalog(input_path, output_path, chunk_size=100_000, workers=None,
+                  resume=False, model_path=MODEL_PATH, encoder_path=ENCODER_PATH,
+                  explain=False, log=sys.stderr):
+    """
+    Score a CSV/Parquet catalog chunk by chunk in a process pool.
+
+    At most 2 x workers chunks are held in memory at once, results are
+    written in input order, and a checkpoint after every chunk lets
+    resume=True continue from the last completed chunk. explain=True
+    adds contrib_* attribution columns (see predict.explain_batch).
+    """
+    workers = os.cpu_count() if workers is None else workers
+    checkpoint_path = output_path.rstrip("/") + ".checkpoint.json"
+
+    state = _load_checkpoint(checkpoint_path, input_path, chunk_size, explain) if resume else None
+    if state is None:
+        state = {
+            "input": input_path,
+            "input_signature": list(columnar.signature(input_path)),
+            "chunk_size": chunk_size,
+            "explain": explain,
+            "chunks_done": 0,
+            "rows_done": 0,
+            "output_bytes": None,
+            "complete": False
+        }
+    elif state["complete"]:
+        print(f"{output_path} is already complete ({state['rows_done']} rows)", file=log)
+        return state
+
+    if _is_parquet(output_path):
+        sink = _ParquetSink(output_path, state["chunks_done"])
+    else:
+        sink = _CsvSink(output_path, state["output_bytes"])
+
+    chunks = _read_chunks(input_path, chunk_size, state["rows_done"])
+    start = time.perf_counter()
+    rows_this_run = 0
+
+    def completed(index, frame):
+        nonlocal rows_this_run
+        state["output_bytes"] = sink.write(index, frame)
+        state["chunks_done"] = index + 1
+        state["rows_done"] += len(frame)
+        _save_checkpoint(checkpoint_path, state)
+
+        rows_this_run += len(frame)
+        rate = rows_this_run / (time.perf_counter() - start)
+        print(f"chunk {index}: {state['rows_done']:,} rows ({rate:,.0f} rows/s)", file=log)
+
+    score = partial(_score_chunk, explain=explain)
+    try:
+        if workers <= 1:
+            with in_process_registry(model_path, encoder_path):
+                for index, chunk in enumerate(chunks, start=state["chunks_done"]):
+                    completed(index, score(chunk))
+        else:
+            with ProcessPoolExecutor(workers, initializer=_init_worker,
+                                     initargs=(model_path, encoder_path)) as pool:
+                pending = deque()
+                for index, chunk in enumerate(chunks, start=state["chunks_done"]):
+                    pending.append((index, pool.submit(score, chunk)))
+                    # Bound memory: wait on the oldest chunk before reading more
+                    if len(pending) >= 2 * workers:
+                        done_index, future = pending.popleft()
+                        completed(done_index, future.result())
+                while pending:
+                    done_index, future = pending.popleft()
+                    completed(done_index, future.result())
+    finally:
+        sink.close()
+
+    state["complete"] = True
+    _save_checkpoint(checkpoint_path, state)
+
+    elapsed = time.perf_counter() - start
+    rate = rows_this_run / elapsed if elapsed else 0.0
+    print(f"Scored {rows_this_run:,} rows in {elapsed:.1f}s ({rate:,.0f} rows/s) "
+          f"-> {output_path}", file=log)
+    return state
@@ -0,0 +1,258 @@
+import json
+import time
+import asyncio
+import argparse
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+import pandas as pd
+
+import src.predict as predict
+from src import metrics
+from src.metrics import Counter, Histogram, SIZE_BUCKETS
+
+RESULT_KEYS = ["alert", "risk_score", "confidence", "aftershock_probability"]
+
+
+def _score_rows(rows):
+    """
+    Score a list of feature tuples with one predict_batch call.
+    Top-level so it can run in a process pool too.
+    """
+    frame = pd.DataFrame(rows, columns=predict.FEATURES)
+    scored = predict.predict_batch(data=frame)
+    return [
+        (str(alert), float(risk), float(conf), float(after))
+        for alert, risk, conf, after in scored[RESULT_KEYS].itertuples(index=False)
+    ]
+
+
+class MicroBatcher:
+    """
+    Collects single-event requests into batches.
+
+    A batch closes when max_batch items are queued or max_wait seconds
+    have passed since its first item, whichever comes first, and runs as
+    one predict_batch call in the executor. Up to `concurrency` batches
+    may be in flight; while they run, the next batch keeps filling.
+    """
+
+    def __init__(self, executor, max_batch=64, max_wait=0.002, concurrency=1):
+        self.executor = executor
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.queue = asyncio.Queue()
+        self._slots = asyncio.Semaphore(concurrency)
+        self._in_flight = set()
+
+        self.requests = Counter()
+        self.batches = Counter()
+        self.errors = Counter()
+        self.batch_size = Histogram(SIZE_BUCKETS)
+        self.batch_latency = Histogram()
+        self.request_latency = Histogram()
+
+    async def submit(self, features):
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((features, future, time.perf_counter()))
+        self.requests.inc()
+        return await future
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.max_wait
+
+            while len(batch) < self.max_batch:
+                if not self.queue.empty():
+                    batch.append(self.queue.get_nowait())
+                    continue
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            await self._slots.acquire()
+            task = asyncio.create_task(self._dispatch(batch))
+            self._in_flight.add(task)
+            task.add_done_callback(self._in_flight.discard)
+
+    async def _dispatch(self, batch):
+        loop = asyncio.get_running_loop()
+        try:
+            start = time.perf_counter()
+            results = await loop.run_in_executor(
+                self.executor, _score_rows, [features for features, _, _ in batch]
+            )
+            self.batch_latency.observe(time.perf_counter() - start)
+        except Exception as exc:
+            self.errors.inc()
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+        finally:
+            self._slots.release()
+
+        self.batches.inc()
+        self.batch_size.observe(len(batch))
+        finished = time.perf_counter()
+        for (_, future, received), result in zip(batch, results):
+            self.request_latency.observe(finished - received)
+            if not future.done():
+                future.set_result(dict(zip(RESULT_KEYS, result)))
+
+    def metrics(self):
+        return {
+            "requests": self.requests.value,
+            "batches": self.batches.value,
+            "errors": self.errors.value,
+            "queue_depth": self.queue.qsize(),
+            "batch_size": self.batch_size.snapshot(),
+            "batch_latency_seconds": self.batch_latency.snapshot(),
+            "request_latency_seconds": self.request_latency.snapshot(),
+            "request_latency_p50": self.request_latency.quantile(0.50),
+            "request_latency_p99": self.request_latency.quantile(0.99)
+        }
+
+
+# ---------------- HTTP ----------------
+def _response(status, payload):
+    body = json.dumps(payload).encode()
+    head = (f"HTTP/1.1 {status}\r\n"
+            "Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            "Connection: keep-alive\r\n\r\n")
+    return head.encode() + body
+
+
+def _parse_event(payload):
+    return tuple(float(payload[name]) for name in predict.FEATURES)
+
+
+class ScoringServer:
+    """
+    Minimal keep-alive HTTP/1.1 front end for the MicroBatcher.
+
+    POST /predict   {"magnitude": .., "depth": .., "cdi": .., "mmi": .., "sig": ..}
+    GET  /metrics   batcher and model-registry metrics
+    GET  /health
+    """
+
+    def __init__(self, batcher):
+        self.batcher = batcher
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, _ = request_line.decode("latin-1").split(" ", 2)
+
+                length = 0
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    if name.strip().lower() == "content-length":
+                        length = int(value)
+                body = await reader.readexactly(length) if length else b""
+
+                writer.write(await self.route(method, path, body))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def route(self, method, path, body):
+        if method == "POST" and path == "/predict":
+            try:
+                features = _parse_event(json.loads(body))
+            except (ValueError, KeyError, TypeError) as exc:
+                return _response("400 Bad Request", {"error": str(exc)})
+            try:
+                return _response("200 OK", await self.batcher.submit(features))
+            except Exception as exc:
+                return _response("500 Internal Server Error", {"error": str(exc)})
+
+        if method == "GET" and path == "/metrics":
+            return _response("200 OK", {
+                **self.batcher.metrics(),
+                "model": predict.registry.metrics()
+            })
+
+        if method == "GET" and path == "/health":
+            return _response("200 OK", {"status": "ok"})
+
+        return _response("404 Not Found", {"error": f"{method} {path}"})
+
+
+async def serve(host="127.0.0.1", port=8000, max_batch=64, max_wait=0.002,
+                concurrency=1, use_processes=False, metrics_port=None):
+    if use_processes:
+        executor = ProcessPoolExecutor(concurrency)
+    else:
+        executor = ThreadPoolExecutor(concurrency)
+        # Load before accepting traffic so the first batch isn't slow
+        await asyncio.get_running_loop().run_in_executor(executor, predict.registry.get)
+
+    batcher = MicroBatcher(executor, max_batch, max_wait, concurrency)
+    server = ScoringServer(batcher)
+
+    if metrics_port:
+        # Stage timers cover scoring only with threads; worker processes keep their own
+        metrics.register_collector(lambda: {
+            "server_requests_total": batcher.requests.value,
+            "server_batches_total": batcher.batches.value,
+            "server_errors_total": batcher.errors.value,
+            "server_queue_depth": batcher.queue.qsize(),
+            "model_rss_bytes": predict.registry.metrics()["rss_bytes"]
+        })
+        metrics.serve_exporter(metrics_port, host)
+
+    batch_task = asyncio.create_task(batcher.run())
+    listener = await asyncio.start_server(server.handle, host, port)
+    print(f"Serving on http://{host}:{port} "
+          f"(max_batch={max_batch}, max_wait={max_wait * 1000:g} ms)", flush=True)
+
+    try:
+        async with listener:
+            await listener.serve_forever()
+    finally:
+        batch_task.cancel()
+        executor.shutdown(wait=False)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m src.server",
+                                     description="Micro-batching earthquake scoring server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--max-batch", type=int, default=64,
+                        help="Close a batch at this many requests (1 = no batching)")
+    parser.add_argument("--max-wait-ms", type=float, default=2.0,
+                        help="Close a batch this long after its first request")
+    parser.add_argument("--concurrency", type=int, default=1,
+                        help="Batches scored in parallel")
+    parser.add_argument("--processes", action="store_true",
+                        help="Score in worker processes instead of threads")
+    parser.add_argument("--metrics-port", type=int, default=None,
+                        help="Serve Prometheus metrics and profiling toggles on this port")
+    args = parser.parse_args(argv)
+
+    try:
+        asyncio.run(serve(args.host, args.port, args.max_batch,
+                          args.max_wait_ms / 1000, args.concurrency, args.processes,
+                          args.metrics_port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -1,77 +1,329 @@
 #train_model.py
-import pandas as pd
+import os
+import sys
+import time
+import math
+import argparse
+from itertools import product
+
+import numpy as np
 import joblib
 
-from sklearn.model_selection import train_test_split, GridSearchCV
+from sklearn.model_selection import train_test_split, GridSearchCV, StratifiedKFold
 from sklearn.pipeline import Pipeline
 from sklearn.impute import SimpleImputer
 from sklearn.preprocessing import StandardScaler, LabelEncoder
 from sklearn.ensemble import RandomForestClassifier
-from sklearn.metrics import accuracy_score, classification_report
+from sklearn.metrics import accuracy_score, classification_report, f1_score
+from joblib import parallel_config
+
+# Allow `python src/train_model.py` as well as `python -m src.train_model`
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.features import (FEATURES, DERIVED_FEATURES, FEATURE_CACHE_DIR,
+                          FeatureBuilder, load_features)
+from src.incremental import save_profile, write_profile
+from src.binning import MIN_BINS, MAX_BINS
+from src import metrics
+
+DATA_PATH = "usgs_earthquake_realistic_1000.csv"
+MODEL_PATH = "models/best_model.pkl"
+ENCODER_PATH = "models/label_encoder.pkl"
+
+# HYPERPARAMETER GRID
+PARAM_GRID = {
+    "model__n_estimators": [200, 300, 400],
+    "model__max_depth": [10, 15, None],
+    "model__min_samples_split": [2, 5, 10]
+}
+
 
 # LOAD DATA
-df = pd.read_csv("usgs_earthquake_realistic_1000.csv")
-df.columns = df.columns.str.strip()
+def load_data(path=DATA_PATH, cache_dir=FEATURE_CACHE_DIR):
+    # Raw + derived feature columns, cached per dataset version
+    df = load_features(path, cache_dir)
 
-X = df.drop(columns=["alert"], errors="ignore")
-y = df["alert"]
+    X = df[FEATURES + DERIVED_FEATURES]
+    y = df["alert"]
 
-# LABEL ENCODING
-le = LabelEncoder()
-y_encoded = le.fit_transform(y)
+    # LABEL ENCODING
+    le = LabelEncoder()
+    y_encoded = le.fit_transform(y)
 
-# ---------- FEATURE ENGINEERING ----------
-df["risk_score"] = (
-    df["magnitude"] * 0.4 +
-    (1 / (df["depth"] + 1)) * 20 +
-    df["mmi"] * 3 +
-    (df["sig"] / 100)
-)
+    return X, y_encoded, le
 
-df["aftershock_probability"] = (
-    df["magnitude"] / 10 +
-    (1 / (df["depth"] + 1))
-).clip(0, 1)
 
 # TRAIN TEST SPLIT
-X_train, X_test, y_train, y_test = train_test_split(
-    X, y_encoded, test_size=0.2, random_state=42
-)
+def split_data(X, y_encoded):
+    return train_test_split(X, y_encoded, test_size=0.2, random_state=42)
 
 
 # PIPELINE (No scaling for tree models)
-pipeline = Pipeline([
-    ("imputer", SimpleImputer(strategy="median")),
-    ("model", RandomForestClassifier(class_weight="balanced", random_state=42))
-])
+# FeatureBuilder reuses the cached derived columns during training and
+# computes them from the five raw inputs at prediction time
+def build_pipeline(**model_params):
+    return Pipeline([
+        ("features", FeatureBuilder()),
+        ("imputer", SimpleImputer(strategy="median")),
+        ("model", RandomForestClassifier(class_weight="balanced", random_state=42,
+                                         **model_params))
+    ])
 
-# HYPERPARAMETER TUNING
-params = {
-    "model__n_estimators": [200, 300, 400],
-    "model__max_depth": [10, 15, None],
-    "model__min_samples_split": [2, 5, 10]
+
+# ---------------- EXHAUSTIVE GRID SEARCH ----------------
+def grid_search(X_train, y_train, n_jobs=-1):
+    grid = GridSearchCV(
+        build_pipeline(),
+        PARAM_GRID,
+        cv=5,
+        scoring="f1_weighted",
+        n_jobs=n_jobs
+    )
+    grid.fit(X_train, y_train)
+    metrics.stage("train.final_fit").observe(grid.refit_time_)
+    return grid.best_estimator_, grid.best_params_, grid.best_score_
+
+
+# ---------------- SUCCESSIVE HALVING (WARM-STARTED) ----------------
+def halving_search(X_train, y_train, n_jobs=-1, factor=3, cv=5):
+    """
+    Successive halving over PARAM_GRID with n_estimators as the resource.
+
+    Every (max_depth, min_samples_split) candidate starts with the
+    smallest forest on each CV fold. After each rung only the best
+    1/factor candidates survive, and their forests are grown to the
+    next n_estimators with warm_start instead of being refit. Growing a
+    warm-started forest gives the same trees as fitting the larger
+    forest from scratch with the same random_state. The best candidate
+    of the final rung is refit on the whole training set.
+    """
+    tree_budgets = sorted(PARAM_GRID["model__n_estimators"])
+    candidates = [
+        {"model__max_depth": depth, "model__min_samples_split": split}
+        for depth, split in product(PARAM_GRID["model__max_depth"],
+                                    PARAM_GRID["model__min_samples_split"])
+    ]
+
+    folds = list(StratifiedKFold(n_splits=cv).split(X_train, y_train))
+    forests = {}
+    scores = {}
+
+    for rung, n_estimators in enumerate(tree_budgets):
+        for index, params in enumerate(candidates):
+            fold_scores = []
+            for fold, (train_idx, val_idx) in enumerate(folds):
+                key = (repr(params), fold)
+                if key not in forests:
+                    forests[key] = build_pipeline(warm_start=True, n_jobs=n_jobs)
+                    forests[key].set_params(**params)
+                pipeline = forests[key]
+                pipeline.set_params(model__n_estimators=n_estimators)
+                pipeline.fit(X_train.iloc[train_idx], y_train[train_idx])
+
+                preds = pipeline.predict(X_train.iloc[val_idx])
+                fold_scores.append(f1_score(y_train[val_idx], preds, average="weighted"))
+
+            scores[repr(params)] = (np.mean(fold_scores), n_estimators, params)
+            print(f"  rung {rung} | {n_estimators} trees | {params} "
+                  f"| f1_weighted={np.mean(fold_scores):.4f}")
+
+        if rung < len(tree_budgets) - 1:
+            # Drop weak configurations and free their forests
+            ranked = sorted(candidates, key=lambda p: scores[repr(p)][0], reverse=True)
+            survivors = ranked[:max(1, math.ceil(len(candidates) / factor))]
+            for params in candidates:
+                if params not in survivors:
+                    for fold in range(cv):
+                        forests.pop((repr(params), fold), None)
+            candidates = survivors
+
+    # Only the last rung's survivors were scored on the full budget; an
+    # early score on a small forest isn't comparable
+    best_score, best_trees, best_params = max(
+        (scores[repr(params)] for params in candidates), key=lambda s: s[0]
+    )
+    best_params = {**best_params, "model__n_estimators": best_trees}
+
+    best_model = build_pipeline(n_jobs=n_jobs).set_params(**best_params)
+    with metrics.stage("train.final_fit").timer():
+        best_model.fit(X_train, y_train)
+    # Save with default n_jobs like the grid-search model
+    best_model.set_params(model__n_jobs=None)
+    return best_model, best_params, best_score
+
+
+# ---------------- CHECKPOINTED GRID SEARCH ----------------
+def distributed_search(X_train, y_train, n_jobs=-1, **queue_options):
+    """
+    Same grid and selection as grid_search, run cell by cell from a
+    SQLite work queue so an interrupted search resumes (see
+    src/distributed_search.py for multi-host workers).
+    """
+    from src.distributed_search import distributed_search as run_queue
+    return run_queue(X_train, y_train, n_jobs=n_jobs, **queue_options)
+
+
+SEARCHES = {
+    "grid": grid_search,
+    "halving": halving_search,
+    "distributed": distributed_search
 }
 
-grid = GridSearchCV(
-    pipeline,
-    params,
-    cv=5,
-    scoring="f1_weighted",
-    n_jobs=-1
-)
 
-grid.fit(X_train, y_train)
+def timed_search(name, X_train, y_train, n_jobs=-1, **search_options):
+    """
+    Run a search and return (model, params, score, wall_seconds, cpu_seconds).
+    """
+    wall = time.perf_counter()
+    cpu = time.process_time()
+    best_model, best_params, best_score = SEARCHES[name](X_train, y_train, n_jobs=n_jobs,
+                                                         **search_options)
+    wall = time.perf_counter() - wall
+    metrics.stage(f"train.search.{name}").observe(wall)
+    return best_model, best_params, best_score, wall, time.process_time() - cpu
 
-best_model = grid.best_estimator_
 
 # EVALUATION
-preds = best_model.predict(X_test)
-print("Accuracy:", accuracy_score(y_test, preds))
-print(classification_report(y_test, preds))
+def evaluate(best_model, X_test, y_test):
+    with metrics.stage("train.evaluate").timer():
+        preds = best_model.predict(X_test)
+    print("Accuracy:", accuracy_score(y_test, preds))
+    print(classification_report(y_test, preds))
+    return f1_score(y_test, preds, average="weighted")
 
 
 # SAVE MODEL & ENCODER
-joblib.dump(best_model, "models/best_model.pkl")
-joblib.dump(le, "models/label_encoder.pkl")
+def save_model(best_model, le):
+    with metrics.stage("train.save").timer():
+        joblib.dump(best_model, MODEL_PATH)
+        joblib.dump(le, ENCODER_PATH)
+    print("✅ Model & Label Encoder Saved Successfully")
+
+
+def compare_searches(X_train, X_test, y_train, y_test):
+    """
+    Run grid and halving back to back and report the savings.
+    The threading backend keeps all work in this process, so
+    process_time() covers the CPU time of every worker.
+    """
+    results = {}
+    with parallel_config(backend="threading"):
+        for name in ("grid", "halving"):
+            print(f"\n---------------- {name.upper()} SEARCH ----------------")
+            model, params, score, wall, cpu = timed_search(name, X_train, y_train)
+            test_f1 = f1_score(y_test, model.predict(X_test), average="weighted")
+            results[name] = (model, params, score, wall, cpu, test_f1)
+
+    print("\n---------------- SEARCH COMPARISON ----------------")
+    print(f"{'search':8s} {'wall s':>8s} {'cpu s':>8s} {'cv f1':>7s} {'test f1':>8s}  best params")
+    for name, (_, params, score, wall, cpu, test_f1) in results.items():
+        print(f"{name:8s} {wall:8.1f} {cpu:8.1f} {score:7.4f} {test_f1:8.4f}  {params}")
+
+    grid_wall, grid_cpu = results["grid"][3], results["grid"][4]
+    halving_wall, halving_cpu = results["halving"][3], results["halving"][4]
+    print(f"Halving saves {1 - halving_wall / grid_wall:.0%} wall-clock "
+          f"and {1 - halving_cpu / grid_cpu:.0%} CPU time")
+
+    return results["halving"][0]
+
+
+def train(args):
+    if args.out_of_core:
+        from src.out_of_core import train_out_of_core
+
+        best_model, le, report = train_out_of_core(args.data, args.chunk_size, args.max_bins)
+        print(f"Out-of-core: {report['rows']:,} rows -> {report['train_cells']:,} cells "
+              f"in {report['total_seconds']:.1f}s")
+        if "test_f1_weighted" in report:
+            print("Accuracy:", report["test_accuracy"])
+            print("F1 (weighted):", report["test_f1_weighted"])
+        save_model(best_model, le)
+        write_profile(report["profile"])
+        return
+
+    with metrics.stage("train.load").timer():
+        X, y_encoded, le = load_data(args.data, args.feature_cache or None)
+    X_train, X_test, y_train, y_test = split_data(X, y_encoded)
+
+    if args.compare:
+        best_model = compare_searches(X_train, X_test, y_train, y_test)
+    else:
+        options = {}
+        if args.search == "distributed":
+            options = {"db_path": args.search_db, "data_path": os.path.abspath(args.data)}
+            if args.search_lease is not None:
+                options["lease"] = args.search_lease
+        best_model, best_params, best_score, wall, cpu = timed_search(
+            args.search, X_train, y_train, **options
+        )
+        print(f"{args.search} search: {wall:.1f}s wall, {cpu:.1f}s CPU, "
+              f"cv f1_weighted={best_score:.4f}, {best_params}")
+
+    evaluate(best_model, X_test, y_test)
+    save_model(best_model, le)
+
+    # Reference for the drift check in src/incremental.py
+    save_profile(X)
+
+
+def bin_count(text):
+    value = int(text)
+    if not MIN_BINS <= value <= MAX_BINS:
+        raise argparse.ArgumentTypeError(f"must be between {MIN_BINS} and {MAX_BINS}")
+    return value
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train the earthquake alert model")
+    parser.add_argument("--data", default=DATA_PATH)
+    parser.add_argument("--search", choices=sorted(SEARCHES), default="grid",
+                        help="grid: exhaustive GridSearchCV; halving: successive "
+                             "halving over warm-started forests; distributed: grid "
+                             "search over a resumable SQLite work queue")
+    parser.add_argument("--search-db", default="models/search.db",
+                        help="Work queue for --search distributed")
+    parser.add_argument("--search-lease", type=float, default=None,
+                        help="Seconds without a heartbeat before a --search distributed "
+                             "cell is handed out again (default: 900)")
+    parser.add_argument("--compare", action="store_true",
+                        help="Run both searches and report wall/CPU savings")
+    parser.add_argument("--out-of-core", action="store_true",
+                        help="Stream the CSV and train on uint8-binned cell counts "
+                             "(for catalogs larger than RAM; no search)")
+    parser.add_argument("--chunk-size", type=int, default=250_000)
+    parser.add_argument("--max-bins", type=bin_count, default=MAX_BINS,
+                        help="Bins per feature for --out-of-core (2-256, uint8 codes). "
+                             "Memory is bounded by min(rows, classes * bins**5) "
+                             "cells, so only small values cap it below the row count")
+    parser.add_argument("--feature-cache", default=FEATURE_CACHE_DIR,
+                        help="Directory for cached feature columns ('' to disable)")
+    parser.add_argument("--metrics-file",
+                        help="Write stage timings here in Prometheus text format")
+    parser.add_argument("--profile",
+                        help="cProfile the run; print the top functions and save "
+                             "the stats to this path")
+    parser.add_argument("--tracemalloc", action="store_true",
+                        help="Print the top allocation sites at the end")
+    args = parser.parse_args(argv)
+
+    if args.tracemalloc:
+        metrics.start_tracemalloc()
+    if args.profile:
+        metrics.start_profile()
+        metrics.profiled(train)(args)
+        print(metrics.stop_profile(limit=25, path=args.profile))
+    else:
+        train(args)
+    if args.tracemalloc:
+        print(metrics.stop_tracemalloc())
+
+    if args.metrics_file:
+        metrics.write_textfile(args.metrics_file)
+        print(f"Stage timings -> {args.metrics_file}")
+    for name, snap in metrics.stages_snapshot().items():
+        if name.startswith("train.") and snap["count"]:
+            print(f"  {name:24s} {snap['sum']:8.2f}s")
+
 
-print("✅ Model & Label Encoder Saved Successfully")
+if __name__ == "__main__":
+    main()
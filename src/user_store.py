@@ -0,0 +1,223 @@
+import os
+import hmac
+import sqlite3
+import hashlib
+import secrets
+import argparse
+import threading
+from abc import ABC, abstractmethod
+
+USER_DB_PATH = "users.db"
+LEGACY_CSV_PATH = "users.csv"
+
+# migrate_csv renames the plaintext file to this once it is imported
+MIGRATED_SUFFIX = ".migrated"
+
+HASH_ALGORITHM = "pbkdf2_sha256"
+HASH_ITERATIONS = 200_000
+SALT_BYTES = 16
+
+
+# ---------------- PASSWORD HASHING ----------------
+def hash_password(password, iterations=HASH_ITERATIONS, salt=None):
+    """
+    Salted PBKDF2-SHA256 hash, encoded as "algorithm$iterations$salt$hash"
+    so the cost can be raised later without breaking stored passwords.
+    """
+    salt = salt or secrets.token_hex(SALT_BYTES)
+    digest = hashlib.pbkdf2_hmac("sha256", password.encode(), salt.encode(), iterations)
+    return f"{HASH_ALGORITHM}${iterations}${salt}${digest.hex()}"
+
+
+def check_password(password, encoded):
+    try:
+        algorithm, iterations, salt, _ = encoded.split("$")
+    except (AttributeError, ValueError):
+        return False
+    if algorithm != HASH_ALGORITHM:
+        return False
+    candidate = hash_password(password, int(iterations), salt)
+    return hmac.compare_digest(candidate, encoded)
+
+
+# Hashed against for unknown usernames, so a failed lookup costs as much
+# as a wrong password
+_DUMMY_HASH = hash_password("", salt="0" * (2 * SALT_BYTES))
+
+
+# ---------------- STORE INTERFACE ----------------
+class UserStore(ABC):
+    """
+    Backend interface used by the login and signup pages.
+    """
+
+    @abstractmethod
+    def add_user(self, username, password):
+        """
+        Create a user. Returns False if the username is taken.
+        """
+
+    @abstractmethod
+    def verify(self, username, password):
+        pass
+
+    @abstractmethod
+    def __contains__(self, username):
+        pass
+
+    @abstractmethod
+    def __len__(self):
+        pass
+
+
+class SQLiteUserStore(UserStore):
+    """
+    Users in a SQLite database in WAL mode.
+
+    Usernames are the primary key, so lookups are an index probe and a
+    duplicate signup fails atomically inside SQLite instead of racing a
+    read-modify-write of the whole file. Each thread gets its own
+    connection; WAL lets logins read while a signup commits.
+    """
+
+    def __init__(self, path=USER_DB_PATH, iterations=HASH_ITERATIONS, timeout=10.0):
+        self.path = path
+        self.iterations = iterations
+        self.timeout = timeout
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS users ("
+                " username TEXT PRIMARY KEY,"
+                " password_hash TEXT NOT NULL,"
+                " created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP)"
+            )
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.timeout)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def add_user(self, username, password):
+        return self.add_hashed(username, hash_password(password, self.iterations))
+
+    def add_hashed(self, username, password_hash):
+        try:
+            with self._connect() as conn:
+                conn.execute("INSERT INTO users (username, password_hash) VALUES (?, ?)",
+                             (username, password_hash))
+        except sqlite3.IntegrityError:
+            return False
+        return True
+
+    def add_hashed_many(self, users):
+        """
+        Insert (username, password_hash) pairs in one BEGIN IMMEDIATE
+        transaction, skipping usernames that already exist. Concurrent
+        callers queue on the write lock, so a batch is applied once.
+        Returns the number of users added.
+        """
+        conn = self._connect()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            before = conn.total_changes
+            conn.executemany(
+                "INSERT OR IGNORE INTO users (username, password_hash) VALUES (?, ?)", users)
+            return conn.total_changes - before
+
+    def verify(self, username, password):
+        row = self._connect().execute(
+            "SELECT password_hash FROM users WHERE username = ?", (username,)
+        ).fetchone()
+        if row is None:
+            check_password(password, _DUMMY_HASH)
+            return False
+        return check_password(password, row[0])
+
+    def __contains__(self, username):
+        return self._connect().execute(
+            "SELECT 1 FROM users WHERE username = ?", (username,)
+        ).fetchone() is not None
+
+    def __len__(self):
+        return self._connect().execute("SELECT COUNT(*) FROM users").fetchone()[0]
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+# ---------------- MIGRATION ----------------
+def migrate_csv(csv_path, store):
+    """
+    Copy plaintext users from the legacy users.csv into `store`,
+    hashing each password, then rename the CSV to <name>.migrated so
+    the plaintext copy is no longer picked up (delete it once the
+    import is confirmed). Existing usernames are left untouched and the
+    rows are written in a single transaction, so running it twice, or
+    from two processes at once, is harmless. A CSV that is already
+    gone counts as migrated. Returns the number of users added.
+    """
+    if not os.path.exists(csv_path):
+        return 0
+    # Only needed once per deployment; keeps pandas off the login path
+    import pandas as pd
+
+    try:
+        df = pd.read_csv(csv_path, dtype=str, keep_default_na=False)
+    except FileNotFoundError:
+        # Renamed by another process since the check above
+        return 0
+    # Hash before taking the write lock; PBKDF2 is the slow part
+    users = [(username, hash_password(password, store.iterations))
+             for username, password in zip(df["username"], df["password"]) if username]
+    added = store.add_hashed_many(users)
+    try:
+        os.replace(csv_path, csv_path + MIGRATED_SUFFIX)
+    except FileNotFoundError:
+        pass
+    return added
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_user_store(path=USER_DB_PATH, legacy_csv=LEGACY_CSV_PATH):
+    """
+    Process-wide store shared by all sessions. Imports the legacy CSV
+    whenever it is still present, so a deployment that already has a
+    database picks up the accounts as well.
+    """
+    global _store
+    with _store_lock:
+        if _store is None:
+            store = SQLiteUserStore(path)
+            if legacy_csv:
+                migrate_csv(legacy_csv, store)
+            _store = store
+        return _store
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage the user store")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    migrate = commands.add_parser("migrate", help="Import users.csv into the SQLite store")
+    migrate.add_argument("--csv", default=LEGACY_CSV_PATH)
+    migrate.add_argument("--db", default=USER_DB_PATH)
+
+    args = parser.parse_args()
+    added = migrate_csv(args.csv, SQLiteUserStore(args.db))
+    print(f"✅ Migrated {added} user(s) from {args.csv} -> {args.db} "
+          f"(renamed to {args.csv + MIGRATED_SUFFIX})")
+
+
+if __name__ == "__main__":
+    main()
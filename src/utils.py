@@ -0,0 +1,46 @@
+import os
+import hashlib
+
+
+def file_signature(path):
+    """
+    Cheap change marker for a file on disk: (size, mtime_ns).
+    Returns None when the file does not exist.
+    """
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+def signature_key(*signatures):
+    """
+    Short stable id for one or more file signatures.
+    """
+    text = "|".join(repr(sig) for sig in signatures)
+    return hashlib.sha1(text.encode()).hexdigest()[:12]
+
+
+def rss_bytes():
+    """
+    Resident set size of the current process in bytes, or 0 where the
+    platform offers no way to read it. Only used for reporting, so it
+    never raises.
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+
+    # Not Linux: fall back to the peak RSS the kernel reports. The
+    # resource module doesn't exist on Windows.
+    try:
+        import resource
+    except ImportError:
+        return 0
+    import sys
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
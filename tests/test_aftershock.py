@@ -0,0 +1,19 @@
+from src import aftershock
+from src.aftershock import AftershockModel
+
+
+def test_forecast_counts_truncated_sequences(monkeypatch):
+    model = AftershockModel(min_magnitude=3.0, n_sims=500, workers=1)
+    full = model.forecast(7.5, 10.0)
+    assert full["truncated"] == 0
+
+    monkeypatch.setattr(aftershock, "MAX_GENERATIONS", 1)
+    cut = AftershockModel(min_magnitude=3.0, n_sims=500, workers=1).forecast(7.5, 10.0)
+    assert 0 < cut["truncated"] <= 500
+    # Cutting the cascade can only lose aftershocks
+    assert cut["expected_count"] < full["expected_count"]
+
+
+def test_undefined_inputs_report_no_truncation():
+    result = AftershockModel(n_sims=100, workers=1).forecast(float("nan"), 10.0)
+    assert result["truncated"] == 0
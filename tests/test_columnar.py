@@ -0,0 +1,20 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src import columnar
+
+
+def test_append_rejects_lossy_casts(tmp_path):
+    path = str(tmp_path / "catalog.cols")
+    columnar.create(path, pd.DataFrame({"sig": [10, 20], "depth": [1.5, np.nan]}))
+
+    for bad in ({"sig": [30.5], "depth": [1.0]}, {"sig": [np.nan], "depth": [1.0]}):
+        with pytest.raises(ValueError, match="'sig'"):
+            columnar.append(path, pd.DataFrame(bad))
+
+    # Whole-valued floats and narrower ints fit
+    columnar.append(path, pd.DataFrame({"sig": [30.0], "depth": np.array([2], dtype=np.int32)}))
+    frame = columnar.ColumnStore.open(path).to_frame()
+    assert frame["sig"].tolist() == [10, 20, 30]
+    assert frame["depth"].tolist()[2:] == [2.0]
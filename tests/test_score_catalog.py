@@ -0,0 +1,45 @@
+import io
+import os
+
+import pandas as pd
+import pytest
+
+from src.score_catalog import score_catalog
+
+# Labeled: has an "alert" column of its own
+CATALOG = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                       "usgs_earthquake_realistic_1000.csv")
+
+PREDICTED = ["predicted_alert", "predicted_risk_score", "predicted_confidence",
+             "predicted_aftershock_probability"]
+
+
+def _read_output(path):
+    if path.endswith(".parquet"):
+        return pd.read_parquet(path)
+    return pd.read_csv(path)
+
+
+@pytest.mark.parametrize("name", ["scored.csv", "scored.parquet"])
+def test_scores_labeled_catalog(tmp_path, name):
+    output = str(tmp_path / name)
+    state = score_catalog(CATALOG, output, chunk_size=300, workers=1, log=io.StringIO())
+
+    catalog = pd.read_csv(CATALOG)
+    catalog.columns = catalog.columns.str.strip()
+    scored = _read_output(output)
+
+    assert state["rows_done"] == len(catalog) == len(scored)
+    assert list(scored.columns) == list(catalog.columns) + PREDICTED
+    assert scored.columns.is_unique
+    # The input labels pass through untouched
+    assert scored["alert"].tolist() == catalog["alert"].tolist()
+    assert scored["predicted_alert"].isin(catalog["alert"].unique()).all()
+
+
+def test_in_process_run_keeps_callers_registry(tmp_path):
+    import src.predict as predict
+
+    before = predict.registry
+    score_catalog(CATALOG, str(tmp_path / "scored.csv"), workers=1, log=io.StringIO())
+    assert predict.registry is before
@@ -0,0 +1,59 @@
+import os
+import threading
+
+from src import user_store
+from src.user_store import MIGRATED_SUFFIX, SQLiteUserStore, migrate_csv
+
+
+def _write_csv(path):
+    with open(path, "w") as f:
+        f.write("username,password\nadmin,admin123\nSwetha,Swetha123\n")
+
+
+def test_concurrent_migrations_import_once(tmp_path):
+    csv_path = str(tmp_path / "users.csv")
+    db_path = str(tmp_path / "users.db")
+    _write_csv(csv_path)
+
+    results, errors = [], []
+    start = threading.Barrier(2)
+
+    def run():
+        try:
+            store = SQLiteUserStore(db_path, iterations=1_000)
+            start.wait()
+            results.append(migrate_csv(csv_path, store))
+        except Exception as exc:
+            errors.append(exc)
+
+    threads = [threading.Thread(target=run) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert sorted(results) == [0, 2]
+    assert not os.path.exists(csv_path)
+    assert os.path.exists(csv_path + MIGRATED_SUFFIX)
+
+    store = SQLiteUserStore(db_path)
+    assert len(store) == 2
+    assert store.verify("Swetha", "Swetha123")
+    # Already renamed: nothing left to do
+    assert migrate_csv(csv_path, store) == 0
+
+
+def test_existing_database_still_imports_csv(tmp_path, monkeypatch):
+    csv_path = str(tmp_path / "users.csv")
+    db_path = str(tmp_path / "users.db")
+    SQLiteUserStore(db_path).add_user("admin", "changed")
+    _write_csv(csv_path)
+
+    monkeypatch.setattr(user_store, "_store", None)
+    store = user_store.get_user_store(db_path, csv_path)
+
+    assert len(store) == 2
+    # An account that already exists keeps its password
+    assert store.verify("admin", "changed")
+    assert os.path.exists(csv_path + MIGRATED_SUFFIX)